@@ -3,287 +3,4659 @@
 """
 Created on Jan 28 10:04:26 2025
 Based on: https://www.kaggle.com/datasets/lainguyn123/student-performance-factors
-Sample input: --TASK="1"
+Sample input: --TASK="1"  (or --TASK="1,2,3", --TASK="all")
 @author: Matthew Goosney
 @author: V01040408
 """
 
+from __future__ import annotations
+
 import sys
-import pandas as pd
-from typing import Optional, List, Dict
+import os
+import csv
+import io
+import gzip
+import heapq
+import bisect
+import importlib
+import importlib.util
+from array import array
+import json
+import shutil
+import glob
+import random
+import sqlite3
+import zipfile
+import hashlib
+import time
+import cProfile
+import resource
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Optional, List, Dict, Tuple, Union, Callable, Hashable
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, ExitStack
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is only imported the first time one of its attributes is used.
+
+        - pandas (and numpy) take most of the start-up time of a short run, so they are only imported
+          when the full engine actually runs; the lite engine never touches them.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attribute: str):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return getattr(self.module, attribute)
+
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+yaml = LazyModule("yaml")
+
+
+
+class GradeScale:
+    """
+    Table-driven grading scale that converts exam scores to letter grades for a whole column at once.
+
+        - Each grade is an inclusive (low, high) score band; bands are listed from highest to lowest.
+        - Scores outside every band (above the 101 cap, below the lowest band or between bands) fall through
+          to the fallback grade, exactly like the old if/elif chains.
+    """
+
+    def __init__(self, bands: List[Tuple[str, float, float]], fallback: str = 'F') -> None:
+        """
+        Builds the bin edges for the scale.
+
+            Parameters
+            -------
+            bands (List[Tuple[str, float, float]]): (grade, low, high) triples, ordered from highest to lowest grade.
+            fallback (str, optional): Grade given to scores that are not inside any band. Defaults to 'F'.
+        """
+        self.grades = [grade for grade, _, _ in bands]
+        self.fallback = fallback
+        self.categories = self.grades + [fallback]
+
+        # Edges are stored in ascending order so a binary search can locate each score's band
+        self.lows = [low for _, low, _ in reversed(bands)]
+        self.highs = [high for _, _, high in reversed(bands)]
+        self.band_codes = list(range(len(bands) - 1, -1, -1))
+        self.fallback_code = len(bands)
+
+    def code_of(self, score: float) -> int:
+        """
+        Grade code (index into self.categories) of a single score; the pure Python twin of codes().
+        """
+        band = bisect.bisect_right(self.lows, score) - 1
+        if band >= 0 and score <= self.highs[band]:
+            return self.band_codes[band]
+        return self.fallback_code
+
+    def codes(self, scores: pd.Series) -> np.ndarray:
+        """
+        Vectorized lookup of the grade code (index into self.categories) for every score.
+
+            Parameters
+            -------
+            scores (pd.Series): Numerical exam scores.
+
+            Returns
+            -------
+            np.ndarray: Integer grade codes, one per score.
+        """
+        values = np.asarray(scores, dtype=float)
+        lows = np.asarray(self.lows, dtype=float)
+        highs = np.asarray(self.highs, dtype=float)
+
+        # Candidate band is the highest one whose lower edge is <= score
+        band = np.searchsorted(lows, values, side='right') - 1
+        safe_band = np.clip(band, 0, len(lows) - 1)
+        inside = (band >= 0) & (values <= highs[safe_band])
+
+        return np.where(inside, np.asarray(self.band_codes)[safe_band], self.fallback_code)
+
+    def assign(self, scores: pd.Series) -> pd.Series:
+        """
+        Converts a column of exam scores to a categorical column of letter grades.
+
+            Parameters
+            -------
+            scores (pd.Series): Numerical exam scores.
+
+            Returns
+            -------
+            pd.Series: Categorical letter grades, aligned with the index of scores.
+        """
+        grades = pd.Categorical.from_codes(self.codes(scores), categories=self.categories, ordered=True)
+        return pd.Series(grades, index=scores.index, name='Grade')
+
+
+# UVic scale used by Task #4
+UVIC_SCALE = GradeScale([
+    ('A+', 90, 101),
+    ('A', 85, 89),
+    ('A-', 80, 84),
+    ('B+', 77, 79),
+    ('B', 73, 76),
+    ('B-', 70, 72),
+    ('C+', 65, 69),
+    ('C', 60, 64),
+    ('D', 50, 59),
+])
+
+# Simplified A-F scale used by Task #5
+SIMPLIFIED_SCALE = GradeScale([
+    ('A', 80, 101),
+    ('B', 70, 79),
+    ('C', 60, 69),
+    ('D', 50, 59),
+])
+
+
+
+# Named row filters shared by the tasks; each one is evaluated at most once per dataset
+FILTERS = {
+    'studied_over_40': lambda df: df['Hours_Studied'] > 40,
+    'score_85_or_higher': lambda df: df['Exam_Score'] >= 85,
+    'perfect_attendance_extracurricular': lambda df: (df['Attendance'] == 100) & (df['Extracurricular_Activities'] == 'Yes'),
+    'extracurricular': lambda df: df['Extracurricular_Activities'] == 'Yes',
+}
+
+
+
+class Analysis:
+    """
+    Query layer over one dataset: tasks ask it for shared intermediates (filters, grade columns, rankings,
+    per-grade totals) instead of deriving them from the DataFrame themselves.
+
+        - Every intermediate is computed the first time it is asked for and reused by every later task.
+        - The wrapped DataFrame is never modified.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        """
+        Parameters
+        -------
+        df (pd.DataFrame): Dataset the tasks run against.
+        """
+        self.df = df
+        self._nodes = {}
 
+    def node(self, key: Hashable, compute: Callable[[], object]) -> object:
+        """
+        Returns the intermediate stored under key, computing it on first use.
+        """
+        if key not in self._nodes:
+            self._nodes[key] = compute()
+        return self._nodes[key]
+
+    def mask(self, name: str) -> pd.Series:
+        """
+        Boolean mask of one of the named FILTERS.
+        """
+        return self.node(('mask', name), lambda: FILTERS[name](self.df))
+
+    def rows(self, name: str, columns: List[str]) -> pd.DataFrame:
+        """
+        Rows matching a named filter, restricted to the given columns.
+        """
+        return self.df.loc[self.mask(name), columns]
+
+    def grades(self, scale: GradeScale) -> pd.Series:
+        """
+        Categorical grade of every row on a grading scale.
+        """
+        return self.node(('grades', scale), lambda: scale.assign(self.df['Exam_Score']))
+
+    def totals(self, scale: GradeScale, column: str) -> pd.DataFrame:
+        """
+        Per-grade sum and count of a column (see grade_totals()).
+        """
+        return self.node(('totals', scale, column), lambda: grade_totals(self.df, scale, column))
+
+    def threshold_index(self, column: str, name: Optional[str] = None) -> "ThresholdIndex":
+        """
+        ThresholdIndex of a column (optionally over the rows of a named filter only), weighted by Exam_Score.
+        """
+        def compute():
+            rows = self.df if name is None else self.df.loc[self.mask(name)]
+            return ThresholdIndex(rows[column], rows['Exam_Score'])
+        return self.node(('threshold_index', column, name), compute)
+
+    def ranked(self, k: int) -> pd.DataFrame:
+        """
+        The k best rows by Exam_Score (descending) then Record_ID (ascending).
+
+            - One ranking serves every task: a smaller k is a prefix of the largest ranking computed so far.
+        """
+        ranked = self._nodes.get('ranked')
+        if ranked is None or len(ranked) < min(k, len(self.df)):
+            ranked = top_k(self.df, k)
+            self._nodes['ranked'] = ranked
+        return ranked.head(k)
+
+
+
+def as_analysis(data: Union[pd.DataFrame, Analysis]) -> Analysis:
+    """
+    Lets the task functions accept either a plain DataFrame or a shared Analysis.
+    """
+    return data if isinstance(data, Analysis) else Analysis(data)
 
 
-def task_1(df: pd.DataFrame) -> pd.DataFrame:
+
+def task_1(df: Union[pd.DataFrame, Analysis]) -> pd.DataFrame:
      """
      Function for Task #1 that filters the results of students who have studied more than 40 hours.
      
         Parameters
         -------
-        df (pd.DataFrame): Input DataFrame imported from the pandas library that contains data from our given dataset.
+        df (pd.DataFrame | Analysis): Input DataFrame that contains data from our given dataset, or an Analysis over it.
 
         Returns
         -------
         result_df: Variable that contains the imported DataFrame connected to our given dataset; filters Record_ID,
         Hours_Studied, and Exam_Score for students who have studied for more than 40 hours.  
      """
-     # Filter students who studied more than 40 hours
-     filtered_df = df[df['Hours_Studied'] > 40]
-
-     # Selected (filtered) columns in the dataset for output
-     result_df = filtered_df[['Record_ID', 'Hours_Studied', 'Exam_Score']]
+     # Filter students who studied more than 40 hours, keeping the selected columns for output
+     result_df = as_analysis(df).rows('studied_over_40', ['Record_ID', 'Hours_Studied', 'Exam_Score'])
      
      return result_df
 
 
 
-def task_2(df: pd.DataFrame) -> pd.DataFrame:
+def sort_top(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sorts rows by Exam_Score (descending) then Record_ID (ascending); ties keep their original order.
+    """
+    return df.sort_values(by=['Exam_Score', 'Record_ID'], ascending=[False, True])
+
+
+
+def top_k(df: pd.DataFrame, k: int) -> pd.DataFrame:
+    """
+    Selects the k best rows of a DataFrame, ordered by Exam_Score (descending) then Record_ID (ascending).
+
+        Parameters
+        -------
+        df (pd.DataFrame): Rows to choose from; must contain Exam_Score and Record_ID.
+        k (int): Number of rows to keep.
+
+        Returns
+        -------
+        pd.DataFrame: The top k rows in ranking order, identical to sort_top(df).head(k).
+
+        - Instead of sorting every row, np.partition finds the k-th best score (and, among rows tied on it,
+          the cut-off Record_ID) in linear time; only the k selected rows are sorted.
+        - top_k(top_k(a) + top_k(b)) == top_k(a + b), so partial results from chunks can be combined safely.
+    """
+    n = len(df)
+    if k <= 0:
+        return df.head(0)
+
+    scores = df['Exam_Score'].to_numpy()
+    ids = df['Record_ID'].to_numpy()
+
+    # Small inputs, missing values and non-numeric keys take the plain sort (NaN ordering differs in np.partition)
+    if n <= k or not (np.issubdtype(scores.dtype, np.number) and np.issubdtype(ids.dtype, np.number)) \
+            or np.isnan(scores.astype(float)).any() or np.isnan(ids.astype(float)).any():
+        return sort_top(df).head(k)
+
+    # k-th best score: everything above it is in, and some of the rows tied on it are too
+    kth_score = np.partition(scores, n - k)[n - k]
+    selected = scores > kth_score
+    needed = k - int(selected.sum())
+
+    ties = np.flatnonzero(scores == kth_score)
+    if needed < len(ties):
+        # Among the ties the smallest Record_IDs win; rows sharing the cut-off ID keep their original order
+        tie_ids = ids[ties]
+        cut_id = np.partition(tie_ids, needed - 1)[needed - 1]
+        below_cut = ties[tie_ids < cut_id]
+        on_cut = ties[tie_ids == cut_id][:needed - len(below_cut)]
+        ties = np.concatenate([below_cut, on_cut])
+    selected[ties] = True
+
+    return sort_top(df[selected])
+
+
+
+def task_2(df: Union[pd.DataFrame, Analysis], k: int = 10) -> pd.DataFrame:
     """
     Funtion for Task #2 that filters the results of the top 10 students with exam scores of 85 or higher.
 
         Parameters
         -------
-        df (pd.DataFrame): Input DataFrame imported from the pandas library that contains data from our given dataset.
+        df (pd.DataFrame | Analysis): Input DataFrame that contains data from our given dataset, or an Analysis over it.
+        k (int, optional): Number of students to keep (--top-k). Defaults to 10.
 
         Returns
         -------
         result_df: Variable that filters Record_ID, Hours_Studied, and Exam_Score for the top 10 students 
         with exam scores, sorted by score (descending) and ID (ascending).
     """
-    filtered_df = df[df['Exam_Score'] >= 85]
-
-    # Sort by exam score (descending) and record id (ascending)
-    sort_df = filtered_df.sort_values(by=['Exam_Score', 'Record_ID'], ascending=[False, True])
-
-    result_df = sort_df[['Record_ID', 'Hours_Studied', 'Exam_Score']]
+    analysis = as_analysis(df)
 
-    result_df = result_df.head(10) # Write only the top 10 results
+    # Sort by exam score (descending) and record id (ascending), keeping only the top 10 results.
+    # Students scoring 85+ are a prefix of the shared ranking, so the top 10 of them are within its first 10 rows.
+    ranked = analysis.ranked(k)
+    result_df = ranked.loc[FILTERS['score_85_or_higher'](ranked), ['Record_ID', 'Hours_Studied', 'Exam_Score']]
 
     return result_df
 
 
 
-def task_3(df: pd.DataFrame) -> pd.DataFrame:
+def task_3(df: Union[pd.DataFrame, Analysis]) -> pd.DataFrame:
     """
     Function for Task #3 that filters students with perfect attendance who participate in extracurricular activities.
 
         Parameters
         -------
-        df (pd.DataFrame): Input DataFrame imported from the pandas library that contains data from our given dataset.
+        df (pd.DataFrame | Analysis): Input DataFrame that contains data from our given dataset, or an Analysis over it.
 
         Returns
         -------
         result_df: Variable that filters Record_ID and Exam_Score for students with 100% attendance and excurriculars. 
     """
-    filtered_df = df[(df['Attendance'] == 100) & (df['Extracurricular_Activities'] == 'Yes')]
-    
     # Selected columns in the dataset for output
-    result_df = filtered_df[['Record_ID', 'Exam_Score']]
+    result_df = as_analysis(df).rows('perfect_attendance_extracurricular', ['Record_ID', 'Exam_Score'])
     
     return result_df
 
 
 
-def task_4(df: pd.DataFrame) -> pd.DataFrame:
+# Largest key domain the counting kernels accept (keys 0 .. SMALL_DOMAIN - 1)
+SMALL_DOMAIN = 1 << 16
+
+
+
+def is_small_domain(values: np.ndarray) -> bool:
+    """
+    True for integer arrays whose values all lie in 0 .. SMALL_DOMAIN - 1, which can index dense count arrays.
+    """
+    return values.dtype.kind in "iu" and (len(values) == 0 or (values.min() >= 0 and values.max() < SMALL_DOMAIN))
+
+
+
+class CountingAggregate:
+    """
+    Group-by kernel for keys from a small integer domain (exam scores, attendance, sleep hours, ...): per-key
+    count, sum, min and max of a column, kept in dense arrays indexed by the key and accumulated with
+    np.bincount instead of hashing.
+
+        - Aggregates of different chunks or shards merge by adding the counts and sums and keeping the smaller
+          minimum / larger maximum.
+        - regroup() folds the keys into coarser groups through a lookup table (e.g. score -> grade code), so the
+          per-row work never depends on the groups.
+        - Missing values are skipped, like pandas' count/sum/min/max.
     """
-    Function for Task #4 that calculates the average attendance for each letter grade.
 
+    def __init__(self, size: int, extremes: bool = True) -> None:
+        """
         Parameters
         -------
-        df (pd.DataFrame): Input DataFrame imported from the pandas library that contains data from our given dataset.
+        size (int): Number of keys (keys are 0 .. size - 1).
+        extremes (bool, optional): Also track min and max (the ufunc.at updates cost more than the bincounts).
+        """
+        self.extremes = extremes
+        self.count = np.zeros(size, dtype=np.int64)
+        self.sum = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
 
-        Returns
-        -------
-        result_df: Variable with the average attendance for each letter grade, sorted from highest (A+) 
-        to lowest (D). F is included, but not printed.
-    """
+    def update(self, keys: np.ndarray, values: np.ndarray) -> None:
+        """
+        Folds in rows given by their key and value.
+        """
+        keys = np.asarray(keys)
+        values = np.asarray(values)
+        if values.dtype.kind == 'f':
+            present = ~np.isnan(values)
+            keys, values = keys[present], values[present]
+        size = len(self.count)
+        if len(keys) and (keys.min() < 0 or keys.max() >= size):
+            raise ValueError(f"keys must lie in 0 .. {size - 1}")
+
+        self.count += np.bincount(keys, minlength=size)
+        self.sum += np.bincount(keys, weights=values, minlength=size)
+        if self.extremes:
+            # ufunc.at only takes its fast path when the values already have the accumulator's dtype
+            values = values.astype(float, copy=False)
+            np.minimum.at(self.min, keys, values)
+            np.maximum.at(self.max, keys, values)
 
-    def letter_grade(score: float) -> str:
+    def merge(self, other: "CountingAggregate") -> None:
         """
-        Converts exam score to letter grade using UVic scale.
+        Folds another aggregate into this one, as if its rows had been passed to update() too.
 
             Parameters
             -------
-            score (float): Numerical exam score
+            other (CountingAggregate): Aggregate of the same column over other rows (it is left as is). Its key
+                                       domain may differ; this one grows to the larger of the two.
 
-            Returns
-            -------
-            str: Letter grade corresponding to a given score
-        """
-        if 90 <= score <= 101:
-            return 'A+'
-        elif 85 <= score <= 89:
-            return 'A'
-        elif 80 <= score <= 84:
-            return 'A-'
-        elif 77 <= score <= 79:
-            return 'B+'
-        elif 73 <= score <= 76:
-            return 'B'
-        elif 70 <= score <= 72:
-            return 'B-'
-        elif 65 <= score <= 69:
-            return 'C+'
-        elif 60 <= score <= 64:
-            return 'C'
-        elif 50 <= score <= 59:
-            return 'D'
-        else:
-            return 'F'
-    
-    df['Grade'] = df['Exam_Score'].apply(letter_grade)
+            - Counts and sums add up and min/max keep the smaller/larger value per key, so merging is associative
+              and commutative: chunks and shards can be merged in any order.
+            - No mean is stored; frame() recomputes it as sum / count of the merged totals.
+            - min/max are only kept when both aggregates track them.
+        """
+        self.grow(len(other.count))
+        keys = slice(0, len(other.count))
+        self.count[keys] += other.count
+        self.sum[keys] += other.sum
+        self.extremes = self.extremes and other.extremes
+        if self.extremes:
+            np.minimum(self.min[keys], other.min, out=self.min[keys])
+            np.maximum(self.max[keys], other.max, out=self.max[keys])
 
-    # Group by grade and calculate mean attendance for each grade
-    result_df = df.groupby('Grade')['Attendance'].mean().reset_index()
+    def grow(self, size: int) -> None:
+        """
+        Widens the key domain to 0 .. size - 1 (the new keys start empty); a smaller size changes nothing.
+        """
+        extra = size - len(self.count)
+        if extra > 0:
+            self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+            self.sum = np.concatenate([self.sum, np.zeros(extra)])
+            self.min = np.concatenate([self.min, np.full(extra, np.inf)])
+            self.max = np.concatenate([self.max, np.full(extra, -np.inf)])
 
-    result_df['Attendance'] = result_df['Attendance'].round(1)
+    def regroup(self, lookup: np.ndarray, size: int) -> "CountingAggregate":
+        """
+        Aggregate over coarser groups: key j is folded into group lookup[j] (one of 0 .. size - 1).
+        """
+        grouped = CountingAggregate(size, self.extremes)
+        grouped.count = np.bincount(lookup, weights=self.count, minlength=size).astype(np.int64)
+        grouped.sum = np.bincount(lookup, weights=self.sum, minlength=size)
+        if self.extremes:
+            np.minimum.at(grouped.min, lookup, self.min)
+            np.maximum.at(grouped.max, lookup, self.max)
+        return grouped
 
-    sort_grade = ['A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'D']
+    def frame(self, labels: Optional[List[Hashable]] = None) -> pd.DataFrame:
+        """
+        The aggregates as a DataFrame ('count', 'sum', 'mean', 'min', 'max' columns; NaN mean/min/max for
+        empty groups), indexed by labels (or the keys).
+        """
+        empty = self.count == 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(empty, np.nan, self.sum / self.count)
+        columns = {'count': self.count, 'sum': self.sum, 'mean': mean}
+        if self.extremes:
+            columns['min'] = np.where(empty, np.nan, self.min)
+            columns['max'] = np.where(empty, np.nan, self.max)
+        return pd.DataFrame(columns, index=labels)
 
-    result_df = result_df[result_df['Grade'].isin(sort_grade)]
 
-    result_df = result_df.set_index('Grade').reindex(sort_grade).reset_index()
 
-    return result_df
-    
+def counting_aggregate(keys: pd.Series, values: pd.Series, extremes: bool = True) -> Optional[CountingAggregate]:
+    """
+    CountingAggregate of values grouped by a bounded integer column (e.g. Attendance, Sleep_Hours,
+    Physical_Activity), or None when the keys are not a small non-negative integer domain.
+    """
+    keys = keys.to_numpy()
+    if not is_small_domain(keys):
+        return None
+    aggregate = CountingAggregate(int(keys.max()) + 1 if len(keys) else 1, extremes)
+    aggregate.update(keys, values.to_numpy())
+    return aggregate
+
 
 
-def task_5(df: pd.DataFrame) -> pd.DataFrame:
+class ThresholdIndex:
+    """
+    One-pass summary of a column that answers "how many rows lie above threshold t, and what is their
+    Exam_Score total" for any number of thresholds with lookups instead of a scan per threshold.
+
+        - Small non-negative integer columns (every score/hour/attendance column here) are summarized by a
+          cumulative histogram (np.bincount); any other column by a sorted copy searched with np.searchsorted.
+        - Missing values never pass a threshold, like the comparisons in FILTERS.
     """
-    Function that calculates the average number of tutoring sessions for each grade group.
 
+    def __init__(self, values: pd.Series, weights: pd.Series) -> None:
+        """
         Parameters
         -------
-        df (pd.DataFrame): Input DataFrame imported from the pandas library that contains data from our given dataset.
+        values (pd.Series): Column the thresholds apply to.
+        weights (pd.Series): Column summed over the passing rows (Exam_Score).
+        """
+        present = values.notna().to_numpy()
+        values = values.to_numpy()[present]
+        weights = weights.to_numpy()[present].astype(float)
 
-        Returns
-        -------
-        result_df: Variable that analyzes the number of tutoring sessions for the top 50 students (by exam score)
-    """
-    def secondary_grade_scale(score: float) -> str:
+        self.size = len(values)
+        self.weight_total = weights.sum()
+        self.histogram = is_small_domain(values)
+        if self.histogram:
+            # cumulative[j] rows (and cumulative_weight[j] of weight) have a value below j
+            counts = np.bincount(values, minlength=1)
+            sums = np.bincount(values, weights=weights, minlength=1)
+        else:
+            # cumulative[j] rows have a value below sorted_values[j]
+            order = np.argsort(values, kind='stable')
+            self.sorted_values = values[order]
+            counts = np.ones(self.size, dtype=np.int64)
+            sums = weights[order]
+        self.cumulative = np.concatenate([[0], np.cumsum(counts)])
+        self.cumulative_weight = np.concatenate([[0.0], np.cumsum(sums)])
+
+    def above(self, thresholds: List[float], inclusive: bool = False) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Converts exam score to a simplified letter grade (A-F), much like Task #4.
+        Number of rows whose value is above each threshold, and the total of their weights.
 
             Parameters
             -------
-            score (float): Numerical exam score.
+            thresholds (List[float]): Thresholds to evaluate.
+            inclusive (bool, optional): Count values equal to the threshold too (>= instead of >).
 
             Returns
             -------
-            str: Simplified letter grades (A, B, C, D, F)
+            Tuple[np.ndarray, np.ndarray]: Row counts and weight totals, one per threshold.
         """
-        if 80 <= score <= 101:
-            return 'A'
-        elif 70 <= score <= 79:
-            return 'B'
-        elif 60 <= score <= 69:
-            return 'C'
-        elif 50 <= score <= 59:
-            return 'D'
+        thresholds = np.asarray(thresholds, dtype=float)
+        if self.histogram:
+            # Rows below the first integer that passes: value >= ceil(t) (inclusive) or value >= floor(t) + 1
+            first = np.ceil(thresholds) if inclusive else np.floor(thresholds) + 1
+            below = np.clip(first, 0, len(self.cumulative) - 1).astype(np.int64)
         else:
-            return 'F'
-    
-    # Creates a copy of columns to not modify the initial dataframe - I was encountering errors. This was a quick fix.
-    result_df = df[['Record_ID', 'Tutoring_Sessions', 'Exam_Score']].copy()
+            below = np.searchsorted(self.sorted_values, thresholds, side='left' if inclusive else 'right')
+        return self.size - self.cumulative[below], self.weight_total - self.cumulative_weight[below]
 
-    result_df['Grade'] = df['Exam_Score'].apply(secondary_grade_scale)
 
-    # Calculates average tutoring sessions per grade grouping
-    grade_avg = df.groupby(df['Exam_Score'].apply(secondary_grade_scale))['Tutoring_Sessions'].mean().round(1)
-    grade_avg_dict = grade_avg.to_dict()
 
-    # Adds a column with grade average tutoring sessions
-    result_df['Grade_Average_Tutoring_Sessions'] = result_df['Grade'].map(grade_avg_dict)
-    result_df['Above_Average'] = result_df['Tutoring_Sessions'] > result_df['Grade_Average_Tutoring_Sessions']
+def threshold_curve(index: ThresholdIndex, thresholds: List[float], inclusive: bool) -> pd.DataFrame:
+    """
+    Sensitivity curve of a filter: per threshold, the number of students passing it and their average exam score.
+    """
+    counts, sums = index.above(thresholds, inclusive)
+    average = pd.Series(sums / np.where(counts > 0, counts, np.nan)).round(1)
+    return pd.DataFrame({'Threshold': thresholds, 'Students': counts, 'Average_Exam_Score': average})
 
-    # Sets the column order
-    result_df = result_df[['Record_ID', 'Tutoring_Sessions', 'Grade_Average_Tutoring_Sessions', 'Above_Average', 'Exam_Score', 'Grade']]
-    result_df = result_df.sort_values(by=['Exam_Score', 'Record_ID'], ascending=[False, True])
 
-    result_df = result_df.head(50) # Top 50 results
 
-    return result_df
+def sweep_task_1(df: Union[pd.DataFrame, Analysis], thresholds: List[float]) -> pd.DataFrame:
+    """
+    Sensitivity curve of Task #1's filter over many Hours_Studied thresholds at once (--thresholds).
+
+        Returns
+        -------
+        pd.DataFrame: One row per threshold t (Threshold, Students, Average_Exam_Score): how many students
+                      studied more than t hours and their mean Exam_Score.
 
+        - An aggregate curve, not Task #1's rows: at Threshold 40, Students is the number of rows Task #1 returns
+          and Average_Exam_Score their mean score.
+    """
+    return threshold_curve(as_analysis(df).threshold_index('Hours_Studied'), thresholds, inclusive=False)
 
-def write_output(df: pd.DataFrame, output_file: str = "output.csv") -> None:
-     """
-     Function that uses pandas DataFrame to generate a CSV file.
 
-        Parameters:
+
+def sweep_task_2(df: Union[pd.DataFrame, Analysis], thresholds: List[float], k: int = 10) -> pd.DataFrame:
+    """
+    Task #2 over many Exam_Score thresholds at once (--thresholds): the top k students scoring t or higher, for
+    every threshold t, stacked with a leading Threshold column (Threshold 85 matches Task #2).
+
+        - The students scoring t or higher are a prefix of the shared ranking, so each threshold is a slice of
+          the one ranking found by a binary search on its (descending) scores.
+    """
+    ranked = as_analysis(df).ranked(k)
+    scores = -ranked['Exam_Score'].to_numpy(dtype=float)  # Ascending, as np.searchsorted wants
+
+    parts = []
+    for threshold in thresholds:
+        part = ranked.head(int(np.searchsorted(scores, -threshold, side='right')))
+        parts.append(part.loc[:, ['Record_ID', 'Hours_Studied', 'Exam_Score']].assign(Threshold=threshold))
+    result_df = pd.concat(parts) if parts else ranked.loc[:, ['Record_ID', 'Hours_Studied', 'Exam_Score']].head(0)
+    return result_df.reindex(columns=['Threshold', 'Record_ID', 'Hours_Studied', 'Exam_Score'])
+
+
+
+def sweep_task_3(df: Union[pd.DataFrame, Analysis], thresholds: List[float]) -> pd.DataFrame:
+    """
+    Sensitivity curve of Task #3's filter over many Attendance thresholds at once (--thresholds).
+
+        Returns
         -------
-        df(pd.DataFrame): DataFrame containing the given dataset to write to CSV.
-        output_file (str, optional): Output file path that defaults to output.csv (as per instructions).
-     """
+        pd.DataFrame: One row per threshold t (Threshold, Students, Average_Exam_Score): how many extracurricular
+                      students have an Attendance of t or higher and their mean Exam_Score.
 
-     df.to_csv(output_file, index=False)
+        - An aggregate curve, not Task #3's rows. The test is Attendance >= t, not Task #3's Attendance == 100,
+          so that the curve covers "at least t" attendance; at Threshold 100 both select the same students only
+          because Attendance never exceeds 100.
+    """
+    return threshold_curve(as_analysis(df).threshold_index('Attendance', 'extracurricular'), thresholds, inclusive=True)
 
 
 
-def parse_arguments() -> int:
+def grade_totals(df: pd.DataFrame, scale: GradeScale, column: str, grades: Optional[pd.Series] = None) -> pd.DataFrame:
     """
-    Error-Handling function that parses command line arguments to extract the task number.
+    Sums and counts a column per grade of a grading scale.
+
+        Parameters
+        -------
+        df (pd.DataFrame): Rows to aggregate; must contain Exam_Score and the given column.
+        scale (GradeScale): Scale used to grade Exam_Score.
+        column (str): Column to total up (e.g. Attendance).
+        grades (pd.Series, optional): scale.assign() of df's scores, when it has already been computed.
 
         Returns
         -------
-        int: Task number from command line
+        pd.DataFrame: 'sum' and 'count' columns indexed by every grade of the scale (zero for absent grades).
 
-        - Not entirely necessary, but good for covering all bases in case of errors (for debugging, primarily)
+        - Totals from different parts of the dataset can simply be added together.
+        - Integer scores take the counting kernel: totals per distinct score (np.bincount), folded into grades
+          through a score -> grade lookup table. Other scores (e.g. with missing values) use a pandas groupby.
     """
-    
-    # Check if arguments were provided
-    if len(sys.argv) < 2:
-        print("Usage: python spf_analyzer.py --TASK=\"<task_number>\"")
-        sys.exit(1)
-        
-    for arg in sys.argv[1:]:
-        if arg.startswith("--TASK="):
-            try:
-                task_number = int(arg.split("=")[1].strip('"'))
-                return task_number
-            except ValueError:
-                print("Error: Task number must be an integer")
-                sys.exit(1)
-    
-    print("Error: --TASK argument not found")
-    sys.exit(1)
-               
+    aggregate = counting_aggregate(df['Exam_Score'], df[column], extremes=False)
+    if aggregate is not None:
+        lookup = scale.codes(np.arange(len(aggregate.count)))
+        totals = aggregate.regroup(lookup, len(scale.categories)).frame(scale.categories)[['sum', 'count']]
+        if df[column].dtype.kind in "iu":
+            totals['sum'] = totals['sum'].astype(np.int64)
+        return totals
 
+    if grades is None:
+        grades = scale.assign(df['Exam_Score'])
+    totals = df[column].groupby(grades, observed=False).agg(['sum', 'count'])
+    return totals.reindex(scale.categories, fill_value=0)
 
 
-def main():
+
+def grade_means(totals: pd.DataFrame) -> pd.Series:
     """
-    Main entry point of the program.
+    Turns the output of grade_totals() into the per-grade mean, rounded to one decimal (NaN for absent grades).
+    """
+    return (totals['sum'] / totals['count'].where(totals['count'] > 0)).round(1)
+
+
+
+def task_4_result(totals: pd.DataFrame) -> pd.DataFrame:
+    """
+    Builds the Task #4 table from the per-grade attendance totals.
+
+        Parameters
+        -------
+        totals (pd.DataFrame): grade_totals() of Attendance on the UVic scale.
+
+        Returns
+        -------
+        result_df: Average attendance for each letter grade, sorted from highest (A+) to lowest (D).
+    """
+    sort_grade = ['A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'D']
+
+    means = grade_means(totals)
+
+    result_df = pd.DataFrame({'Grade': sort_grade, 'Attendance': means.reindex(sort_grade).to_numpy()})
+
+    return result_df
+
+
+
+def task_4(df: Union[pd.DataFrame, Analysis]) -> pd.DataFrame:
+    """
+    Function for Task #4 that calculates the average attendance for each letter grade.
+
+        Parameters
+        -------
+        df (pd.DataFrame | Analysis): Input DataFrame that contains data from our given dataset, or an Analysis over it.
+
+        Returns
+        -------
+        result_df: Variable with the average attendance for each letter grade, sorted from highest (A+) 
+        to lowest (D). F is included, but not printed.
+    """
+    # Group by grade and calculate mean attendance for each grade
+    return task_4_result(as_analysis(df).totals(UVIC_SCALE, 'Attendance'))
     
-        - Reads the dataset and executes the specified task in the command line.
-        - Writes results into output.csv
-        - Exits with error if an invalid task number is written
+
+
+def task_5_result(candidates: pd.DataFrame, totals: pd.DataFrame, k: int = 50) -> pd.DataFrame:
     """
-   
-    # Parse command line arguments for task number
-    task_number = parse_arguments()
+    Builds the Task #5 table from candidate rows and the per-grade tutoring totals of the whole dataset.
 
-    # Load the given DataFrame and its dataset
-    df = pd.read_csv("data/a2-data.csv")
+        Parameters
+        -------
+        candidates (pd.DataFrame): Record_ID, Tutoring_Sessions and Exam_Score of (at least) the top 50 students.
+        totals (pd.DataFrame): grade_totals() of Tutoring_Sessions on the simplified scale.
+        k (int, optional): Number of students to keep. Defaults to 50.
 
-    # Execute the requested task in command line
-    if task_number == 1:
-         result_df = task_1(df)
-         write_output(result_df)
-    elif task_number == 2:
-         result_df = task_2(df)
-         write_output(result_df)
-    elif task_number ==3:
-         result_df = task_3(df)
-         write_output(result_df)
+        Returns
+        -------
+        result_df: Tutoring sessions compared to the grade average for the top 50 students (by exam score).
+    """
+    # Creates a copy of columns to not modify the initial dataframe
+    result_df = top_k(candidates[['Record_ID', 'Tutoring_Sessions', 'Exam_Score']], k).copy() # Top 50 results
+
+    grades = SIMPLIFIED_SCALE.assign(result_df['Exam_Score'])
+    result_df['Grade'] = grades
+
+    # Adds a column with grade average tutoring sessions (looked up by grade code instead of a per-row dict map)
+    grade_avg = grade_means(totals)
+    result_df['Grade_Average_Tutoring_Sessions'] = grade_avg.to_numpy()[grades.cat.codes.to_numpy()]
+    result_df['Above_Average'] = result_df['Tutoring_Sessions'] > result_df['Grade_Average_Tutoring_Sessions']
+
+    # Sets the column order
+    result_df = result_df[['Record_ID', 'Tutoring_Sessions', 'Grade_Average_Tutoring_Sessions', 'Above_Average', 'Exam_Score', 'Grade']]
+
+    return result_df
+
+
+
+def task_5(df: Union[pd.DataFrame, Analysis], k: int = 50) -> pd.DataFrame:
+    """
+    Function that calculates the average number of tutoring sessions for each grade group.
+
+        Parameters
+        -------
+        df (pd.DataFrame | Analysis): Input DataFrame that contains data from our given dataset, or an Analysis over it.
+        k (int, optional): Number of students to keep (--top-k). Defaults to 50.
+
+        Returns
+        -------
+        result_df: Variable that analyzes the number of tutoring sessions for the top 50 students (by exam score)
+    """
+    analysis = as_analysis(df)
+
+    # Calculates average tutoring sessions per grade grouping over the whole dataset
+    totals = analysis.totals(SIMPLIFIED_SCALE, 'Tutoring_Sessions')
+
+    return task_5_result(analysis.ranked(k), totals, k)
+
+
+
+# --format values and the file suffix each one writes; "-" as --output means standard output
+OUTPUT_FORMATS = {"csv": ".csv", "csv.gz": ".csv.gz", "csv.zst": ".csv.zst", "parquet": ".parquet", "arrow": ".arrow"}
+OUTPUT_DEPENDENCIES = {"csv.zst": "zstandard", "parquet": "pyarrow", "arrow": "pyarrow"}
+STDOUT = "-"
+
+# Rows formatted and handed to csv.writer at a time
+CSV_WRITE_ROWS = 65_536
+
+
+
+def output_format_of(output_file: str) -> str:
+    """
+    Guesses the output format from a file name (e.g. results.csv.gz -> 'csv.gz'); plain CSV otherwise.
+    """
+    for output_format, suffix in sorted(OUTPUT_FORMATS.items(), key=lambda item: -len(item[1])):
+        if output_file.endswith(suffix):
+            return output_format
+    return "csv"
+
+
+
+def csv_quoted_characters() -> List[str]:
+    """
+    Characters that make csv.writer (and so DataFrame.to_csv()) quote a field; the line break rules differ
+    between Python versions, so they are asked from the csv module itself.
+    """
+    characters = []
+    for character in (',', '"', '\n', '\r'):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator=os.linesep).writerow(["a" + character, "b"])
+        if buffer.getvalue().startswith('"'):
+            characters.append(character)
+    return characters
+
+
+CSV_QUOTED_CHARACTERS = csv_quoted_characters()
+
+
+
+def csv_quote(fields: np.ndarray) -> np.ndarray:
+    """
+    Applies csv.QUOTE_MINIMAL to an array of strings (numpy StringDType).
+    """
+    special = np.zeros(len(fields), dtype=bool)
+    for character in CSV_QUOTED_CHARACTERS:
+        special |= np.strings.find(fields, character) >= 0
+    if special.any():
+        fields = fields.copy()
+        escaped = np.strings.replace(fields[special], '"', '""')
+        fields[special] = np.strings.add(np.strings.add('"', escaped), '"')
+    return fields
+
+
+
+def csv_columns(df: pd.DataFrame) -> Optional[List[np.ndarray]]:
+    """
+    Preformats every column of a result as CSV fields, exactly the way DataFrame.to_csv() would print them.
+
+        Returns
+        -------
+        List[np.ndarray]: One array of strings per column, or None if a column has a dtype with no fast path
+                          (or numpy is older than 2.0, which has no StringDType/np.strings).
+
+        - 8-bit integers and booleans (most of this dataset) are looked up in a table of their formatted values;
+          categoricals and text columns format and quote each distinct value once and take them by code. Other
+          numbers are converted with one astype() per column. Missing values become empty fields, like to_csv().
+    """
+    if not hasattr(np, "strings"):
+        return None  # numpy 1.x: OutputWriter falls back to DataFrame.to_csv()
+    text = np.dtypes.StringDType()
+    columns = []
+    for name in df.columns:
+        values = df[name]
+        if isinstance(values.dtype, pd.CategoricalDtype) or values.dtype.kind in "OT":
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, labels = values.cat.codes.to_numpy(), values.cat.categories
+                if labels.dtype.kind not in "OTUiuf":
+                    return None
+            elif pd.api.types.infer_dtype(values, skipna=True) in ("string", "empty"):
+                codes, labels = pd.factorize(values)
+            else:
+                return None
+            labels = np.append(labels.astype(str).to_numpy(dtype=object), "").astype(text)
+            columns.append(np.array(csv_quote(labels).tolist())[codes])  # Code -1 (missing) picks the trailing ""
+        elif values.dtype in (np.uint8, np.int8, np.bool_):
+            table = np.arange(256, dtype=np.uint8).view(values.dtype).astype(str)
+            columns.append(table[values.to_numpy().view(np.uint8)])
+        elif not isinstance(values.dtype, np.dtype):
+            return None  # Nullable extension dtypes (Int64, Float64, ...) print <NA> through numpy
+        elif values.dtype.kind in "iu":
+            columns.append(values.to_numpy().astype(text))
+        elif values.dtype.kind == "f":
+            fields = values.to_numpy().astype(text)
+            fields[values.isna().to_numpy()] = ""
+            columns.append(fields)
+        else:
+            return None
+
+    # csv.writer quotes an empty field when it is the whole row
+    if len(columns) == 1:
+        columns[0] = np.where(columns[0] == "", '""', columns[0]).astype(text)
+    return columns
+
+
+
+class OutputWriter:
+    """
+    Writes a result table, in one go or chunk by chunk, as CSV (optionally gzip/zstd compressed), Parquet
+    or Arrow IPC.
+
+        - Parquet and Arrow are written as a sequence of row groups/record batches, so a filter streaming its
+          matches (--stream) never holds the whole result; an Arrow file can be memory-mapped by the next
+          pipeline stage with pyarrow.ipc.open_file(pyarrow.memory_map(path)) instead of being parsed.
+        - On standard output Arrow uses the IPC stream format, since the file format needs a footer at the end
+          that readers look up by seeking.
+        - zstandard and pyarrow are optional and only imported for the formats that need them.
+    """
+
+    def __init__(self, output_file: str, output_format: Optional[str] = None) -> None:
+        """
+        Parameters
+        -------
+        output_file (str): Output path, or "-" for standard output.
+        output_format (str, optional): One of OUTPUT_FORMATS; guessed from output_file when omitted.
+        """
+        self.output_file = output_file
+        self.output_format = output_format or output_format_of(output_file)
+        self.stream = None
+        self.writer = None
+        self.header_written = False
+
+    def open_binary(self):
+        """
+        Binary sink of the output (the file itself, or the raw standard output).
+        """
+        if self.output_file == STDOUT:
+            sys.stdout.flush()
+            return sys.stdout.buffer
+        return open(self.output_file, "wb")
+
+    def open_text(self):
+        """
+        Text stream the CSV formats write into (compressed on the fly for csv.gz/csv.zst).
+        """
+        if self.output_format == "csv":
+            if self.output_file == STDOUT:
+                return sys.stdout
+            return open(self.output_file, "w", newline='')
+
+        sink = self.open_binary()
+        if self.output_format == "csv.gz":
+            binary = gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=6)
+        else:
+            zstandard = importlib.import_module("zstandard")
+            binary = zstandard.ZstdCompressor().stream_writer(sink, closefd=sink is not sys.stdout.buffer)
+        return io.TextIOWrapper(binary, newline='')
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Appends the rows of df (the first call also writes the CSV header or fixes the binary schema).
+        """
+        if self.output_format in ("parquet", "arrow"):
+            self.write_arrow(df)
+            return
+
+        if self.stream is None:
+            self.stream = self.open_text()
+        columns = csv_columns(df.iloc[:CSV_WRITE_ROWS])
+        if columns is None or len(df.columns) == 0:
+            df.to_csv(self.stream, index=False, header=not self.header_written)
+            self.header_written = True
+            return
+
+        if not self.header_written:
+            csv.writer(self.stream, lineterminator=os.linesep).writerow(df.columns)
+            self.header_written = True
+        for start in range(0, len(df), CSV_WRITE_ROWS):
+            if start > 0:
+                columns = csv_columns(df.iloc[start:start + CSV_WRITE_ROWS])
+            lines = columns[0]
+            for column in columns[1:]:
+                lines = np.strings.add(np.strings.add(lines, ","), column)
+            self.stream.write("".join(np.strings.add(lines, os.linesep).tolist()))
+
+    def write_arrow(self, df: pd.DataFrame) -> None:
+        """
+        Appends df as one more Parquet row group or Arrow record batch.
+        """
+        pa = importlib.import_module("pyarrow")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.stream = self.open_binary()
+            if self.output_format == "parquet":
+                self.writer = importlib.import_module("pyarrow.parquet").ParquetWriter(self.stream, table.schema)
+            elif self.output_file == STDOUT:
+                self.writer = pa.ipc.new_stream(self.stream, table.schema)
+            else:
+                self.writer = pa.ipc.new_file(self.stream, table.schema)
+        self.writer.write_table(table.cast(self.writer.schema) if self.output_format == "parquet" else table)
+
+    def close(self) -> None:
+        """
+        Finishes the output (Parquet/Arrow footers, compression trailers); standard output stays open.
+        """
+        if self.writer is not None:
+            self.writer.close()
+        if self.stream is None:
+            return
+        if self.stream in (sys.stdout, sys.stdout.buffer):
+            self.stream.flush()
+        else:
+            self.stream.close()  # The gzip/zstd wrappers of standard output leave it open
+
+
+
+def write_output(df: pd.DataFrame, output_file: str = "output.csv", output_format: Optional[str] = None) -> None:
+     """
+     Function that uses pandas DataFrame to generate a CSV file (or one of the other OUTPUT_FORMATS).
+
+        Parameters:
+        -------
+        df(pd.DataFrame): DataFrame containing the given dataset to write to CSV.
+        output_file (str, optional): Output file path that defaults to output.csv (as per instructions); "-" for stdout.
+        output_format (str, optional): Format to write; guessed from the file name when omitted.
+     """
+
+     writer = OutputWriter(output_file, output_format)
+     writer.write(df)
+     writer.close()
+
+
+
+# Saved incremental states and sketches: named plain arrays in an .npz archive, never pickles
+def plain_array(values: np.ndarray) -> np.ndarray:
+    """
+    values as an array that np.save can store without pickling: unchanged, or strings as a unicode array.
+    """
+    if values.dtype.kind != "O":
+        return values
+    if not all(isinstance(value, str) for value in values):
+        raise ValueError("only numeric and text columns can be saved")
+    return values.astype(str)
+
+
+
+def frame_arrays(df: Optional[pd.DataFrame], prefix: str) -> Dict[str, np.ndarray]:
+    """
+    Plain arrays of a DataFrame for a saved state or sketch file: its column names, its index and one array per
+    column, under '<prefix>.columns', '<prefix>.index' and '<prefix>.<position>' (nothing at all for None).
+
+        - Text (e.g. a grade index) becomes a fixed-width unicode array; any other Python object raises ValueError,
+          since it could only be stored as a pickle.
+    """
+    if df is None:
+        return {}
+    arrays = {f"{prefix}.columns": np.array([str(name) for name in df.columns]),
+              f"{prefix}.index": plain_array(df.index.to_numpy())}
+    for position, name in enumerate(df.columns):
+        arrays[f"{prefix}.{position}"] = plain_array(df[name].to_numpy())
+    return arrays
+
+
+
+def arrays_frame(arrays: Dict[str, np.ndarray], prefix: str) -> Optional[pd.DataFrame]:
+    """
+    Rebuilds the DataFrame stored by frame_arrays() (None if there was none).
+    """
+    if f"{prefix}.columns" not in arrays:
+        return None
+    columns = arrays[f"{prefix}.columns"].tolist()
+    return pd.DataFrame({name: arrays[f"{prefix}.{position}"] for position, name in enumerate(columns)},
+                        index=arrays[f"{prefix}.index"], columns=columns)
+
+
+
+def prefixed(prefix: str, arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Puts every key of arrays under '<prefix>.' (the arrays of one partial inside a larger file).
+    """
+    return {f"{prefix}.{key}": value for key, value in arrays.items()}
+
+
+
+def unprefixed(prefix: str, arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    The arrays stored under '<prefix>.', with the prefix taken off their keys (the reverse of prefixed()).
+    """
+    return {key[len(prefix) + 1:]: value for key, value in arrays.items() if key.startswith(prefix + ".")}
+
+
+
+def write_arrays(file_name: str, arrays: Dict[str, np.ndarray]) -> None:
+    """
+    Writes named arrays to an uncompressed .npz archive, atomically (a crash never leaves a truncated file behind).
+
+        - Object arrays are refused: they would be pickled, and loading a pickle can run arbitrary code.
+    """
+    arrays = {key: np.asarray(value) for key, value in arrays.items()}
+    if any(value.dtype.kind == "O" for value in arrays.values()):
+        raise ValueError("only numeric and text arrays can be saved")
+
+    temp_file = file_name + ".tmp"
+    with open(temp_file, "wb") as file:
+        np.savez(file, **arrays)
+    os.replace(temp_file, file_name)
+
+
+
+def read_arrays(file_name: str) -> Dict[str, np.ndarray]:
+    """
+    Reads every array of a write_arrays() archive, refusing pickled data (allow_pickle=False).
+
+        - Raises OSError, ValueError or zipfile.BadZipFile when the file is missing, not an archive or holds pickles.
+    """
+    with np.load(file_name, allow_pickle=False) as archive:
+        if not isinstance(archive, np.lib.npyio.NpzFile):
+            raise ValueError(f"{file_name} is not an .npz archive")
+        return {key: archive[key] for key in archive.files}
+
+
+
+def params_json(params: Dict[int, Dict]) -> str:
+    """
+    task_parameters() of several tasks as canonical JSON (task numbers as string keys), for saved files.
+    """
+    return json.dumps({str(task_number): task_params for task_number, task_params in params.items()}, sort_keys=True)
+
+
+
+class TaskPartial(ABC):
+    """
+    Mergeable partial result of a task over part of the dataset (a chunk, a shard, ...).
+
+        - update() folds in more rows, merge() combines two partials of the same task, result() builds the
+          final table. Every subclass keeps a bounded amount of state, except the row filters when they are
+          not streaming to a file.
+        - Contract the chunked, sharded and incremental runs rely on: merge() is associative, and splitting
+          the rows into parts, updating one partial per part and merging the partials in the order of the
+          parts gives the same result() as one partial updated with every row. Only the row filters depend
+          on that order (their rows come out in merge order); the aggregates and top-k are also commutative.
+    """
+
+    @abstractmethod
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Folds more rows of the dataset into the partial.
+
+            Parameters
+            -------
+            chunk (pd.DataFrame): Rows to add, with at least the columns the task needs; may be empty.
+        """
+
+    @abstractmethod
+    def merge(self, other: "TaskPartial") -> None:
+        """
+        Folds another partial of the same task into this one, as if this partial had also seen its rows.
+
+            Parameters
+            -------
+            other (TaskPartial): Partial of the same task built over rows that come after this one's rows;
+                                 it is left as is.
+        """
+
+    @abstractmethod
+    def result(self) -> pd.DataFrame:
+        """
+        Builds the final table of the task from the rows seen so far (the partial can still be updated after).
+
+            Returns
+            -------
+            pd.DataFrame: Same table the task function gives when run on all of those rows at once.
+        """
+
+    def get_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Data held by the partial as named plain arrays, for a saved state or sketch (see write_arrays()).
+
+            Returns
+            -------
+            Dict[str, np.ndarray]: Arrays that set_arrays() restores; only the partials of INCREMENTAL_TASKS and
+                                   APPROX_TASKS can be saved (the others raise NotImplementedError).
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot be saved")
+
+    def set_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        Restores the arrays of get_arrays() into a partial freshly made for the same task and parameters.
+
+            Parameters
+            -------
+            arrays (Dict[str, np.ndarray]): Value returned by get_arrays().
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot be saved")
+
+
+
+class FilterPartial(TaskPartial):
+    """
+    Partial result of a row filter (Tasks #1 and #3): the matching rows, or nothing at all when the rows are
+    appended straight to an output file as they are found.
+    """
+
+    def __init__(self, task, output_file: Optional[str] = None, output_format: Optional[str] = None) -> None:
+        """
+        Parameters
+        -------
+        task: Filter function, e.g. task_1.
+        output_file (str, optional): When given, matching rows are appended to this output instead of kept in memory.
+        output_format (str, optional): Format of output_file (see OutputWriter).
+        """
+        self.task = task
+        self.writer = OutputWriter(output_file, output_format) if output_file is not None else None
+        self.parts = []
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Filters the chunk and keeps (or writes out) the rows that match.
+
+            Parameters
+            -------
+            chunk (pd.DataFrame): Rows to filter.
+        """
+        part = self.task(chunk)
+        if self.writer is None:
+            self.parts.append(part)
+        else:
+            self.writer.write(part)
+
+    def close(self) -> None:
+        """Finishes the streamed output file."""
+        if self.writer is not None:
+            self.writer.close()
+
+    def merge(self, other: "FilterPartial") -> None:
+        """
+        Appends the rows kept by other after this partial's rows (so partials must be merged in row order).
+
+            Parameters
+            -------
+            other (FilterPartial): Partial of the same filter over later rows.
+        """
+        self.parts.extend(other.parts)
+
+    def result(self) -> pd.DataFrame:
+        """
+        Returns
+        -------
+        pd.DataFrame: Every matching row, in the order it was found (empty when streaming to a file).
+        """
+        return pd.concat(self.parts)
+
+
+
+class TopKPartial(TaskPartial):
+    """
+    Partial result of a top-k task (Task #2): only the k best rows seen so far are kept.
+    """
+
+    def __init__(self, task, **params) -> None:
+        """
+        Parameters
+        -------
+        task: Top-k function whose result can be fed back into itself, e.g. task_2.
+        params: Extra keyword arguments for the task (e.g. k).
+        """
+        self.task = task
+        self.params = params
+        self.top = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Keeps the best k rows among the current top and the top of the chunk.
+
+            Parameters
+            -------
+            chunk (pd.DataFrame): Rows to rank.
+        """
+        part = self.task(chunk, **self.params)
+        self.top = part if self.top is None else self.task(pd.concat([self.top, part]), **self.params)
+
+    def merge(self, other: "TopKPartial") -> None:
+        """
+        Keeps the best k rows of both partials (the top of a union is the top of the tops).
+
+            Parameters
+            -------
+            other (TopKPartial): Partial of the same top-k task.
+        """
+        if other.top is not None:
+            self.update(other.top)
+
+    def result(self) -> pd.DataFrame:
+        """
+        Returns
+        -------
+        pd.DataFrame: The best k rows seen, ranked as the task ranks them (None before any update).
+        """
+        return self.top
+
+    def get_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        The best k rows as plain arrays (see TaskPartial.get_arrays()).
+        """
+        return frame_arrays(self.top, "top")
+
+    def set_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        Restores the arrays of get_arrays().
+        """
+        self.top = arrays_frame(arrays, "top")
+
+
+
+class GradeTotalsPartial(TaskPartial):
+    """
+    Partial result of Task #4: running sum and count of Attendance per UVic grade.
+    """
+
+    def __init__(self) -> None:
+        self.totals = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Adds the chunk's Attendance sum and count per grade to the running totals.
+
+            Parameters
+            -------
+            chunk (pd.DataFrame): Rows with Exam_Score and Attendance.
+        """
+        totals = grade_totals(chunk, UVIC_SCALE, 'Attendance')
+        self.totals = totals if self.totals is None else self.totals + totals
+
+    def merge(self, other: "GradeTotalsPartial") -> None:
+        """
+        Adds other's sums and counts per grade to this partial's (the means are only taken in result()).
+
+            Parameters
+            -------
+            other (GradeTotalsPartial): Partial of Task #4 over other rows.
+        """
+        if other.totals is not None:
+            self.totals = other.totals if self.totals is None else self.totals + other.totals
+
+    def result(self) -> pd.DataFrame:
+        """
+        Returns
+        -------
+        pd.DataFrame: Task #4 table (mean Attendance per grade) built from the totals.
+        """
+        return task_4_result(self.totals)
+
+    def get_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        The totals per grade as plain arrays (see TaskPartial.get_arrays()).
+        """
+        return frame_arrays(self.totals, "totals")
+
+    def set_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        Restores the arrays of get_arrays().
+        """
+        self.totals = arrays_frame(arrays, "totals")
+
+
+
+class TutoringPartial(TaskPartial):
+    """
+    Partial result of Task #5: running sum and count of Tutoring_Sessions per simplified grade, plus the
+    k (default 50) best candidate rows seen so far.
+    """
+
+    def __init__(self, k: int = 50) -> None:
+        self.k = k
+        self.totals = None
+        self.top = None
+
+    def _add(self, totals: pd.DataFrame, top: pd.DataFrame) -> None:
+        self.totals = totals if self.totals is None else self.totals + totals
+        self.top = top if self.top is None else top_k(pd.concat([self.top, top]), self.k)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Adds the chunk's Tutoring_Sessions totals per grade and keeps the k best candidate rows.
+
+            Parameters
+            -------
+            chunk (pd.DataFrame): Rows with Record_ID, Tutoring_Sessions and Exam_Score.
+        """
+        candidates = top_k(chunk[['Record_ID', 'Tutoring_Sessions', 'Exam_Score']], self.k)
+        self._add(grade_totals(chunk, SIMPLIFIED_SCALE, 'Tutoring_Sessions'), candidates)
+
+    def merge(self, other: "TutoringPartial") -> None:
+        """
+        Adds other's totals per grade to this partial's and keeps the k best candidates of both.
+
+            Parameters
+            -------
+            other (TutoringPartial): Partial of Task #5 over other rows.
+        """
+        if other.totals is not None:
+            self._add(other.totals, other.top)
+
+    def result(self) -> pd.DataFrame:
+        """
+        Returns
+        -------
+        pd.DataFrame: Task #5 table built from the candidates and the totals.
+        """
+        return task_5_result(self.top, self.totals, self.k)
+
+    def get_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        The totals per grade and the candidates as plain arrays (see TaskPartial.get_arrays()).
+        """
+        return {**frame_arrays(self.totals, "totals"), **frame_arrays(self.top, "top")}
+
+    def set_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        Restores the arrays of get_arrays().
+        """
+        self.totals = arrays_frame(arrays, "totals")
+        self.top = arrays_frame(arrays, "top")
+
+
+
+def make_partial(task_number: int, output_file: Optional[str] = None, output_format: Optional[str] = None,
+                 **params) -> TaskPartial:
+    """
+    Creates an empty partial result for a task.
+
+        Parameters
+        -------
+        task_number (int): Task the partial belongs to.
+        output_file (str, optional): Output that row filters (Tasks #1 and #3) append to while streaming.
+        output_format (str, optional): Format of output_file.
+        params: Task parameters from task_parameters() (e.g. k for Tasks #2 and #5).
+
+        Returns
+        -------
+        TaskPartial: Empty partial result for the task.
+    """
+    if task_number == 1:
+        return FilterPartial(task_1, output_file, output_format)
+    elif task_number == 2:
+        return TopKPartial(task_2, **params)
+    elif task_number == 3:
+        return FilterPartial(task_3, output_file, output_format)
+    elif task_number == 4:
+        return GradeTotalsPartial()
+    elif task_number == 5:
+        return TutoringPartial(**params)
+    raise ValueError(f"Unknown task: {task_number}")
+
+
+
+# Default dataset location and the version of the binary cache layout written next to it
+DATA_FILE = "data/a2-data.csv"
+CACHE_VERSION = 2
+
+
+# Declared dtypes of the dataset columns: compact integer widths for the small counts and scores,
+# categoricals for the text fields (including the Yes/No ones, so comparisons with 'Yes' keep working)
+SCHEMA = {
+    'Record_ID': 'int32',
+    'Hours_Studied': 'uint8',
+    'Attendance': 'uint8',
+    'Parental_Involvement': 'category',
+    'Access_to_Resources': 'category',
+    'Extracurricular_Activities': 'category',
+    'Sleep_Hours': 'uint8',
+    'Previous_Scores': 'uint8',
+    'Motivation_Level': 'category',
+    'Internet_Access': 'category',
+    'Tutoring_Sessions': 'uint8',
+    'Family_Income': 'category',
+    'Teacher_Quality': 'category',
+    'School_Type': 'category',
+    'Peer_Influence': 'category',
+    'Physical_Activity': 'uint8',
+    'Learning_Disabilities': 'category',
+    'Parental_Education_Level': 'category',
+    'Distance_from_Home': 'category',
+    'Gender': 'category',
+    'Exam_Score': 'uint8',
+}
+
+
+
+def parse_dtypes(integers: bool = True) -> Dict[str, str]:
+    """
+    dtype mapping handed to pd.read_csv for the SCHEMA columns.
+
+        Parameters
+        -------
+        integers (bool, optional): False leaves integer columns to pandas' inference (needed when they have gaps).
+
+        Returns
+        -------
+        Dict[str, str]: Column name to parse dtype.
+
+        - Integer columns are parsed as int32 and only narrowed afterwards by narrow_columns(), because
+          read_csv silently wraps values that do not fit a narrower dtype (e.g. 300 as uint8 becomes 44).
+    """
+    dtypes = {}
+    for name, dtype in SCHEMA.items():
+        if dtype == 'category':
+            dtypes[name] = dtype
+        elif integers:
+            dtypes[name] = 'int32'
+    return dtypes
+
+
+
+def narrow_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Casts integer columns down to their SCHEMA width when every value fits (columns that don't keep their type).
+
+        Parameters
+        -------
+        df (pd.DataFrame): Freshly parsed rows.
+
+        Returns
+        -------
+        pd.DataFrame: The same DataFrame, with compact integer columns.
+    """
+    for name in df.columns:
+        dtype = SCHEMA.get(name)
+        if dtype is None or dtype == 'category' or not pd.api.types.is_integer_dtype(df[name].dtype):
+            continue
+
+        limits = np.iinfo(dtype)
+        if len(df) == 0 or (df[name].min() >= limits.min and df[name].max() <= limits.max):
+            df[name] = df[name].astype(dtype)
+        else:
+            print(f"Warning: {name} has values outside {dtype}; keeping {df[name].dtype}", file=sys.stderr)
+    return df
+
+
+
+def read_csv_typed(source_file: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Parses the CSV with the declared SCHEMA, only materializing the requested columns.
+
+        Parameters
+        -------
+        source_file (str): Path of the CSV file.
+        columns (List[str], optional): Columns to parse; None parses all of them.
+
+        Returns
+        -------
+        pd.DataFrame: Typed rows (falls back to inferred integer types if an integer column has missing values).
+    """
+    try:
+        df = pd.read_csv(source_file, usecols=columns, dtype=parse_dtypes())
+    except ValueError as error:
+        if "NA" not in str(error):
+            raise
+        df = pd.read_csv(source_file, usecols=columns, dtype=parse_dtypes(integers=False))
+    return narrow_columns(df)
+
+
+
+def cache_dir_for(source_file: str) -> str:
+    """
+    Returns the sidecar directory that holds the binary cache for a CSV file (e.g. data/a2-data.csv.cache).
+    """
+    return source_file + ".cache"
+
+
+
+def file_signature(source_file: str) -> Dict[str, int]:
+    """
+    Cheap staleness check for the source CSV: its size and modification time.
+
+        Parameters
+        -------
+        source_file (str): Path of the CSV file.
+
+        Returns
+        -------
+        Dict[str, int]: size (bytes) and mtime_ns of the file.
+    """
+    stat = os.stat(source_file)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+
+def file_digest(source_file: str, length: Optional[int] = None) -> str:
+    """
+    Content hash of the source CSV, used when the size/mtime signature no longer matches (e.g. after a copy or touch).
+
+        Parameters
+        -------
+        source_file (str): Path of the CSV file.
+        length (int, optional): Only hash the first length bytes (the prefix already processed); None hashes everything.
+
+        Returns
+        -------
+        str: Hex BLAKE2b digest of the file contents.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(source_file, "rb") as file:
+        feed_digest(digest, file, length)
+    return digest.hexdigest()
+
+
+
+def feed_digest(digest, file, length: Optional[int] = None) -> None:
+    """
+    Feeds the bytes of an open binary file, from its current position, into a hash object.
+
+        Parameters
+        -------
+        digest: hashlib hash object to update (e.g. the BLAKE2b of file_digest()).
+        file: File opened in binary mode.
+        length (int, optional): Number of bytes to feed; None feeds everything up to the end of the file.
+    """
+    remaining = length
+    while remaining is None or remaining > 0:
+        block = file.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+        if not block:
+            break
+        digest.update(block)
+        if remaining is not None:
+            remaining -= len(block)
+
+
+
+def write_cache(df: pd.DataFrame, cache_dir: str, signature: Dict[str, int], digest: str) -> None:
+    """
+    Stores a DataFrame as one .npy file per column, plus a meta.json describing the columns and the source file.
+
+        Parameters
+        -------
+        df (pd.DataFrame): DataFrame parsed from the source CSV.
+        cache_dir (str): Sidecar directory to (re)build.
+        signature (Dict[str, int]): file_signature() of the source when it was parsed.
+        digest (str): file_digest() of the source when it was parsed.
+
+        - Text columns are stored as categorical codes plus their (small) list of categories, so no pickling is needed.
+        - meta.json is written last, so a half-written cache is never picked up.
+    """
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+    os.makedirs(cache_dir)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        column = df[name]
+        if pd.api.types.is_numeric_dtype(column.dtype):
+            np.save(os.path.join(cache_dir, f"col_{i}.npy"), column.to_numpy())
+            columns.append({"name": name, "kind": "numeric"})
+        else:
+            categorical = pd.Categorical(column)
+            np.save(os.path.join(cache_dir, f"col_{i}.npy"), categorical.codes)
+            np.save(os.path.join(cache_dir, f"col_{i}_categories.npy"), np.asarray(categorical.categories, dtype=str))
+            columns.append({"name": name, "kind": "category"})
+
+    meta = {"version": CACHE_VERSION, "source": signature, "digest": digest, "rows": len(df), "columns": columns}
+    with open(os.path.join(cache_dir, "meta.json"), "w") as file:
+        json.dump(meta, file)
+
+
+
+def read_cache_meta(cache_dir: str) -> Optional[Dict]:
+    """
+    Reads the meta.json of a cache directory, or returns None if there is no usable cache.
+    """
+    try:
+        with open(os.path.join(cache_dir, "meta.json")) as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get("version") != CACHE_VERSION:
+        return None
+    return meta
+
+
+
+def read_cache(cache_dir: str, meta: Dict, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Rebuilds the DataFrame from the per-column .npy files of a cache directory.
+
+        Parameters
+        -------
+        cache_dir (str): Sidecar directory written by write_cache().
+        meta (Dict): Its parsed meta.json.
+        columns (List[str], optional): Columns to load; None loads all of them.
+
+        Returns
+        -------
+        pd.DataFrame: Same columns and values as the typed CSV parse.
+    """
+    cached = [column["name"] for column in meta["columns"]]
+    for name in columns or []:
+        if name not in cached:
+            raise KeyError(f"Column {name} is not in the dataset")
+
+    data = {}
+    for i, column in enumerate(meta["columns"]):
+        if columns is not None and column["name"] not in columns:
+            continue
+        values = np.load(os.path.join(cache_dir, f"col_{i}.npy"))
+        if column["kind"] == "category":
+            categories = np.load(os.path.join(cache_dir, f"col_{i}_categories.npy"))
+            values = pd.Categorical.from_codes(values, categories=categories)
+        data[column["name"]] = values
+    return pd.DataFrame(data)
+
+
+
+def load_data(source_file: str = DATA_FILE, columns: Optional[List[str]] = None, use_cache: bool = True,
+              refresh_cache: bool = False, digest: Optional[str] = None) -> pd.DataFrame:
+    """
+    Loads the dataset, going through the binary column cache whenever the CSV has not changed.
+
+        Parameters
+        -------
+        source_file (str, optional): Path of the CSV file. Defaults to data/a2-data.csv.
+        columns (List[str], optional): Columns the caller needs (see required_columns()); None loads all of them.
+        use_cache (bool, optional): False parses the CSV directly and leaves the cache alone (--no-cache).
+        refresh_cache (bool, optional): True re-parses the CSV and rebuilds the cache (--refresh-cache).
+        digest (str, optional): file_digest() of the CSV if the caller already has it (e.g. ResultCache.data_digest()),
+                                so the file is not hashed a second time.
+
+        Returns
+        -------
+        pd.DataFrame: The dataset, typed according to SCHEMA.
+
+        - The cache is reused when the size and mtime match; if they don't, the content hash gets a final say.
+        - Rebuilding the cache parses every column once; after that only the requested columns are read.
+    """
+    if not use_cache:
+        return read_csv_typed(source_file, columns)
+
+    cache_dir = cache_dir_for(source_file)
+    signature = file_signature(source_file)
+    meta = None if refresh_cache else read_cache_meta(cache_dir)
+
+    if meta is not None:
+        if meta["source"] == signature:
+            return read_cache(cache_dir, meta, columns)
+
+        # Size or mtime moved: only trust the cache if the contents are really unchanged
+        digest = digest or file_digest(source_file)
+        if meta["digest"] == digest:
+            meta["source"] = signature
+            with open(os.path.join(cache_dir, "meta.json"), "w") as file:
+                json.dump(meta, file)
+            return read_cache(cache_dir, meta, columns)
+    else:
+        digest = digest or file_digest(source_file)
+
+    df = read_csv_typed(source_file)
+    try:
+        write_cache(df, cache_dir, signature, digest)
+    except OSError as error:
+        # A read-only data directory should never stop the analysis itself
+        print(f"Warning: could not write cache {cache_dir}: {error}", file=sys.stderr)
+
+    if columns is not None:
+        df = df[[name for name in df.columns if name in columns]]
+    return df
+
+
+
+# Rows per chunk in --stream mode, overridable with --chunk-size=<rows>
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+
+def iter_chunks(source_file: str, chunk_size: int, columns: Optional[List[str]] = None):
+    """
+    Yields the CSV as typed DataFrames of at most chunk_size rows, parsing only the requested columns.
+    """
+    # Integer widths are inferred per chunk here: a missing value half way through cannot be retried
+    reader = pd.read_csv(source_file, chunksize=chunk_size, usecols=columns, dtype=parse_dtypes(integers=False))
+    for chunk in reader:
+        yield narrow_columns(chunk)
+
+
+
+def run_streaming(task_numbers: List[int], source_file: str = DATA_FILE, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  top_k_size: Optional[int] = None, output_format: str = "csv", output: Optional[str] = None) -> None:
+    """
+    Runs tasks over the CSV in bounded chunks so memory stays flat however large the input is (--stream).
+
+        Parameters
+        -------
+        task_numbers (List[int]): Tasks to run.
+        source_file (str, optional): Path of the CSV file. Defaults to data/a2-data.csv.
+        chunk_size (int, optional): Rows parsed per chunk.
+        top_k_size (int, optional): --top-k override for Tasks #2 and #5.
+        output_format (str, optional): --format of the outputs. Defaults to csv.
+        output (str, optional): --output path, see output_path().
+
+        - Tasks #1 and #3 append matching rows to their output as they go; Tasks #2, #4 and #5 keep a top-k
+          and/or per-grade running totals and write their table at the end.
+        - Output matches the in-memory path as long as every chunk infers the same column dtypes as the
+          whole file (e.g. no chunk turns an integer column into floats because of a missing value).
+    """
+    partials = {}
+    for task_number in task_numbers:
+        partials[task_number] = make_partial(task_number, output_path(task_number, task_numbers, output_format, output),
+                                             output_format, **task_parameters(task_number, top_k_size))
+
+    for chunk in iter_chunks(source_file, chunk_size, required_columns(task_numbers)):
+        for partial in partials.values():
+            partial.update(chunk)
+
+    for task_number, partial in partials.items():
+        if isinstance(partial, FilterPartial):
+            partial.close()
+        else:
+            write_output(partial.result(), output_path(task_number, task_numbers, output_format, output), output_format)
+
+
+
+def run_groupby(by: str, column: str = 'Exam_Score', source_file: str = DATA_FILE,
+                chunk_size: int = DEFAULT_CHUNK_SIZE, output: str = "output.csv") -> None:
+    """
+    Count, mean, min and max of a column for every value of a small integer column, streamed over the CSV
+    (python spf_analyzer.py groupby --by=<column> [--column=<column>]).
+
+        Parameters
+        -------
+        by (str): Column to group by (--by), e.g. Attendance, Sleep_Hours or Tutoring_Sessions.
+        column (str, optional): Column to summarize (--column). Defaults to Exam_Score.
+        source_file (str, optional): Path of the CSV file. Defaults to data/a2-data.csv.
+        chunk_size (int, optional): Rows parsed per chunk (--chunk-size).
+        output (str, optional): Output file (--output). Defaults to output.csv.
+
+        - Each chunk is summarized by counting_aggregate() (with min/max) and the chunk aggregates are merged,
+          so memory depends on the key domain and one chunk, not on the file.
+        - Rows without a key are skipped; values that are missing are left out of the statistics.
+        - Raises ValueError when a column is missing or the keys are not small non-negative integers.
+    """
+    total, integral = None, True
+    reader = pd.read_csv(source_file, usecols=[by, column], chunksize=chunk_size, dtype=parse_dtypes(integers=False))
+    for chunk in reader:
+        chunk = narrow_columns(chunk.loc[chunk[by].notna()])
+        keys = chunk[by]
+        if keys.dtype.kind == 'f' and (keys == np.floor(keys)).all():
+            keys = keys.astype(np.int64)
+        integral = integral and chunk[column].dtype.kind in "iu"
+        aggregate = counting_aggregate(keys, chunk[column])
+        if aggregate is None:
+            raise ValueError(f"{by} is not a column of integers in 0 .. {SMALL_DOMAIN - 1}")
+        if total is None:
+            total = aggregate
+        else:
+            total.merge(aggregate)
+
+    stats = (total or CountingAggregate(0)).frame()
+    stats = stats.loc[stats['count'] > 0]
+    # min/max are tracked as floats; every group that is left has them, so integer columns get integers back
+    extreme_dtype = np.int64 if integral else float
+    result_df = pd.DataFrame({by: stats.index, 'Students': stats['count'].to_numpy(),
+                              f'Average_{column}': stats['mean'].round(1).to_numpy(),
+                              f'Min_{column}': stats['min'].to_numpy().astype(extreme_dtype),
+                              f'Max_{column}': stats['max'].to_numpy().astype(extreme_dtype)})
+    write_output(result_df, output)
+
+
+
+# Tasks whose partial results stay small enough to persist between runs (--incremental)
+INCREMENTAL_TASKS = (2, 4, 5)
+STATE_VERSION = 2
+
+
+
+def state_path_for(source_file: str) -> str:
+    """
+    Returns the file that holds the incremental aggregate state for a CSV file (e.g. data/a2-data.csv.state).
+    """
+    return source_file + ".state"
+
+
+
+def load_state(state_file: str) -> Optional[Dict]:
+    """
+    Reads a saved incremental state, or returns None if there is no usable one.
+
+        Returns
+        -------
+        Dict: What save_state() was given, except that "params" is its params_json() and "partials" holds the
+              arrays of every partial (to restore with set_arrays()).
+    """
+    try:
+        arrays = read_arrays(state_file)
+        meta = json.loads(str(arrays.pop("meta")))
+        if meta.get("version") != STATE_VERSION:
+            return None
+        meta["header"] = arrays.pop("header").tobytes()
+        meta["partials"] = {int(task_number): unprefixed(f"task{task_number}", arrays)
+                            for task_number in json.loads(meta["params"])}
+    except (OSError, ValueError, KeyError, TypeError, zipfile.BadZipFile):
+        return None
+    return meta
+
+
+
+def save_state(state_file: str, state: Dict) -> None:
+    """
+    Writes the incremental state atomically, as plain arrays (see write_arrays()): the header bytes, the arrays
+    of every partial under 'task<n>.' and the scalars (version, params, offset, rows, ...) as JSON.
+    """
+    meta = {key: value for key, value in state.items() if key not in ("header", "params", "partials")}
+    meta["params"] = params_json(state["params"])
+    arrays = {"meta": np.array(json.dumps(meta)), "header": np.frombuffer(state["header"], dtype=np.uint8)}
+    for task_number, partial in state["partials"].items():
+        arrays.update(prefixed(f"task{task_number}", partial.get_arrays()))
+    write_arrays(state_file, arrays)
+
+
+
+def run_incremental(task_numbers: List[int], source_file: str = DATA_FILE, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    top_k_size: Optional[int] = None, output_format: str = "csv", output: Optional[str] = None) -> None:
+    """
+    Runs Tasks #2, #4 and #5 over an append-only CSV, only parsing the rows added since the previous run (--incremental).
+
+        Parameters
+        -------
+        task_numbers (List[int]): Tasks to run (all of them must be in INCREMENTAL_TASKS).
+        source_file (str, optional): Path of the CSV file. Defaults to data/a2-data.csv.
+        chunk_size (int, optional): Rows parsed per chunk.
+        top_k_size (int, optional): --top-k override for Tasks #2 and #5.
+        output_format (str, optional): --format of the outputs. Defaults to csv.
+        output (str, optional): --output path, see output_path().
+
+        - data/a2-data.csv.state keeps the per-grade sums/counts, the top-k lists, the byte offset and row count
+          processed so far and a checksum of that prefix (plain arrays and JSON, see save_state()).
+        - Everything is recomputed from scratch when the prefix checksum no longer matches (earlier rows were
+          edited), the file shrank, the tasks/options changed, or the last processed line had no newline yet.
+        - Raises ValueError when the file holds no data rows (empty, or a header only).
+    """
+    state_file = state_path_for(source_file)
+    params = {task_number: task_parameters(task_number, top_k_size) for task_number in task_numbers}
+    size = os.path.getsize(source_file)
+
+    with open(source_file, "rb") as file:
+        header = file.readline()
+        columns = header.decode().strip().split(",")
+
+        state = load_state(state_file)
+        reusable = (state is not None and state["header"] == header and state["params"] == params_json(params)
+                    and state["clean_end"] and state["offset"] <= size)
+
+        # The checksum of the verified prefix is carried forward, so only the new tail is hashed to save it
+        digest = hashlib.blake2b(digest_size=20)
+        if reusable:
+            file.seek(0)
+            feed_digest(digest, file, state["offset"])
+            reusable = digest.hexdigest() == state["digest"]
+        if not reusable:
+            digest = hashlib.blake2b(digest_size=20)
+
+        partials = {task_number: make_partial(task_number, **params[task_number]) for task_number in task_numbers}
+        if reusable:
+            for task_number, partial in partials.items():
+                partial.set_arrays(state["partials"][task_number])
+            offset, rows = state["offset"], state["rows"]
+        else:
+            offset, rows = len(header), 0
+
+        # Only the tail past the saved offset is parsed
+        if offset < size:
+            file.seek(offset)
+            reader = pd.read_csv(file, header=None, names=columns, chunksize=chunk_size,
+                                 usecols=required_columns(task_numbers), dtype=parse_dtypes(integers=False))
+            for chunk in reader:
+                chunk = narrow_columns(chunk)
+                rows += len(chunk)
+                for partial in partials.values():
+                    partial.update(chunk)
+
+        hashed = offset if reusable else 0
+        file.seek(hashed)
+        feed_digest(digest, file, size - hashed)
+
+        # An empty file (or a bare header) has no last line to check
+        clean_end = size == len(header)
+        if not clean_end:
+            file.seek(size - 1)
+            clean_end = file.read(1) == b"\n"
+
+    if rows == 0:
+        raise ValueError(f"{source_file} has no data rows")
+
+    save_state(state_file, {
+        "version": STATE_VERSION,
+        "header": header,
+        "params": params,
+        "offset": size,
+        "rows": rows,
+        "clean_end": clean_end,
+        "digest": digest.hexdigest(),
+        "partials": partials,
+    })
+
+    for task_number in task_numbers:
+        write_output(partials[task_number].result(), output_path(task_number, task_numbers, output_format, output),
+                     output_format)
+
+
+
+def find_shards(pattern: str) -> List[str]:
+    """
+    Expands --shards into the list of shard files, in a stable (sorted) order.
+
+        Parameters
+        -------
+        pattern (str): A directory (all *.csv files inside it) or a glob such as data/a2-data-*.csv.
+
+        Returns
+        -------
+        List[str]: Sorted shard paths; the combined result matches a single run over them concatenated in this order.
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.csv")
+    return sorted(glob.glob(pattern))
+
+
+
+def shard_partials(shard_file: str, task_numbers: List[int], top_k_size: Optional[int] = None) -> Dict[int, TaskPartial]:
+    """
+    Worker side of --shards: loads one shard and returns the partial result of every task over it.
+
+        Parameters
+        -------
+        shard_file (str): CSV shard to process.
+        task_numbers (List[int]): Tasks to run.
+        top_k_size (int, optional): --top-k override for Tasks #2 and #5.
+
+        Returns
+        -------
+        Dict[int, TaskPartial]: Partial result per task (filtered rows, local top-k, per-grade sum/count).
+    """
+    df = read_csv_typed(shard_file, required_columns(task_numbers))
+
+    partials = {}
+    for task_number in task_numbers:
+        partial = make_partial(task_number, **task_parameters(task_number, top_k_size))
+        partial.update(df)
+        partials[task_number] = partial
+    return partials
+
+
+
+def run_sharded(task_numbers: List[int], shard_files: List[str], workers: Optional[int] = None,
+                top_k_size: Optional[int] = None, output_format: str = "csv", output: Optional[str] = None) -> None:
+    """
+    Runs tasks over many CSV shards (one per campus/term, ...) on a process pool, then reduces the partials.
+
+        Parameters
+        -------
+        task_numbers (List[int]): Tasks to run.
+        shard_files (List[str]): Shards from find_shards().
+        workers (int, optional): Number of worker processes (--workers); defaults to the number of CPUs.
+        top_k_size (int, optional): --top-k override for Tasks #2 and #5.
+        output_format (str, optional): --format of the outputs. Defaults to csv.
+        output (str, optional): --output path, see output_path().
+
+        - Partials are merged in shard order, so the output matches the single-file run over the shards
+          concatenated in that order.
+    """
+    combined = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(shard_partials, shard_file, task_numbers, top_k_size) for shard_file in shard_files]
+
+        for future in futures:
+            for task_number, partial in future.result().items():
+                if task_number in combined:
+                    combined[task_number].merge(partial)
+                else:
+                    combined[task_number] = partial
+
+    for task_number in task_numbers:
+        write_output(combined[task_number].result(), output_path(task_number, task_numbers, output_format, output),
+                     output_format)
+
+
+
+# --approx: tasks with a sketched answer, size of the sampled blocks, how much of a large file is read by default,
+# z value of the (95%) confidence intervals and the version of saved sketch files
+APPROX_TASKS = (2, 4, 5)
+APPROX_BLOCK_SIZE = 64 * 1024
+APPROX_SAMPLE_BYTES = 32 * 1024 * 1024
+APPROX_Z = 1.96
+SKETCH_VERSION = 2
+
+
+
+def iter_sample_blocks(source_file: str, fraction: Optional[float] = None, columns: Optional[List[str]] = None,
+                       seed: int = 0):
+    """
+    Yields a random sample of the CSV's rows as (chunk, weight) pairs, reading only the sampled parts of the file.
+
+        Parameters
+        -------
+        source_file (str): Path of the CSV file.
+        fraction (float, optional): Share of the file to read (--sample); by default about APPROX_SAMPLE_BYTES of it.
+        columns (List[str], optional): Columns to parse.
+        seed (int, optional): Seed of the block choice (--seed), so a run can be repeated.
+
+        - The file is cut into APPROX_BLOCK_SIZE blocks and a simple random sample of them is parsed (a line
+          belongs to the block it starts in); weight is the inverse of a block's chance of being picked, so it
+          is 1 when the whole file is read.
+        - Error bounds built from the sample treat its rows as independent, which holds as long as the file is
+          not sorted or grouped by the columns being estimated.
+    """
+    size = os.path.getsize(source_file)
+    with open(source_file, "rb") as file:
+        header = file.readline()
+        names = header.decode().strip().split(",")
+        start = len(header)
+
+        blocks = max(1, -(-(size - start) // APPROX_BLOCK_SIZE))
+        if fraction is None:
+            fraction = APPROX_SAMPLE_BYTES / max(size - start, 1)
+        chosen = min(blocks, max(1, round(blocks * fraction)))
+        weight = blocks / chosen
+
+        parts, buffered = [], 0
+        for block in sorted(random.Random(seed).sample(range(blocks), chosen)):
+            begin = start + block * APPROX_BLOCK_SIZE
+            end = min(begin + APPROX_BLOCK_SIZE, size)
+            if block > 0:
+                # Skip the rest of the line that started in the previous block
+                file.seek(begin - 1)
+                file.readline()
+            else:
+                file.seek(begin)
+            position = file.tell()
+            if position >= end:
+                continue
+            data = file.read(end - position)
+            if not data.endswith(b"\n"):
+                data += file.readline()
+            parts.append(data)
+            buffered += len(data)
+
+            # Parse a few MB at a time, like the chunks of --stream
+            if buffered >= 64 * APPROX_BLOCK_SIZE or block == blocks - 1:
+                yield narrow_columns(pd.read_csv(io.BytesIO(b"".join(parts)), header=None, names=names,
+                                                 usecols=columns, dtype=parse_dtypes(integers=False))), weight
+                parts, buffered = [], 0
+
+        if parts:
+            yield narrow_columns(pd.read_csv(io.BytesIO(b"".join(parts)), header=None, names=names,
+                                             usecols=columns, dtype=parse_dtypes(integers=False))), weight
+
+
+
+class MeanSketch:
+    """
+    Mergeable estimate of the mean of a column within each group (e.g. grade) of a weighted row sample,
+    with a confidence interval.
+
+        - The sample itself is not stratified: rows are drawn as uniform random blocks and only assigned to
+          their group afterwards (post-stratification), so a rare group may get few or no sampled rows.
+        - Seven weighted sums are kept per group (rows, Σw, Σw², Σwx, Σw²x, Σwx², Σw²x²), so chunks, shards
+          and saved sketches simply add up.
+        - The interval comes from the linearized variance of the ratio estimator Σwx / Σw; it shrinks to the
+          exact mean when every row was read (w = 1).
+    """
+
+    def __init__(self, labels: List[str]) -> None:
+        """
+        Parameters
+        -------
+        labels (List[str]): Name of each group; a row's group code indexes into it.
+        """
+        self.labels = labels
+        self.sums = np.zeros((len(labels), 7))
+
+    def update(self, codes: np.ndarray, values: pd.Series, weight: float = 1.0) -> None:
+        """
+        Folds in sampled rows: their group codes, their values and the weight of each row.
+        """
+        values = np.asarray(values, dtype=float)
+        groups = len(self.labels)
+        rows = np.bincount(codes, minlength=groups).astype(float)
+        totals = np.bincount(codes, weights=values, minlength=groups)
+        squares = np.bincount(codes, weights=values * values, minlength=groups)
+        self.sums += np.column_stack([rows, weight * rows, weight ** 2 * rows, weight * totals, weight ** 2 * totals,
+                                      weight * squares, weight ** 2 * squares])
+
+    def merge(self, other: "MeanSketch") -> None:
+        """
+        Adds another sketch's sums to this one's: the result is the sketch of both samples together (merging is
+        associative and commutative).
+
+            Parameters
+            -------
+            other (MeanSketch): Sketch over the same groups (same labels).
+        """
+        self.sums += other.sums
+
+    def get_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Plain arrays holding the sketch, for a sketch file (see write_sketch()); set_arrays() restores them.
+        """
+        return {"sums": self.sums}
+
+    def set_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        Restores the arrays of get_arrays() into a sketch made with the same labels (ValueError if they do not fit).
+        """
+        sums = np.asarray(arrays["sums"], dtype=float)
+        if sums.shape != self.sums.shape:
+            raise ValueError("the sums do not match the groups")
+        self.sums = sums
+
+    def estimate(self) -> pd.DataFrame:
+        """
+        Per-group estimates.
+
+            Returns
+            -------
+            pd.DataFrame: 'sum' and 'count' columns shaped like grade_totals() (estimated over the whole
+            dataset, so grade_means() applies), plus 'low'/'high' bounds of the mean and the 'sampled' row count.
+        """
+        rows, w, w2, wx, w2x, wxx, w2xx = self.sums.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = wx / w
+            m = np.nan_to_num(mean)
+            spread = (w2xx - wxx) - 2 * m * (w2x - wx) + m * m * (w2 - w)
+            half = APPROX_Z * np.sqrt(np.maximum(spread, 0)) / w
+        # A single sampled row says nothing about the spread, unless no row was left out
+        half = np.where((rows < 2) & (w2 > w), np.nan, half)
+        return pd.DataFrame({'sum': wx, 'count': w, 'low': mean - half, 'high': mean + half, 'sampled': rows},
+                            index=self.labels)
+
+
+
+class QuantileSketch:
+    """
+    Mergeable, weighted summary of a column's distribution that tells how many rows lie above any value (i.e.
+    its rank, or which value sits at a quantile), with an error bound.
+
+        - Small non-negative integer columns (every score here) are counted per value, which is exact; anything
+          else switches the sketch to logarithmic buckets of relative accuracy alpha (as in DDSketch), so memory
+          is bounded by the range of the values rather than the number of rows.
+        - Each bucket keeps Σw and Σw² of its rows, for the sampling error of the counts.
+    """
+
+    def __init__(self, alpha: float = 0.01) -> None:
+        """
+        Parameters
+        -------
+        alpha (float, optional): Relative accuracy of the logarithmic buckets. Defaults to 1%.
+        """
+        self.alpha = alpha
+        self.exact = True
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.sums = np.zeros((0, 2))
+
+    def key_of(self, values: np.ndarray) -> np.ndarray:
+        """
+        Bucket key of each value; keys sort in the same order as the values they stand for.
+        """
+        values = np.asarray(values, dtype=float)
+        if self.exact:
+            return np.floor(values).astype(np.int64)
+        gamma = (1 + self.alpha) / (1 - self.alpha)
+        with np.errstate(divide='ignore'):
+            buckets = np.ceil(np.log(np.abs(values)) / np.log(gamma))
+        # Positive values above zero, negative ones mirrored below it; 2**40 keeps tiny magnitudes on their side
+        buckets = np.nan_to_num(buckets, neginf=0).astype(np.int64) + (1 << 40)
+        return np.where(values > 0, buckets, np.where(values < 0, -buckets, 0))
+
+    def _add(self, keys: np.ndarray, sums: np.ndarray) -> None:
+        keys = np.concatenate([self.keys, keys])
+        sums = np.concatenate([self.sums, sums])
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.sums = np.column_stack([np.bincount(inverse, weights=sums[:, j], minlength=len(self.keys))
+                                     for j in range(2)])
+
+    def _to_buckets(self) -> None:
+        keys, sums = self.keys, self.sums
+        self.exact = False
+        self.keys, self.sums = np.zeros(0, dtype=np.int64), np.zeros((0, 2))
+        self._add(self.key_of(keys), sums)
+
+    def update(self, values: pd.Series, weight: float = 1.0) -> None:
+        """
+        Folds in sampled values, each standing for weight rows.
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if self.exact and len(values) and not (values.min() >= 0 and values.max() < 1 << 16
+                                               and (values == np.floor(values)).all()):
+            self._to_buckets()
+        self._add(self.key_of(values), np.column_stack([np.full(len(values), weight),
+                                                        np.full(len(values), weight ** 2)]))
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        Adds another sketch's buckets to this one's: the result is the sketch of both samples together (merging
+        is associative and commutative). If either sketch uses logarithmic buckets, the result does too.
+
+            Parameters
+            -------
+            other (QuantileSketch): Sketch of the same column with the same alpha.
+        """
+        if self.exact and not other.exact:
+            self._to_buckets()
+        keys = other.keys if other.exact == self.exact else self.key_of(other.keys)
+        self._add(keys, other.sums)
+
+    def get_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Plain arrays holding the sketch, for a sketch file (see write_sketch()); set_arrays() restores them.
+        """
+        return {"alpha": np.array(self.alpha), "exact": np.array(self.exact), "keys": self.keys, "sums": self.sums}
+
+    def set_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        Restores the arrays of get_arrays() (ValueError if they are not shaped like a sketch).
+        """
+        keys = np.asarray(arrays["keys"], dtype=np.int64)
+        sums = np.asarray(arrays["sums"], dtype=float)
+        if keys.ndim != 1 or sums.shape != (len(keys), 2):
+            raise ValueError("the buckets do not match their sums")
+        self.alpha = float(arrays["alpha"])
+        self.exact = bool(arrays["exact"])
+        self.keys, self.sums = keys, sums
+
+    def above(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Estimated number of rows strictly above each value, with a lower and an upper bound.
+
+            - The bounds cover the sampling error (APPROX_Z standard errors) and the rows that may lie on either
+              side of the value: those equal to it, or sharing its bucket.
+        """
+        keys = self.key_of(values)
+        cumulative = np.concatenate([[[0.0, 0.0]], np.cumsum(self.sums, axis=0)])
+        right = np.searchsorted(self.keys, keys, side='right')
+        left = np.searchsorted(self.keys, keys, side='left')
+
+        estimate, squares = (cumulative[-1] - cumulative[right]).T
+        tied = cumulative[right, 0] - cumulative[left, 0]
+        half = APPROX_Z * np.sqrt(np.maximum(squares - estimate, 0))
+        return estimate, np.maximum(estimate - half, 0), estimate + half + tied
+
+
+
+def estimated_ranks(scores: QuantileSketch, exam_scores: pd.Series) -> pd.DataFrame:
+    """
+    Rank columns for sampled students: 1 + the estimated number of students in the whole dataset with a higher
+    Exam_Score, and the bounds their rank lies within (anywhere among the students tied with them).
+    """
+    estimate, low, high = scores.above(exam_scores.to_numpy(dtype=float))
+    return pd.DataFrame({'Estimated_Rank': np.rint(estimate).astype(np.int64) + 1,
+                         'Rank_Low': np.floor(low).astype(np.int64) + 1,
+                         'Rank_High': np.maximum(np.ceil(high).astype(np.int64), 1)}, index=exam_scores.index)
+
+
+
+class ApproxTopKPartial(TopKPartial):
+    """
+    Sketch of Task #2 (--approx): the k best sampled students scoring 85 or higher, plus a QuantileSketch of
+    every sampled Exam_Score that places them in the whole dataset.
+
+        - The list is the exact top k of the sampled rows only: nothing bounds how many of the dataset's true
+          top k were left out of the sample. The rank intervals tell where each listed student stands.
+    """
+
+    def __init__(self, k: int = 10) -> None:
+        super().__init__(task_2, k=k)
+        self.scores = QuantileSketch()
+
+    def update(self, chunk: pd.DataFrame, weight: float = 1.0) -> None:
+        """
+        Folds in sampled rows: keeps the k best of them and adds their Exam_Scores to the score sketch.
+
+            Parameters
+            -------
+            chunk (pd.DataFrame): Sampled rows with Record_ID, Hours_Studied and Exam_Score.
+            weight (float, optional): Number of rows of the whole dataset each sampled row stands for.
+        """
+        super().update(chunk)
+        self.scores.update(chunk['Exam_Score'], weight)
+
+    def merge(self, other: "ApproxTopKPartial") -> None:
+        """
+        Keeps the k best sampled students of both sketches and merges their score sketches (associative and
+        commutative, so shards and saved sketches can be combined in any order).
+
+            Parameters
+            -------
+            other (ApproxTopKPartial): Sketch of Task #2 with the same k.
+        """
+        if other.top is not None:
+            super().update(other.top)
+        self.scores.merge(other.scores)
+
+    def result(self) -> pd.DataFrame:
+        """
+        Returns
+        -------
+        pd.DataFrame: Task #2's columns for the best sampled students, plus Estimated_Rank, Rank_Low and
+                      Rank_High in the whole dataset.
+        """
+        return pd.concat([self.top, estimated_ranks(self.scores, self.top['Exam_Score'])], axis=1)
+
+    def get_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Plain arrays holding the sketch, for a sketch file (see write_sketch()); set_arrays() restores them.
+        """
+        return {**prefixed("scores", self.scores.get_arrays()), **frame_arrays(self.top, "top")}
+
+    def set_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        Restores the arrays of get_arrays() into a sketch made with the same k.
+        """
+        self.scores.set_arrays(unprefixed("scores", arrays))
+        self.top = arrays_frame(arrays, "top")
+
+
+
+class ApproxGradeMeansPartial(TaskPartial):
+    """
+    Sketch of Task #4 (--approx): mean attendance per UVic grade over the sampled rows, with confidence intervals.
+
+        - The rows are a uniform sample of blocks, grouped by grade after the fact (post-stratification): a
+          grade's interval is only as tight as the number of its rows that happened to be sampled.
+    """
+
+    def __init__(self) -> None:
+        self.means = MeanSketch(UVIC_SCALE.categories)
+
+    def update(self, chunk: pd.DataFrame, weight: float = 1.0) -> None:
+        """
+        Folds in sampled rows: their Attendance, grouped by the UVic grade of their Exam_Score.
+
+            Parameters
+            -------
+            chunk (pd.DataFrame): Sampled rows with Exam_Score and Attendance.
+            weight (float, optional): Number of rows of the whole dataset each sampled row stands for.
+        """
+        self.means.update(UVIC_SCALE.codes(chunk['Exam_Score']), chunk['Attendance'], weight)
+
+    def merge(self, other: "ApproxGradeMeansPartial") -> None:
+        """
+        Adds other's weighted sums per grade to this sketch's (associative and commutative).
+
+            Parameters
+            -------
+            other (ApproxGradeMeansPartial): Sketch of Task #4.
+        """
+        self.means.merge(other.means)
+
+    def get_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Plain arrays holding the sketch, for a sketch file (see write_sketch()); set_arrays() restores them.
+        """
+        return prefixed("means", self.means.get_arrays())
+
+    def set_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        Restores the arrays of get_arrays().
+        """
+        self.means.set_arrays(unprefixed("means", arrays))
+
+    def result(self) -> pd.DataFrame:
+        """
+        Returns
+        -------
+        pd.DataFrame: Task #4's table from the estimated means, plus Attendance_Low/Attendance_High (95% interval),
+                      the estimated Students and the Sampled rows of each grade.
+        """
+        estimate = self.means.estimate().reindex(UVIC_SCALE.grades)
+        result_df = task_4_result(estimate)
+        result_df['Attendance_Low'] = estimate['low'].round(1).to_numpy()
+        result_df['Attendance_High'] = estimate['high'].round(1).to_numpy()
+        result_df['Students'] = np.rint(estimate['count'].to_numpy()).astype(np.int64)
+        result_df['Sampled'] = estimate['sampled'].to_numpy().astype(np.int64)
+        return result_df
+
+
+
+class ApproxTutoringPartial(TaskPartial):
+    """
+    Sketch of Task #5 (--approx): mean tutoring sessions per simplified grade with confidence intervals, the
+    k (default 50) best sampled candidates and a QuantileSketch of the sampled Exam_Scores to rank them.
+    """
+
+    def __init__(self, k: int = 50) -> None:
+        self.k = k
+        self.means = MeanSketch(SIMPLIFIED_SCALE.categories)
+        self.scores = QuantileSketch()
+        self.top = None
+
+    def _add_top(self, top: pd.DataFrame) -> None:
+        self.top = top if self.top is None else top_k(pd.concat([self.top, top]), self.k)
+
+    def update(self, chunk: pd.DataFrame, weight: float = 1.0) -> None:
+        """
+        Folds in sampled rows: their Tutoring_Sessions per simplified grade, their Exam_Scores and the k best
+        candidates among them.
+
+            Parameters
+            -------
+            chunk (pd.DataFrame): Sampled rows with Record_ID, Tutoring_Sessions and Exam_Score.
+            weight (float, optional): Number of rows of the whole dataset each sampled row stands for.
+        """
+        self.means.update(SIMPLIFIED_SCALE.codes(chunk['Exam_Score']), chunk['Tutoring_Sessions'], weight)
+        self.scores.update(chunk['Exam_Score'], weight)
+        self._add_top(top_k(chunk[['Record_ID', 'Tutoring_Sessions', 'Exam_Score']], self.k))
+
+    def merge(self, other: "ApproxTutoringPartial") -> None:
+        """
+        Merges other's mean and score sketches into this one's and keeps the k best candidates of both
+        (associative and commutative).
+
+            Parameters
+            -------
+            other (ApproxTutoringPartial): Sketch of Task #5 with the same k.
+        """
+        self.means.merge(other.means)
+        self.scores.merge(other.scores)
+        if other.top is not None:
+            self._add_top(other.top)
+
+    def get_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Plain arrays holding the sketch, for a sketch file (see write_sketch()); set_arrays() restores them.
+        """
+        return {**prefixed("means", self.means.get_arrays()), **prefixed("scores", self.scores.get_arrays()),
+                **frame_arrays(self.top, "top")}
+
+    def set_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        Restores the arrays of get_arrays() into a sketch made with the same k.
+        """
+        self.means.set_arrays(unprefixed("means", arrays))
+        self.scores.set_arrays(unprefixed("scores", arrays))
+        self.top = arrays_frame(arrays, "top")
+
+    def result(self) -> pd.DataFrame:
+        """
+        Returns
+        -------
+        pd.DataFrame: Task #5's table from the estimated means and the best sampled candidates, plus
+                      Average_Low/Average_High (95% interval) and the rank columns.
+        """
+        estimate = self.means.estimate()
+        result_df = task_5_result(self.top, estimate, self.k)
+        codes = result_df['Grade'].cat.codes.to_numpy()
+        result_df['Average_Low'] = estimate['low'].round(1).to_numpy()[codes]
+        result_df['Average_High'] = estimate['high'].round(1).to_numpy()[codes]
+        return pd.concat([result_df, estimated_ranks(self.scores, result_df['Exam_Score'])], axis=1)
+
+
+
+def make_approx_partial(task_number: int, **params) -> TaskPartial:
+    """
+    Creates an empty sketch for a task in APPROX_TASKS (params from task_parameters()).
+    """
+    if task_number == 2:
+        return ApproxTopKPartial(**params)
     elif task_number == 4:
-         result_df = task_4(df)
-         write_output(result_df)
+        return ApproxGradeMeansPartial()
     elif task_number == 5:
-         result_df = task_5(df)
-         write_output(result_df)
+        return ApproxTutoringPartial(**params)
+    raise ValueError(f"No approximate version of task: {task_number}")
+
+
+
+def approx_partials(source_file: str, task_numbers: List[int], fraction: Optional[float] = None, seed: int = 0,
+                    top_k_size: Optional[int] = None) -> Dict[int, TaskPartial]:
+    """
+    Worker side of --approx: sketches of every task over a sample of one CSV file.
+    """
+    partials = {task_number: make_approx_partial(task_number, **task_parameters(task_number, top_k_size))
+                for task_number in task_numbers}
+    for chunk, weight in iter_sample_blocks(source_file, fraction, required_columns(task_numbers), seed):
+        for partial in partials.values():
+            partial.update(chunk, weight)
+    return partials
+
+
+
+def write_sketch(sketch_file: str, params: Dict, partials: Dict[int, TaskPartial]) -> None:
+    """
+    Writes merged sketches to a file (--save-sketch), atomically.
+
+        Parameters
+        -------
+        sketch_file (str): File to write.
+        params (Dict): task_parameters() of every task, checked again when the file is loaded.
+        partials (Dict[int, TaskPartial]): Sketch of every task (see make_approx_partial()).
+
+        - The file is an uncompressed .npz archive of plain numeric and text arrays (each sketch's get_arrays(),
+          under 'task<n>.') with the version and a JSON copy of params. It holds no pickles, so it loads the same
+          whether the script was run or imported, and loading a file from another machine cannot run code.
+    """
+    arrays = {"version": np.array(SKETCH_VERSION), "params": np.array(params_json(params))}
+    for task_number, partial in partials.items():
+        arrays.update(prefixed(f"task{task_number}", partial.get_arrays()))
+    write_arrays(sketch_file, arrays)
+
+
+
+def load_sketch(sketch_file: str, params: Dict) -> Optional[Dict[int, TaskPartial]]:
+    """
+    Reads a sketch file written by write_sketch() (--save-sketch).
+
+        Parameters
+        -------
+        sketch_file (str): File to read.
+        params (Dict): task_parameters() of the requested tasks.
+
+        Returns
+        -------
+        Dict[int, TaskPartial]: Sketch of every requested task, rebuilt from the file's arrays; None if the file
+                                is unreadable, of another version, or does not hold those tasks with the same
+                                parameters.
+    """
+    try:
+        arrays = read_arrays(sketch_file)
+        saved = json.loads(str(arrays["params"]))
+        if int(arrays["version"]) != SKETCH_VERSION \
+                or any(saved.get(str(task_number)) != task_params for task_number, task_params in params.items()):
+            return None
+
+        partials = {}
+        for task_number, task_params in params.items():
+            partials[task_number] = make_approx_partial(task_number, **task_params)
+            partials[task_number].set_arrays(unprefixed(f"task{task_number}", arrays))
+    except (OSError, ValueError, KeyError, TypeError, AttributeError, zipfile.BadZipFile):
+        return None
+    return partials
+
+
+
+def run_approx(task_numbers: List[int], source_files: List[str], fraction: Optional[float] = None, seed: int = 0,
+               top_k_size: Optional[int] = None, sketch_files: List[str] = (), save_sketch: Optional[str] = None,
+               workers: Optional[int] = None, output_format: str = "csv", output: Optional[str] = None) -> None:
+    """
+    Answers Tasks #2, #4 and #5 from mergeable sketches of a sample of the data, with error bounds, in time that
+    does not grow with the size of the input (--approx).
+
+        Parameters
+        -------
+        task_numbers (List[int]): Tasks to run (all of them must be in APPROX_TASKS).
+        source_files (List[str]): CSV files to sample (the dataset, or every shard); may be empty.
+        fraction (float, optional): --sample share of each file to read; see iter_sample_blocks().
+        seed (int, optional): --seed of the sample.
+        top_k_size (int, optional): --top-k override for Tasks #2 and #5.
+        sketch_files (List[str], optional): Sketches saved by earlier runs (--sketches), merged into the result.
+        save_sketch (str, optional): File the merged sketches are written to (--save-sketch).
+        workers (int, optional): Number of worker processes when there are several source files.
+        output_format (str, optional): --format of the outputs. Defaults to csv.
+        output (str, optional): --output path, see output_path().
+
+        - Task #2 lists the best sampled students with Estimated_Rank, Rank_Low and Rank_High over the whole data;
+          Task #4 adds Attendance_Low/Attendance_High (95% interval), the estimated Students and the Sampled rows
+          per grade; Task #5 adds Average_Low/Average_High and the rank columns.
+        - Reading every row (--sample=1) gives the exact means and counts.
+        - Sketches of different shards or periods merge into the sketch of their union, so they can be saved
+          where the data lives and combined later without touching it again.
+    """
+    params = {task_number: task_parameters(task_number, top_k_size) for task_number in task_numbers}
+    combined = {task_number: make_approx_partial(task_number, **params[task_number]) for task_number in task_numbers}
+
+    for sketch_file in sketch_files:
+        sketch = load_sketch(sketch_file, params)
+        if sketch is None:
+            raise ValueError(f"{sketch_file} is not a sketch of Tasks {task_numbers} with these options")
+        for task_number in task_numbers:
+            combined[task_number].merge(sketch[task_number])
+
+    if len(source_files) == 1:
+        results = [approx_partials(source_files[0], task_numbers, fraction, seed, top_k_size)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(approx_partials, source_file, task_numbers, fraction, seed, top_k_size)
+                       for source_file in source_files]
+            results = [future.result() for future in futures]
+    for partials in results:
+        for task_number, partial in partials.items():
+            combined[task_number].merge(partial)
+
+    if save_sketch is not None:
+        write_sketch(save_sketch, params, combined)
+
+    for task_number in task_numbers:
+        write_output(combined[task_number].result(), output_path(task_number, task_numbers, output_format, output),
+                     output_format)
+
+
+
+# Address of the resident query server (serve / client modes)
+SERVER_HOST = "127.0.0.1"
+DEFAULT_PORT = 8265
+
+
+
+class AnalyzerServer(ThreadingHTTPServer):
+    """
+    Resident query server: keeps the dataset (and its shared Analysis) in memory between requests.
+
+        - GET /task/<n>?top_k=<k>&format=csv|json answers one task; the CSV body matches output.csv byte for byte.
+        - The dataset is reloaded (through the binary cache) as soon as the source file's size or mtime changes.
+    """
+
+    def __init__(self, source_file: str = DATA_FILE, port: int = DEFAULT_PORT) -> None:
+        """
+        Parameters
+        -------
+        source_file (str, optional): Path of the CSV file. Defaults to data/a2-data.csv.
+        port (int, optional): Local port to listen on. Defaults to 8265.
+        """
+        super().__init__((SERVER_HOST, port), TaskRequestHandler)
+        self.source_file = source_file
+        self.lock = threading.Lock()
+        self.signature = None
+        self.analysis = None
+
+    def current_analysis(self) -> Analysis:
+        """
+        Analysis of the dataset as it is on disk right now (reloaded only when the file changed).
+        """
+        signature = file_signature(self.source_file)
+        if signature != self.signature:
+            self.analysis = Analysis(load_data(self.source_file))
+            self.signature = signature
+        return self.analysis
+
+    def run_task(self, task_number: int, top_k_size: Optional[int] = None) -> pd.DataFrame:
+        """
+        Runs one task against the resident dataset.
+        """
+        # The shared intermediates are not thread-safe, so tasks run one at a time
+        with self.lock:
+            return TASKS[task_number](self.current_analysis(), **task_parameters(task_number, top_k_size))
+
+
+
+class TaskRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler of the AnalyzerServer.
+    """
+
+    def do_GET(self) -> None:
+        """
+        Answers GET /task/<n>[?top_k=<k>&format=csv|json] with the task's table.
+
+            - 404 for an unknown path or task, 400 for a bad top_k or format.
+            - 500 with a JSON body {"error": "..."} when loading the dataset or running the task fails, so the
+              client always gets a response instead of a dropped connection.
+        """
+        url = urllib.parse.urlparse(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        parts = url.path.strip("/").split("/")
+
+        if len(parts) != 2 or parts[0] != "task" or not parts[1].isdigit() or int(parts[1]) not in TASKS:
+            self.send_text(404, "Error: unknown task\n")
+            return
+
+        try:
+            top_k_size = int(query["top_k"][0]) if "top_k" in query else None
+        except ValueError:
+            top_k_size = 0
+        if top_k_size is not None and top_k_size <= 0:
+            self.send_text(400, "Error: top_k must be a positive integer\n")
+            return
+
+        output_format = query.get("format", ["csv"])[0]
+        if output_format not in ("csv", "json"):
+            self.send_text(400, "Error: format must be csv or json\n")
+            return
+
+        try:
+            result_df = self.server.run_task(int(parts[1]), top_k_size)
+            if output_format == "json":
+                body, content_type = result_df.to_json(orient="records"), "application/json"
+            else:
+                body, content_type = result_df.to_csv(index=False), "text/csv"
+        except Exception as error:
+            self.send_text(500, json.dumps({"error": f"{type(error).__name__}: {error}"}), "application/json")
+            return
+        self.send_text(200, body, content_type)
+
+    def send_text(self, status: int, body: str, content_type: str = "text/plain") -> None:
+        """
+        Sends a complete response with the given status and body.
+        """
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        """Keeps the server quiet; every request would otherwise be printed to stderr."""
+        pass
+
+
+
+def run_server(source_file: str = DATA_FILE, port: int = DEFAULT_PORT) -> None:
+    """
+    Starts the resident query server (python spf_analyzer.py serve [--port=<n>]) and serves until interrupted.
+    """
+    server = AnalyzerServer(source_file, port)
+    server.current_analysis()  # Load up front so the first request is as fast as the rest
+    print(f"Serving {source_file} on http://{SERVER_HOST}:{port}/task/<n>", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+
+def run_client(task_numbers: List[int], port: int = DEFAULT_PORT, top_k_size: Optional[int] = None,
+               output: Optional[str] = None) -> None:
+    """
+    Thin client of the resident server (python spf_analyzer.py client --TASK=...): same options and output
+    files as the normal command line (CSV only), but the work is done by the already-loaded server.
+    """
+    for task_number in task_numbers:
+        url = f"http://{SERVER_HOST}:{port}/task/{task_number}"
+        if top_k_size is not None:
+            url += f"?top_k={top_k_size}"
+
+        try:
+            with urllib.request.urlopen(url) as response:
+                body = response.read()
+        except urllib.error.HTTPError as error:
+            print(f"Error: the analyzer server answered {error.code}: {error.read().decode(errors='replace')}")
+            sys.exit(1)
+        except (urllib.error.URLError, OSError) as error:
+            print(f"Error: could not reach the analyzer server on port {port}: {error}")
+            sys.exit(1)
+
+        output_file = output_path(task_number, task_numbers, "csv", output)
+        if output_file == STDOUT:
+            sys.stdout.buffer.write(body)
+            sys.stdout.flush()
+            continue
+        with open(output_file, "wb") as file:
+            file.write(body)
+
+
+
+def has_flag(flag: str) -> bool:
+    """
+    Checks whether a bare flag (e.g. --no-cache) was given on the command line.
+    """
+    return flag in sys.argv[1:]
+
+
+
+def get_option(name: str, default: Optional[str] = None) -> Optional[str]:
+    """
+    Returns the value of a --NAME=value option from the command line, or default when it is absent.
+    """
+    for arg in sys.argv[1:]:
+        if arg.startswith(name + "="):
+            return arg.split("=", 1)[1].strip('"')
+    return default
+
+
+
+def get_int_option(name: str, default: Optional[int]) -> Optional[int]:
+    """
+    Same as get_option(), for options that must be positive integers (exits with an error otherwise).
+    """
+    value = get_option(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        print(f"Error: {name} must be a positive integer")
+        sys.exit(1)
+    return number
+
+
+
+def current_rss_mb() -> float:
+    """
+    Resident memory of this process in MB (/proc on Linux; peak RSS from getrusage elsewhere).
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+
+class Profiler:
+    """
+    Per-stage instrumentation of a run (--profile): wall time, CPU time, rows in/out and memory delta of every
+    load, compute and write stage.
+
+        - Programmatic use: Profiler(on_stage=callback) calls callback(record) as soon as each stage finishes,
+          e.g. to forward the numbers to job metrics; pass the profiler to run_in_memory()/run_lite().
+        - With cprofile_file, the compute stages also run under cProfile and the stats are dumped there.
+    """
+
+    def __init__(self, on_stage: Optional[Callable[[Dict], None]] = None, cprofile_file: Optional[str] = None) -> None:
+        self.stages = []
+        self.on_stage = on_stage
+        self.cprofile_file = cprofile_file
+        self.cprofile = cProfile.Profile() if cprofile_file else None
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+
+    @contextmanager
+    def stage(self, name: str, kind: str, rows_in: Optional[int] = None):
+        """
+        Measures the body of a with-block as one stage; the yielded record's rows_in/rows_out can be filled in.
+
+            Parameters
+            -------
+            name (str): Stage name, e.g. 'task_4'.
+            kind (str): 'load', 'compute', 'write', 'run' (a whole streaming/sharded run) or 'cache' (a result cache hit).
+            rows_in (int, optional): Rows going into the stage, when known up front.
+        """
+        record = {"stage": name, "kind": kind, "rows_in": rows_in, "rows_out": None}
+        rss, wall, cpu = current_rss_mb(), time.perf_counter(), time.process_time()
+        if self.cprofile is not None and kind == "compute":
+            self.cprofile.enable()
+        try:
+            yield record
+        finally:
+            if self.cprofile is not None and kind == "compute":
+                self.cprofile.disable()
+            record["wall_s"] = time.perf_counter() - wall
+            record["cpu_s"] = time.process_time() - cpu
+            record["rss_delta_mb"] = current_rss_mb() - rss
+            self.stages.append(record)
+            if self.on_stage is not None:
+                self.on_stage(record)
+
+    def totals(self) -> Dict[str, float]:
+        """
+        Wall and CPU time since the profiler was created, and the time spent per kind of stage.
+        """
+        totals = {"wall_s": time.perf_counter() - self.started, "cpu_s": time.process_time() - self.cpu_started}
+        for record in self.stages:
+            key = record["kind"] + "_s"
+            totals[key] = totals.get(key, 0.0) + record["wall_s"]
+        return totals
+
+    def summary(self) -> str:
+        """
+        One-line summary of the run, e.g. 'profile: wall 0.412s cpu 0.398s | load 0.380s compute 0.020s ...'.
+        """
+        totals = self.totals()
+        parts = [f"{kind} {totals[kind + '_s']:.3f}s" for kind in ("cache", "load", "compute", "write", "run")
+                 if kind + "_s" in totals]
+        rows = next((record["rows_out"] for record in self.stages if record["kind"] == "load"), None)
+        line = f"profile: wall {totals['wall_s']:.3f}s cpu {totals['cpu_s']:.3f}s | " + " ".join(parts)
+        return line + (f" | {rows} rows loaded" if rows is not None else "")
+
+    def write_trace(self, trace_file: str) -> None:
+        """
+        Writes every stage record (plus the totals) as JSON, and the cProfile stats if they were collected.
+        """
+        with open(trace_file, "w") as file:
+            json.dump({"stages": self.stages, "totals": self.totals()}, file, indent=1)
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(self.cprofile_file)
+
+
+
+# Size cap of the on-disk result cache (--result-cache-size=<MB> overrides it)
+RESULT_CACHE_LIMIT = 256 * 1024 * 1024
+
+
+
+class ResultCache:
+    """
+    Content-addressed cache of finished task outputs, kept in data/a2-data.csv.results/.
+
+        - An entry's key hashes (task, task parameters, output format, data content hash, code version), so a
+          changed dataset or a new version of this script can never serve a stale result; entries simply stop
+          being used and age out.
+        - Entries hold the exact output bytes, so a hit is a file copy: only the stdlib is needed, pandas is
+          never imported.
+        - The content hash of the data is remembered per (size, mtime) signature, so a hit does not re-read
+          the whole CSV either.
+        - Least recently used entries are evicted once the cache grows past its size limit (a hit refreshes
+          the entry's mtime).
+    """
+
+    def __init__(self, source_file: str = DATA_FILE, limit: int = RESULT_CACHE_LIMIT) -> None:
+        """
+        Parameters
+        -------
+        source_file (str, optional): Path of the CSV file the results are computed from.
+        limit (int, optional): Size cap of the cache in bytes.
+        """
+        self.source_file = source_file
+        self.cache_dir = source_file + ".results"
+        self.limit = limit
+        self.data_hash = None
+
+    def data_digest(self) -> str:
+        """
+        Content hash of the source file, reusing the one computed for its current size/mtime if any.
+        """
+        if self.data_hash is None:
+            signature = file_signature(self.source_file)
+            digests_file = os.path.join(self.cache_dir, "digests.json")
+            try:
+                with open(digests_file) as file:
+                    known = json.load(file)
+            except (OSError, ValueError):
+                known = {}
+            key = f"{signature['size']}:{signature['mtime_ns']}"
+            if key not in known:
+                known = {key: file_digest(self.source_file)}
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(digests_file + ".tmp", "w") as file:
+                    json.dump(known, file)
+                os.replace(digests_file + ".tmp", digests_file)
+            self.data_hash = known[key]
+        return self.data_hash
+
+    def key(self, task_number: int, params: Dict, output_format: str = "csv") -> str:
+        """
+        Cache key of one task result.
+
+            Parameters
+            -------
+            task_number (int): Task being run.
+            params (Dict): Its parameters from task_parameters().
+            output_format (str, optional): --format of the output.
+
+            Returns
+            -------
+            str: Hex digest addressing the entry.
+        """
+        identity = json.dumps([task_number, params, output_format, self.data_digest(), file_digest(__file__)],
+                              sort_keys=True)
+        return hashlib.blake2b(identity.encode(), digest_size=20).hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        """Path of the output bytes of an entry (its metadata sits next to it in <key>.json)."""
+        return os.path.join(self.cache_dir, key + ".out")
+
+    def fetch(self, key: str, output_file: str) -> bool:
+        """
+        Copies a cached result to output_file ("-" for stdout).
+
+            Returns
+            -------
+            bool: Whether the entry existed.
+        """
+        entry = self.entry_path(key)
+        try:
+            os.utime(entry)  # Marks the entry as recently used
+            if output_file == STDOUT:
+                with open(entry, "rb") as file:
+                    shutil.copyfileobj(file, sys.stdout.buffer)
+                sys.stdout.flush()
+            else:
+                shutil.copyfile(entry, output_file)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def store(self, key: str, output_file: str, info: Dict) -> None:
+        """
+        Adds a freshly written output to the cache, then evicts old entries if it outgrew its limit.
+
+            Parameters
+            -------
+            key (str): Cache key from key().
+            output_file (str): Output just written by the run.
+            info (Dict): Description of the entry shown by list (task, parameters, format).
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = self.entry_path(key)
+        shutil.copyfile(output_file, entry + ".tmp")
+        os.replace(entry + ".tmp", entry)
+        with open(os.path.join(self.cache_dir, key + ".json"), "w") as file:
+            json.dump(dict(info, source=self.source_file, data_hash=self.data_digest()), file)
+        self.evict()
+
+    def entries(self) -> List[Dict]:
+        """
+        Every entry with its size, last use and metadata, most recently used first.
+        """
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".out"):
+                continue
+            key = name[:-len(".out")]
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue  # Removed (or evicted by another run) since it was listed
+            try:
+                with open(os.path.join(self.cache_dir, key + ".json")) as file:
+                    info = json.load(file)
+            except (OSError, ValueError):
+                info = {}
+            entries.append(dict(info, key=key, size=stat.st_size, last_used=stat.st_mtime))
+        return sorted(entries, key=lambda entry: -entry["last_used"])
+
+    def evict(self) -> None:
+        """
+        Deletes least recently used entries until the cache fits its size limit.
+        """
+        total = 0
+        for entry in self.entries():
+            total += entry["size"]
+            if total > self.limit:
+                self.remove(entry["key"])
+
+    def remove(self, key: str) -> None:
+        """Deletes one entry (output bytes and metadata)."""
+        for path in (self.entry_path(key), os.path.join(self.cache_dir, key + ".json")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        """Deletes the whole cache directory."""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+
+def run_cache_command(source_file: str = DATA_FILE) -> None:
+    """
+    python spf_analyzer.py cache [--clear]: lists the cached results (most recently used first) or deletes them.
+    """
+    cache = ResultCache(source_file)
+    if has_flag("--clear"):
+        cache.clear()
+        print(f"Cleared {cache.cache_dir}")
+        return
+
+    entries = cache.entries()
+    for entry in entries:
+        last_used = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["last_used"]))
+        print(f"{entry['key'][:12]}  task {entry.get('task', '?')}  {entry.get('format', '?'):8} "
+              f"{json.dumps(entry.get('params', {})):12} {entry['size']:>10} B  {last_used}")
+    print(f"{len(entries)} entries, {sum(entry['size'] for entry in entries)} bytes in {cache.cache_dir} "
+          f"(limit {cache.limit} bytes)")
+
+
+
+# Inputs smaller than this (in bytes) run on the lite engine unless --engine=full is given
+LITE_SIZE_THRESHOLD = 2 * 1024 * 1024
+
+
+
+def lite_load(source_file: str, columns: List[str]) -> Dict[str, Union[array, List[str]]]:
+    """
+    Lite engine loader: parses the requested columns with the csv module, without pandas.
+
+        Parameters
+        -------
+        source_file (str): Path of the CSV file.
+        columns (List[str]): Columns to keep.
+
+        Returns
+        -------
+        Dict[str, array | List[str]]: Integer columns as array('q'), text columns as lists of strings.
+
+        - Raises ValueError (ragged rows, missing or non-integer values) or KeyError (unknown column) for
+          anything the lite engine cannot reproduce exactly; the caller then falls back to pandas.
+    """
+    with open(source_file, newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        rows = list(reader)
+
+    if any(len(row) != len(header) for row in rows):
+        raise ValueError("ragged rows")
+
+    data = {}
+    for name in columns:
+        position = header.index(name) if name in header else None
+        if position is None:
+            raise KeyError(name)
+        values = [row[position] for row in rows]
+        data[name] = values if SCHEMA.get(name) == 'category' else array('q', map(int, values))
+    return data
+
+
+
+def lite_round(value: float) -> float:
+    """
+    Rounds to one decimal exactly like pandas' round(1) (scale, round half to even, unscale).
+    """
+    return round(value * 10) / 10
+
+
+
+def lite_ranked(data: Dict, candidates, k: int) -> List[int]:
+    """
+    Row numbers of the k best candidates by Exam_Score (descending), then Record_ID (ascending), then file order.
+    """
+    scores, ids = data['Exam_Score'], data['Record_ID']
+    return heapq.nsmallest(k, candidates, key=lambda i: (-scores[i], ids[i], i))
+
+
+
+def lite_grade_totals(data: Dict, scale: GradeScale, column: str) -> Tuple[List[int], List[int]]:
+    """
+    Per-grade (sums, counts) of a column, indexed by grade code of the scale.
+    """
+    sums = [0] * len(scale.categories)
+    counts = [0] * len(scale.categories)
+    for score, value in zip(data['Exam_Score'], data[column]):
+        code = scale.code_of(score)
+        sums[code] += value
+        counts[code] += 1
+    return sums, counts
+
+
+
+def lite_task_1(data: Dict) -> Tuple[List[str], List[tuple]]:
+    """
+    Lite engine version of task_1; returns (header, rows).
+    """
+    ids, hours, scores = data['Record_ID'], data['Hours_Studied'], data['Exam_Score']
+    rows = [(ids[i], hours[i], scores[i]) for i in range(len(ids)) if hours[i] > 40]
+    return ['Record_ID', 'Hours_Studied', 'Exam_Score'], rows
+
+
+
+def lite_task_2(data: Dict, k: int = 10) -> Tuple[List[str], List[tuple]]:
+    """
+    Lite engine version of task_2; returns (header, rows).
+    """
+    ids, hours, scores = data['Record_ID'], data['Hours_Studied'], data['Exam_Score']
+    candidates = [i for i in range(len(ids)) if scores[i] >= 85]
+    rows = [(ids[i], hours[i], scores[i]) for i in lite_ranked(data, candidates, k)]
+    return ['Record_ID', 'Hours_Studied', 'Exam_Score'], rows
+
+
+
+def lite_task_3(data: Dict) -> Tuple[List[str], List[tuple]]:
+    """
+    Lite engine version of task_3; returns (header, rows).
+    """
+    ids, attendance, scores = data['Record_ID'], data['Attendance'], data['Exam_Score']
+    activities = data['Extracurricular_Activities']
+    rows = [(ids[i], scores[i]) for i in range(len(ids)) if attendance[i] == 100 and activities[i] == 'Yes']
+    return ['Record_ID', 'Exam_Score'], rows
+
+
+
+def lite_task_4(data: Dict) -> Tuple[List[str], List[tuple]]:
+    """
+    Lite engine version of task_4; returns (header, rows). Grades without students get an empty Attendance.
+    """
+    sums, counts = lite_grade_totals(data, UVIC_SCALE, 'Attendance')
+    rows = []
+    for code, grade in enumerate(UVIC_SCALE.grades):
+        rows.append((grade, lite_round(sums[code] / counts[code]) if counts[code] else None))
+    return ['Grade', 'Attendance'], rows
+
+
+
+def lite_task_5(data: Dict, k: int = 50) -> Tuple[List[str], List[tuple]]:
+    """
+    Lite engine version of task_5; returns (header, rows).
+    """
+    ids, sessions, scores = data['Record_ID'], data['Tutoring_Sessions'], data['Exam_Score']
+    sums, counts = lite_grade_totals(data, SIMPLIFIED_SCALE, 'Tutoring_Sessions')
+
+    rows = []
+    for i in lite_ranked(data, range(len(ids)), k):
+        code = SIMPLIFIED_SCALE.code_of(scores[i])
+        average = lite_round(sums[code] / counts[code])
+        rows.append((ids[i], sessions[i], average, sessions[i] > average, scores[i], SIMPLIFIED_SCALE.categories[code]))
+    header = ['Record_ID', 'Tutoring_Sessions', 'Grade_Average_Tutoring_Sessions', 'Above_Average', 'Exam_Score', 'Grade']
+    return header, rows
+
+
+
+def lite_write(header: List[str], rows: List[tuple], output_file: str) -> None:
+    """
+    Writes a lite engine result with the same formatting as write_output() (None becomes an empty field).
+    """
+    if output_file == STDOUT:
+        writer = csv.writer(sys.stdout, lineterminator=os.linesep)
+        writer.writerow(header)
+        writer.writerows(rows)
+        return
+
+    with open(output_file, "w", newline='') as file:
+        writer = csv.writer(file, lineterminator=os.linesep)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+
+def run_lite(task_numbers: List[int], source_file: str = DATA_FILE, top_k_size: Optional[int] = None,
+             profiler: Optional[Profiler] = None, output_format: str = "csv", output: Optional[str] = None) -> None:
+    """
+    Runs tasks on the lite engine (stdlib csv/array/heapq only); output is identical to the pandas engine.
+
+        Parameters
+        -------
+        task_numbers (List[int]): Tasks to run.
+        source_file (str, optional): Path of the CSV file. Defaults to data/a2-data.csv.
+        top_k_size (int, optional): --top-k override for Tasks #2 and #5.
+        profiler (Profiler, optional): Records the load/compute/write stages.
+        output_format (str, optional): --format of the outputs. Defaults to csv.
+        output (str, optional): --output path, see output_path().
+
+        - Only plain CSV output is supported; other formats raise ValueError (the auto engine then uses pandas).
+    """
+    if output_format != "csv":
+        raise ValueError(f"the lite engine only writes csv, not {output_format}")
+    profiler = profiler or Profiler()
+
+    columns = required_columns(task_numbers)
+    with profiler.stage("dataset", "load") as record:
+        data = lite_load(source_file, columns)
+        record["rows_out"] = len(data[columns[0]])
+
+    for task_number in task_numbers:
+        with profiler.stage(f"task_{task_number}", "compute", record["rows_out"]) as compute:
+            header, rows = LITE_TASKS[task_number](data, **task_parameters(task_number, top_k_size))
+            compute["rows_out"] = len(rows)
+        with profiler.stage(f"task_{task_number}", "write", len(rows)):
+            lite_write(header, rows, output_path(task_number, task_numbers, output_format, output))
+
+
+
+# --engine=sqlite: secondary indexes of the students table (the score index also serves the rankings in order)
+# and the layout version of the store
+SQLITE_INDEXES = {
+    'students_exam_score': '(Exam_Score DESC, Record_ID)',
+    'students_hours_studied': '(Hours_Studied)',
+    'students_attendance': '(Attendance, Extracurricular_Activities)',
+    'students_record_id': '(Record_ID)',
+}
+SQLITE_VERSION = 1
+
+
+
+def sqlite_path_for(source_file: str) -> str:
+    """
+    Returns the SQLite store that holds the ingested rows of a CSV file (e.g. data/a2-data.csv.sqlite).
+    """
+    return source_file + ".sqlite"
+
+
+
+def sqlite_append(connection: sqlite3.Connection, source_file: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Bulk-inserts the rows of a CSV into the students table (created from the CSV header when missing).
+
+        Parameters
+        -------
+        connection (sqlite3.Connection): Open store; the caller commits.
+        source_file (str): CSV whose rows are appended, in file order.
+        chunk_size (int, optional): Rows parsed and inserted per batch.
+
+        Returns
+        -------
+        int: Number of rows appended.
+
+        - Raises ValueError when the CSV's columns do not match the table's.
+    """
+    with open(source_file) as file:
+        columns = file.readline().strip().split(",")
+
+    existing = [row[1] for row in connection.execute("PRAGMA table_info(students)")]
+    if not existing:
+        # Integer SCHEMA columns get INTEGER affinity, the categorical ones TEXT
+        definitions = [f'"{name}" {"TEXT" if SCHEMA.get(name, "category") == "category" else "INTEGER"}'
+                       for name in columns]
+        connection.execute(f"CREATE TABLE students ({', '.join(definitions)})")
+    elif existing != columns:
+        raise ValueError(f"the columns of {source_file} do not match the ingested dataset")
+
+    insert = f"INSERT INTO students VALUES ({', '.join('?' * len(columns))})"
+    rows = 0
+    for chunk in pd.read_csv(source_file, chunksize=chunk_size, dtype=parse_dtypes(integers=False)):
+        # Python ints/strs and None for missing values, which is what sqlite3 binds
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        connection.executemany(insert, chunk.itertuples(index=False, name=None))
+        rows += len(chunk)
+    return rows
+
+
+
+def sqlite_sources(store_file: str) -> List[Dict]:
+    """
+    Files ingested into a store, in order (the dataset first, then every --append), or [] for an unusable store.
+    """
+    if not os.path.exists(store_file):
+        return []
+    try:
+        connection = sqlite3.connect(store_file)
+        try:
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SQLITE_VERSION:
+                return []
+            rows = connection.execute("SELECT path, size, mtime_ns, rows FROM sources ORDER BY position").fetchall()
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return []
+    return [{"path": path, "size": size, "mtime_ns": mtime_ns, "rows": count} for path, size, mtime_ns, count in rows]
+
+
+
+def sqlite_record_source(connection: sqlite3.Connection, source_file: str, rows: int) -> None:
+    """
+    Notes an ingested file (and its signature) in the sources table.
+    """
+    signature = file_signature(source_file)
+    connection.execute("INSERT INTO sources (path, size, mtime_ns, rows) VALUES (?, ?, ?, ?)",
+                       (source_file, signature["size"], signature["mtime_ns"], rows))
+
+
+
+def sqlite_build(source_file: str, appended: List[str] = ()) -> None:
+    """
+    (Re)builds the store of a CSV: bulk-loads the dataset and any appended files, then creates the indexes.
+
+        - The store is written next to the final one and swapped in at the end, so a failed build never leaves
+          a half-loaded store behind. Indexes are created after the bulk load, which is much faster than
+          maintaining them row by row.
+    """
+    store_file = sqlite_path_for(source_file)
+    temp_file = store_file + ".tmp"
+    if os.path.exists(temp_file):
+        os.remove(temp_file)
+
+    connection = sqlite3.connect(temp_file)
+    try:
+        # Durability does not matter for a store that can always be rebuilt from its files
+        connection.execute("PRAGMA journal_mode=OFF")
+        connection.execute("PRAGMA synchronous=OFF")
+        connection.execute("CREATE TABLE sources (position INTEGER PRIMARY KEY, path TEXT, size INTEGER, "
+                           "mtime_ns INTEGER, rows INTEGER)")
+        for path in [source_file, *appended]:
+            sqlite_record_source(connection, path, sqlite_append(connection, path))
+        for name, definition in SQLITE_INDEXES.items():
+            connection.execute(f"CREATE INDEX {name} ON students {definition}")
+        connection.execute("ANALYZE")
+        connection.execute(f"PRAGMA user_version = {SQLITE_VERSION}")
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(temp_file, store_file)
+
+
+
+def sqlite_open(source_file: str = DATA_FILE, refresh: bool = False) -> sqlite3.Connection:
+    """
+    Opens the store of a CSV, ingesting it first when the store is missing, outdated or the CSV has changed.
+
+        Parameters
+        -------
+        source_file (str, optional): Path of the CSV file. Defaults to data/a2-data.csv.
+        refresh (bool, optional): Rebuild the store even if it looks current (ingest --refresh).
+
+        Returns
+        -------
+        sqlite3.Connection: Connection to data/a2-data.csv.sqlite.
+
+        - A rebuild re-ingests the files appended earlier, in the same order; it raises ValueError if one of
+          them is gone, since its rows would be lost.
+    """
+    store_file = sqlite_path_for(source_file)
+    sources = sqlite_sources(store_file)
+    current = bool(sources) and sources[0]["path"] == source_file \
+        and {"size": sources[0]["size"], "mtime_ns": sources[0]["mtime_ns"]} == file_signature(source_file)
+
+    if refresh or not current:
+        appended = [source["path"] for source in sources[1:]]
+        missing = [path for path in appended if not os.path.exists(path)]
+        if missing:
+            raise ValueError(f"cannot rebuild {store_file}: appended file {missing[0]} no longer exists")
+        sqlite_build(source_file, appended)
+    return sqlite3.connect(store_file)
+
+
+
+def sqlite_ingest(source_file: str = DATA_FILE, append_files: List[str] = (), refresh: bool = False) -> None:
+    """
+    "ingest" command: builds the store of the dataset if needed, then bulk-appends more CSV files to it
+    (--append=<csv>[,<csv>...]) inside one transaction, with the indexes kept up to date.
+    """
+    connection = sqlite_open(source_file, refresh)
+    try:
+        for append_file in append_files:
+            sqlite_record_source(connection, append_file, sqlite_append(connection, append_file))
+        connection.commit()
+        rows = connection.execute("SELECT SUM(rows), COUNT(*) FROM sources").fetchone()
+    finally:
+        connection.close()
+    print(f"{sqlite_path_for(source_file)}: {rows[0]} rows from {rows[1]} file(s)")
+
+
+
+def sqlite_grade_totals(connection: sqlite3.Connection, scale: GradeScale, column: str) -> pd.DataFrame:
+    """
+    SQLite engine version of grade_totals(): the store totals the column per distinct Exam_Score, and those few
+    rows are folded into grades here.
+    """
+    # Every row is read anyway, and a table scan is cheaper than walking the score index with a lookup per row
+    per_score = pd.read_sql_query(f'SELECT Exam_Score, SUM("{column}") AS "sum", COUNT("{column}") AS "count" '
+                                  f'FROM students NOT INDEXED GROUP BY Exam_Score', connection)
+    totals = per_score[['sum', 'count']].fillna(0).astype('int64').groupby(scale.codes(per_score['Exam_Score'])).sum()
+    return totals.reindex(range(len(scale.categories)), fill_value=0).set_axis(scale.categories)
+
+
+
+def sqlite_ranked(connection: sqlite3.Connection, columns: List[str], k: int, where: str = "1") -> pd.DataFrame:
+    """
+    The k best rows by Exam_Score (descending), then Record_ID (ascending), then file order; read in order from
+    the students_exam_score index, so only those rows are touched.
+    """
+    return pd.read_sql_query(f"SELECT {', '.join(columns)} FROM students WHERE {where} "
+                             f"ORDER BY Exam_Score DESC, Record_ID, rowid LIMIT ?", connection, params=(k,))
+
+
+
+def sqlite_task_1(connection: sqlite3.Connection) -> pd.DataFrame:
+    """
+    SQLite engine version of task_1: a range scan of students_hours_studied, returned in file order.
+    """
+    # Without value histograms the planner would rather scan the table in rowid order than sort the few matches
+    return pd.read_sql_query("SELECT Record_ID, Hours_Studied, Exam_Score FROM students "
+                             "INDEXED BY students_hours_studied WHERE Hours_Studied > 40 ORDER BY rowid", connection)
+
+
+
+def sqlite_task_2(connection: sqlite3.Connection, k: int = 10) -> pd.DataFrame:
+    """
+    SQLite engine version of task_2.
+    """
+    return sqlite_ranked(connection, ['Record_ID', 'Hours_Studied', 'Exam_Score'], k, "Exam_Score >= 85")
+
+
+
+def sqlite_task_3(connection: sqlite3.Connection) -> pd.DataFrame:
+    """
+    SQLite engine version of task_3: an equality lookup on students_attendance, returned in file order.
+    """
+    return pd.read_sql_query("SELECT Record_ID, Exam_Score FROM students "
+                             "WHERE Attendance = 100 AND Extracurricular_Activities = 'Yes' ORDER BY rowid", connection)
+
+
+
+def sqlite_task_4(connection: sqlite3.Connection) -> pd.DataFrame:
+    """
+    SQLite engine version of task_4.
+    """
+    return task_4_result(sqlite_grade_totals(connection, UVIC_SCALE, 'Attendance'))
+
+
+
+def sqlite_task_5(connection: sqlite3.Connection, k: int = 50) -> pd.DataFrame:
+    """
+    SQLite engine version of task_5.
+    """
+    totals = sqlite_grade_totals(connection, SIMPLIFIED_SCALE, 'Tutoring_Sessions')
+    return task_5_result(sqlite_ranked(connection, ['Record_ID', 'Tutoring_Sessions', 'Exam_Score'], k), totals, k)
+
+
+
+def run_sqlite(task_numbers: List[int], source_file: str = DATA_FILE, top_k_size: Optional[int] = None,
+               profiler: Optional[Profiler] = None, output_format: str = "csv", output: Optional[str] = None) -> None:
+    """
+    Runs tasks as indexed queries against the SQLite store of the dataset (--engine=sqlite); output is identical
+    to the pandas engine over the same rows.
+
+        Parameters
+        -------
+        task_numbers (List[int]): Tasks to run.
+        source_file (str, optional): Path of the CSV file. Defaults to data/a2-data.csv.
+        top_k_size (int, optional): --top-k override for Tasks #2 and #5.
+        profiler (Profiler, optional): Records the load/compute/write stages.
+        output_format (str, optional): --format of the outputs. Defaults to csv.
+        output (str, optional): --output path, see output_path().
+
+        - The first run ingests the CSV (see sqlite_open()); later runs only read the matching rows of the
+          selective tasks. Rows added with "ingest --append" are part of every result.
+    """
+    profiler = profiler or Profiler()
+
+    with profiler.stage("store", "load"):
+        connection = sqlite_open(source_file)
+    try:
+        for task_number in task_numbers:
+            with profiler.stage(f"task_{task_number}", "compute") as compute:
+                result_df = SQLITE_TASKS[task_number](connection, **task_parameters(task_number, top_k_size))
+                compute["rows_out"] = len(result_df)
+            with profiler.stage(f"task_{task_number}", "write", len(result_df)):
+                write_output(result_df, output_path(task_number, task_numbers, output_format, output), output_format)
+    finally:
+        connection.close()
+
+
+
+def run_in_memory(task_numbers: List[int], source_file: str = DATA_FILE, top_k_size: Optional[int] = None,
+                  use_cache: bool = True, refresh_cache: bool = False, profiler: Optional[Profiler] = None,
+                  output_format: str = "csv", output: Optional[str] = None,
+                  thresholds: Optional[List[float]] = None, digest: Optional[str] = None) -> None:
+    """
+    Runs tasks on the pandas engine: loads the needed columns once and shares one Analysis between the tasks.
+
+        Parameters
+        -------
+        task_numbers (List[int]): Tasks to run.
+        source_file (str, optional): Path of the CSV file. Defaults to data/a2-data.csv.
+        top_k_size (int, optional): --top-k override for Tasks #2 and #5.
+        use_cache, refresh_cache (bool, optional): Binary cache options, see load_data().
+        profiler (Profiler, optional): Records the load/compute/write stages.
+        output_format (str, optional): --format of the outputs. Defaults to csv.
+        output (str, optional): --output path, see output_path().
+        thresholds (List[float], optional): --thresholds; runs the SWEEPS versions of the tasks over them instead.
+        digest (str, optional): Content hash of the CSV if already known, see load_data().
+    """
+    profiler = profiler or Profiler()
+
+    # Load the given DataFrame and its dataset (once for every requested task), through the binary cache
+    with profiler.stage("dataset", "load") as record:
+        df = load_data(source_file, required_columns(task_numbers), use_cache=use_cache, refresh_cache=refresh_cache,
+                       digest=digest)
+        record["rows_out"] = len(df)
+
+    # Execute the requested tasks; intermediates are shared between them
+    analysis = Analysis(df)
+    for task_number in task_numbers:
+        with profiler.stage(f"task_{task_number}", "compute", len(df)) as compute:
+            if thresholds is None:
+                result_df = TASKS[task_number](analysis, **task_parameters(task_number, top_k_size))
+            else:
+                result_df = SWEEPS[task_number](analysis, thresholds, **task_parameters(task_number, top_k_size))
+            compute["rows_out"] = len(result_df)
+        with profiler.stage(f"task_{task_number}", "write", len(result_df)):
+            write_output(result_df, output_path(task_number, task_numbers, output_format, output), output_format)
+
+
+
+# Assignment 1 datasets, joined on Record_ID by the merge command
+CURRICULAR_FILE = "data/a1-data-curricular.csv"
+EXTRACURRICULAR_FILE = "data/a1-data-extracurricular.yaml"
+CURRICULAR_COLUMNS = ['Record_ID', 'Hours_Studied', 'Attendance', 'Tutoring_Sessions', 'Exam_Score']
+EXTRACURRICULAR_COLUMNS = ['Extracurricular_Activities', 'Physical_Activity', 'Record_ID', 'Sleep_Hours']
+
+
+
+def load_curricular(source_file: str = CURRICULAR_FILE) -> pd.DataFrame:
+    """
+    Reads the curricular CSV of Assignment 1 (every record, no MAX_RECORDS cap).
+    """
+    return read_csv_typed(source_file, CURRICULAR_COLUMNS)
+
+
+
+# Records per chunk yielded by iter_extracurricular()
+YAML_CHUNK_RECORDS = 100_000
+
+
+
+def extracurricular_chunk(lines: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turns the key/value lines of whole records into typed columns, or raises ValueError if they do not have
+    the exact shape iter_extracurricular() expects (or numpy is older than 2.0).
+    """
+    width = len(EXTRACURRICULAR_COLUMNS)
+    codes, keys = pd.factorize(lines['key'])
+    codes = codes.reshape(-1, width)
+
+    # Every record must list the same keys in the same order: '- <first key>' then '  <key>' for the others
+    first = [keys[code] for code in codes[0]]
+    if (sorted(key[2:] for key in first) != sorted(EXTRACURRICULAR_COLUMNS) or first[0][:2] != "- "
+            or any(key[:2] != "  " for key in first[1:]) or not (codes == codes[0]).all()):
+        raise ValueError("unexpected record keys")
+    if not hasattr(np, "strings"):
+        raise ValueError("the fast reader needs numpy 2.0 or later")  # load_extracurricular() uses yaml instead
+
+    text = np.dtypes.StringDType()
+    values = np.array(lines['value'].to_numpy(dtype=object), dtype=text).reshape(-1, width)
+    columns = {}
+    for position, key in enumerate(first):
+        name, column = key[2:], values[:, position]
+        if not np.strings.startswith(column, " ").all():
+            raise ValueError(f"{name} is not followed by ': '")
+        column = np.strings.slice(column, 1, None)
+        if name == 'Extracurricular_Activities':
+            yes = column == "'Yes'"
+            if not (yes | (column == "'No'")).all():
+                raise ValueError("Extracurricular_Activities must be 'Yes' or 'No'")
+            columns[name] = yes
+        else:
+            # Canonical decimal integers only: YAML reads '010' as octal, '1.0' as a float, '1_0' as 10, ...
+            try:
+                numbers = column.astype(np.int64)
+            except (ValueError, OverflowError) as error:
+                raise ValueError(f"{name} has a value that is not an integer") from error
+            if not (numbers.astype(text) == column).all():
+                raise ValueError(f"{name} has an integer that is not written canonically")
+            columns[name] = numbers
+    return pd.DataFrame(columns, columns=EXTRACURRICULAR_COLUMNS)
+
+
+
+def iter_extracurricular(source_file: str = EXTRACURRICULAR_FILE, chunk_records: int = YAML_CHUNK_RECORDS):
+    """
+    Streams the extracurricular YAML as columnar chunks without building the generic YAML object graph.
+
+        Parameters
+        -------
+        source_file (str, optional): Path of the YAML file.
+        chunk_records (int, optional): Records per chunk (memory stays proportional to it, not to the file).
+
+        Yields
+        -------
+        pd.DataFrame: Up to chunk_records records: Extracurricular_Activities as bool, the other columns as int64.
+
+        - Only the fixed shape the dataset is written in is recognized: a 'records:' line, then block-style
+          list items of exactly the four keys, with 'Yes'/'No' quoted and plain integers. The key/value lines
+          are split by pandas' C CSV parser (':' as the separator), four lines per record.
+        - Anything else (comments, flow style, missing or extra keys, other scalars, ...) raises ValueError,
+          possibly after some chunks were yielded; load_extracurricular() then falls back to a YAML parser.
+    """
+    with open(source_file, newline='') as file:
+        if file.readline().rstrip("\r\n") != "records:":
+            raise ValueError("the file does not start with a 'records:' list")
+        # Blank lines are dropped here rather than by the parser: its blank line detection can swallow the
+        # indentation of a line that straddles two of its read buffers
+        reader = pd.read_csv(file, sep=":", header=None, names=['key', 'value'],
+                             dtype={'key': 'category', 'value': object}, na_filter=False,
+                             quoting=csv.QUOTE_NONE, skip_blank_lines=False,
+                             chunksize=chunk_records * len(EXTRACURRICULAR_COLUMNS))
+        pending = None
+        try:
+            for lines in reader:
+                blank_keys = [key for key in lines['key'].cat.categories if not key.strip()]
+                if blank_keys:
+                    lines = lines.loc[~(lines['key'].isin(blank_keys) & (lines['value'] == ""))]
+                if pending is not None:
+                    lines = pd.concat([pending, lines])
+
+                # Whole records only; the lines of a record cut by the chunk boundary wait for the next chunk
+                whole = len(lines) - len(lines) % len(EXTRACURRICULAR_COLUMNS)
+                pending = lines.iloc[whole:]
+                if whole:
+                    yield extracurricular_chunk(lines.iloc[:whole])
+        except pd.errors.ParserError as error:
+            raise ValueError(str(error)) from error
+        if pending is not None and len(pending):
+            raise ValueError("the last record does not have exactly four keys")
+
+
+
+def load_extracurricular(source_file: str = EXTRACURRICULAR_FILE) -> pd.DataFrame:
+    """
+    Reads the extracurricular YAML of Assignment 1 (a 'records' list of mappings) into a DataFrame.
+
+        - The streaming reader (iter_extracurricular()) handles the dataset's own layout; any other valid YAML
+          is read with yaml.safe_load instead.
+    """
+    try:
+        chunks = list(iter_extracurricular(source_file))
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(
+            {name: pd.Series(dtype=bool if name == 'Extracurricular_Activities' else np.int64)
+             for name in EXTRACURRICULAR_COLUMNS})
+        df['Extracurricular_Activities'] = pd.Categorical.from_codes(
+            df['Extracurricular_Activities'].to_numpy().astype(np.int8), categories=['No', 'Yes'])
+        return df
+    except ValueError:
+        pass
+
+    with open(source_file) as file:
+        document = yaml.load(file, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+    records = document.get('records', []) if isinstance(document, dict) else []
+    df = pd.DataFrame.from_records(records, columns=EXTRACURRICULAR_COLUMNS)
+    df['Extracurricular_Activities'] = df['Extracurricular_Activities'].replace({True: 'Yes', False: 'No'})
+    df['Extracurricular_Activities'] = df['Extracurricular_Activities'].astype(SCHEMA['Extracurricular_Activities'])
+    return df
+
+
+
+class JoinIndex:
+    """
+    Build side of hash_join(): the right table with a hash table over its key column, ready to be probed by
+    any number of left tables.
+
+        - Like merge_csv() in Assignment 1, a left row joins the first right row with its key; later duplicates
+          on the right are ignored.
+    """
+
+    def __init__(self, right: pd.DataFrame, on: str = 'Record_ID') -> None:
+        """
+        Parameters
+        -------
+        right (pd.DataFrame): Build side.
+        on (str, optional): Key column. Defaults to Record_ID.
+        """
+        right = right.drop_duplicates(on, keep='first')
+        self.on = on
+        self.keys = pd.Index(right[on])
+        self.keys.is_unique  # Builds the hash table now rather than on the first probe
+        self.columns = right.drop(columns=on).reset_index(drop=True)
+
+    def probe(self, left: pd.DataFrame, how: str = 'inner',
+              left_filter: Optional[Callable[[pd.DataFrame], pd.Series]] = None) -> pd.DataFrame:
+        """
+        Joins left against the indexed table (see hash_join() for the parameters).
+        """
+        if how not in ('inner', 'left'):
+            raise ValueError(f"Unknown join type: {how}")
+        if left_filter is not None:
+            left = left.loc[left_filter(left)]
+
+        positions = self.keys.get_indexer(left[self.on])
+        if how == 'inner':
+            matched = positions >= 0
+            left, columns = left.loc[matched], self.columns.take(positions[matched])
+        else:
+            # Unmatched rows (position -1) come out all-missing; integer columns turn nullable to stay integers
+            columns = self.columns.astype({name: f"{'U' if dtype.kind == 'u' else ''}Int{dtype.itemsize * 8}"
+                                           for name, dtype in self.columns.dtypes.items()
+                                           if isinstance(dtype, np.dtype) and dtype.kind in "iu"})
+            columns = columns.reindex(positions)
+
+        return pd.concat([left.reset_index(drop=True), columns.reset_index(drop=True)], axis=1)
+
+
+
+def hash_join(left: pd.DataFrame, right: pd.DataFrame, on: str = 'Record_ID', how: str = 'inner',
+              left_filter: Optional[Callable[[pd.DataFrame], pd.Series]] = None,
+              right_filter: Optional[Callable[[pd.DataFrame], pd.Series]] = None) -> pd.DataFrame:
+    """
+    Joins two tables on a key column in linear time: a hash table is built over the right keys and probed once
+    per left row.
+
+        Parameters
+        -------
+        left (pd.DataFrame): Probe side; the result keeps its row order.
+        right (pd.DataFrame): Build side.
+        on (str, optional): Key column present in both tables. Defaults to Record_ID.
+        how (str, optional): 'inner' drops left rows without a match, 'left' keeps them with missing right columns.
+        left_filter, right_filter (Callable, optional): Predicates pushed down below the join, so rows they
+            reject are never hashed or probed (e.g. Exam_Score > 90 for Task #3).
+
+        Returns
+        -------
+        pd.DataFrame: Left columns followed by the right columns (except the key), one row per kept left row.
+    """
+    if right_filter is not None:
+        right = right.loc[right_filter(right)]
+    return JoinIndex(right, on).probe(left, how, left_filter)
+
+
+
+def merged_task_3(merged: pd.DataFrame) -> pd.DataFrame:
+    """
+    Assignment 1 Task #3: every merged column of the students scoring above 90 (pushed down below the join).
+    """
+    return merged.loc[:, ['Record_ID', 'Hours_Studied', 'Attendance', 'Tutoring_Sessions', 'Exam_Score',
+                          'Extracurricular_Activities', 'Physical_Activity', 'Sleep_Hours']]
+
+
+
+def merged_task_5(merged: pd.DataFrame) -> pd.DataFrame:
+    """
+    Assignment 1 Task #5: students who sleep at least as many hours as they study.
+    """
+    return merged.loc[(merged['Sleep_Hours'] >= merged['Hours_Studied']).fillna(False).astype(bool),
+                      ['Record_ID', 'Exam_Score']]
+
+
+
+def merged_task_6(merged: pd.DataFrame) -> pd.DataFrame:
+    """
+    Assignment 1 Task #6: students scoring below 60, with their extracurricular participation.
+    """
+    return merged.loc[merged['Exam_Score'] < 60, ['Record_ID', 'Exam_Score', 'Extracurricular_Activities']]
+
+
+
+# Assignment 1 tasks over the joined datasets: task function and the curricular predicate pushed below the join
+MERGED_TASKS = {
+    3: (merged_task_3, lambda df: df['Exam_Score'] > 90),
+    5: (merged_task_5, None),
+    6: (merged_task_6, lambda df: df['Exam_Score'] < 60),
+}
+
+
+
+def is_fixed_shape_yaml(source_file: str) -> bool:
+    """
+    Quick look at the first lines of a YAML file: whether iter_extracurricular() will most likely read it (pandas'
+    C parser, which releases the GIL) rather than the YAML fallback (which holds it).
+    """
+    try:
+        with open(source_file) as file:
+            return file.readline().rstrip("\r\n") == "records:" and file.readline().startswith("- ")
+    except OSError:
+        return False
+
+
+
+# Smallest file whose GIL-holding parse is worth a worker process (forking and pickling the result back cost
+# more than parsing a smaller file on a thread; libyaml reads roughly 1 MB a second)
+PROCESS_LOAD_MIN_BYTES = 1 << 16
+
+
+
+def load_sources(sources: Dict[str, Tuple[Callable, tuple, bool]]):
+    """
+    Loads independent data sources concurrently, yielding (name, result) in the order they complete.
+
+        Parameters
+        -------
+        sources (Dict[str, Tuple[Callable, tuple, bool]]): name -> (loader, arguments, holds_gil).
+
+        - Loaders whose parser releases the GIL (pandas' C CSV parser) run on threads, which share memory for free;
+          the ones that hold it (pure Python or libyaml parsing) run in worker processes so they do not take turns
+          with the others.
+        - The process pool is only started when some source holds the GIL, and a single source is loaded inline
+          (there is nothing to overlap it with).
+        - The total time approaches the slowest load instead of the sum (given a spare CPU core for each one).
+    """
+    if len(sources) == 1:
+        (name, (loader, arguments, _)), = sources.items()
+        yield name, loader(*arguments)
+        return
+
+    holds_gil = [name for name, (_, _, gil) in sources.items() if gil]
+    releases_gil = [name for name in sources if name not in holds_gil]
+    with ExitStack() as pools:
+        # The worker processes are forked before any thread starts (forking while a thread holds a lock can hang them)
+        if holds_gil:
+            processes = pools.enter_context(ProcessPoolExecutor(max_workers=len(holds_gil)))
+        if releases_gil:
+            threads = pools.enter_context(ThreadPoolExecutor(max_workers=len(releases_gil)))
+        futures = {}
+        for name in holds_gil + releases_gil:
+            loader, arguments, gil = sources[name]
+            futures[(processes if gil else threads).submit(loader, *arguments)] = name
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+
+def run_merge(task_numbers: List[int], curricular_file: str = CURRICULAR_FILE,
+              extracurricular_file: str = EXTRACURRICULAR_FILE, how: str = 'inner', output_format: str = "csv",
+              output: Optional[str] = None) -> None:
+    """
+    Runs Assignment 1 Tasks #3, #5 and #6 over the curricular CSV joined with the extracurricular YAML
+    (python spf_analyzer.py merge --TASK=...).
+
+        Parameters
+        -------
+        task_numbers (List[int]): Tasks to run (keys of MERGED_TASKS).
+        curricular_file (str, optional): Curricular CSV (--curricular).
+        extracurricular_file (str, optional): Extracurricular YAML (--extracurricular).
+        how (str, optional): 'inner' (as in Assignment 1) or 'left' join (--join).
+        output_format (str, optional): --format of the outputs. Defaults to csv.
+        output (str, optional): --output path, see output_path().
+
+        - The two files are loaded concurrently (load_sources()) and the join's hash table is built once for
+          every task.
+    """
+    # Both files are parsed at the same time; the YAML side is hashed as soon as it arrives. Only a large YAML
+    # that falls back to the GIL-holding parser gets a worker process
+    slow_yaml = (not is_fixed_shape_yaml(extracurricular_file)
+                 and os.path.exists(extracurricular_file)
+                 and os.path.getsize(extracurricular_file) >= PROCESS_LOAD_MIN_BYTES)
+    sources = {
+        'curricular': (load_curricular, (curricular_file,), False),
+        'extracurricular': (load_extracurricular, (extracurricular_file,), slow_yaml),
+    }
+    for name, df in load_sources(sources):
+        if name == 'curricular':
+            curricular = df
+        else:
+            index = JoinIndex(df, 'Record_ID')
+
+    for task_number in task_numbers:
+        task, predicate = MERGED_TASKS[task_number]
+        merged = index.probe(curricular, how, left_filter=predicate)
+        write_output(task(merged), output_path(task_number, task_numbers, output_format, output), output_format)
+
+
+
+# Fixed-width binary file of joined Assignment 1 rows: the MergedData struct of the C version (eight little-endian
+# int32 fields, Extracurricular_Activities as 1/0) behind a versioned header; the data starts on a 64-byte boundary
+RECORDS_MAGIC = b"SPFREC\x00\x00"
+RECORDS_VERSION = 1
+RECORDS_ALIGNMENT = 64
+MERGED_FIELDS = [
+    ('Record_ID', 'record_id'),
+    ('Hours_Studied', 'hours_studied'),
+    ('Attendance', 'attendance'),
+    ('Tutoring_Sessions', 'tutoring_sessions'),
+    ('Exam_Score', 'exam_score'),
+    ('Extracurricular_Activities', 'extracurricular_activities'),
+    ('Physical_Activity', 'physical_activity'),
+    ('Sleep_Hours', 'sleep_hours'),
+]
+
+
+
+def write_records(merged: pd.DataFrame, records_file: str) -> int:
+    """
+    Exports joined rows (an inner join of the two Assignment 1 datasets) as a fixed-width record file.
+
+        Parameters
+        -------
+        merged (pd.DataFrame): Rows with every column of MERGED_FIELDS and no missing values.
+        records_file (str): File to write (replaced atomically).
+
+        Returns
+        -------
+        int: Number of records written.
+
+        - Layout: RECORDS_MAGIC, then version and header length (two little-endian uint32), then a JSON header
+          listing each field's name, dtype and column, padded to RECORDS_ALIGNMENT; then the records back to back.
+        - Raises ValueError for missing values or integers that do not fit an int32.
+    """
+    dtype = np.dtype([(field, '<i4') for _, field in MERGED_FIELDS])
+    records = np.empty(len(merged), dtype=dtype)
+    for name, field in MERGED_FIELDS:
+        column = merged[name]
+        if column.isna().any():
+            raise ValueError(f"{name} has missing values (only inner joins can be exported)")
+        values = (column == 'Yes').to_numpy() if name == 'Extracurricular_Activities' else column.to_numpy()
+        values = values.astype(np.int64)
+        if len(values) and (values.min() < -2 ** 31 or values.max() >= 2 ** 31):
+            raise ValueError(f"{name} has values that do not fit a 32-bit integer")
+        records[field] = values
+
+    header = json.dumps({
+        "fields": [[field, dtype[field].str, name] for name, field in MERGED_FIELDS],
+        "record_size": dtype.itemsize,
+        "records": len(records),
+    }).encode()
+    prefix = len(RECORDS_MAGIC) + 8
+    length = -(-(prefix + len(header)) // RECORDS_ALIGNMENT) * RECORDS_ALIGNMENT - prefix
+    header = header.ljust(length)
+
+    temp_file = records_file + ".tmp"
+    with open(temp_file, "wb") as file:
+        file.write(RECORDS_MAGIC)
+        file.write(np.array([RECORDS_VERSION, len(header)], dtype='<u4').tobytes())
+        file.write(header)
+        file.write(records.tobytes())
+    os.replace(temp_file, records_file)
+    return len(records)
+
+
+
+def open_records(records_file: str) -> Tuple[np.ndarray, Dict[str, str]]:
+    """
+    Maps a record file into memory without reading it.
+
+        Parameters
+        -------
+        records_file (str): File written by write_records().
+
+        Returns
+        -------
+        Tuple[np.ndarray, Dict[str, str]]: Read-only structured np.memmap of the records (each field is a
+        zero-copy strided view, paged in on first touch and shared through the page cache by every process
+        mapping the file), and the column name of each field.
+
+        - Raises ValueError for another format, an unknown version or a truncated file.
+    """
+    with open(records_file, "rb") as file:
+        prefix = file.read(len(RECORDS_MAGIC) + 8)
+        if prefix[:len(RECORDS_MAGIC)] != RECORDS_MAGIC:
+            raise ValueError(f"{records_file} is not a record file")
+        version, length = (int(value) for value in np.frombuffer(prefix[len(RECORDS_MAGIC):], dtype='<u4'))
+        if version != RECORDS_VERSION:
+            raise ValueError(f"{records_file} has version {version}, expected {RECORDS_VERSION}")
+        header = json.loads(file.read(length))
+
+    dtype = np.dtype([(field, fmt) for field, fmt, _ in header["fields"]])
+    offset = len(prefix) + length
+    if dtype.itemsize != header["record_size"] or \
+            os.path.getsize(records_file) != offset + header["records"] * dtype.itemsize:
+        raise ValueError(f"{records_file} does not match its header")
+
+    names = {field: name for field, _, name in header["fields"]}
+    if header["records"] == 0:
+        return np.zeros(0, dtype=dtype), names
+    return np.memmap(records_file, dtype=dtype, mode='r', offset=offset, shape=(header["records"],)), names
+
+
+
+def records_frame(records: np.ndarray, names: Dict[str, str]) -> pd.DataFrame:
+    """
+    Materializes (selected) records as the DataFrame the merge tasks expect (Extracurricular_Activities as Yes/No).
+    """
+    df = pd.DataFrame({name: records[field] for field, name in names.items()})
+    if 'Extracurricular_Activities' in df:
+        df['Extracurricular_Activities'] = pd.Categorical.from_codes(
+            df['Extracurricular_Activities'].to_numpy().astype(np.int8), categories=['No', 'Yes'])
+    return df
+
+
+
+def records_task(records_file: str, task_number: int) -> pd.DataFrame:
+    """
+    Runs one merge task over a record file: the task's predicate reads the mapped columns in place, and only
+    the rows it keeps are copied out.
+    """
+    records, names = open_records(records_file)
+    task, predicate = MERGED_TASKS[task_number]
+    if predicate is not None:
+        records = records[np.asarray(predicate({name: records[field] for field, name in names.items()}))]
+    return task(records_frame(records, names))
+
+
+
+def run_records(task_numbers: List[int], records_file: str, workers: Optional[int] = None, output_format: str = "csv",
+                output: Optional[str] = None) -> None:
+    """
+    Runs merge tasks over an exported record file instead of parsing and joining the two datasets (--records).
+
+        Parameters
+        -------
+        task_numbers (List[int]): Tasks to run (keys of MERGED_TASKS).
+        records_file (str): File written by "merge --export".
+        workers (int, optional): With more than one, tasks run in that many processes (--workers); each maps
+            the same file, so they share its pages instead of each holding a private copy of the data.
+        output_format (str, optional): --format of the outputs. Defaults to csv.
+        output (str, optional): --output path, see output_path().
+    """
+    if workers is None or workers <= 1 or len(task_numbers) == 1:
+        results = {task_number: records_task(records_file, task_number) for task_number in task_numbers}
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {task_number: pool.submit(records_task, records_file, task_number) for task_number in task_numbers}
+            results = {task_number: future.result() for task_number, future in futures.items()}
+
+    for task_number in task_numbers:
+        write_output(results[task_number], output_path(task_number, task_numbers, output_format, output), output_format)
+
+
+
+def run_export(records_file: str, curricular_file: str = CURRICULAR_FILE,
+               extracurricular_file: str = EXTRACURRICULAR_FILE) -> None:
+    """
+    "merge --export=<file>": joins the two datasets (inner join, as in Assignment 1) and writes the record file.
+    """
+    curricular, extracurricular = load_curricular(curricular_file), load_extracurricular(extracurricular_file)
+    count = write_records(hash_join(curricular, extracurricular, 'Record_ID'), records_file)
+    print(f"{records_file}: {count} records")
+
+
+
+# Registry of every task the analyzer can run, keyed by the --TASK number
+TASKS = {
+    1: task_1,
+    2: task_2,
+    3: task_3,
+    4: task_4,
+    5: task_5,
+}
+
+# Tasks #1-#3 over a list of thresholds in one pass (--thresholds)
+SWEEPS = {
+    1: sweep_task_1,
+    2: sweep_task_2,
+    3: sweep_task_3,
+}
+
+# The same tasks on the lite engine
+LITE_TASKS = {
+    1: lite_task_1,
+    2: lite_task_2,
+    3: lite_task_3,
+    4: lite_task_4,
+    5: lite_task_5,
+}
+
+
+
+# The same tasks as queries against the SQLite store
+SQLITE_TASKS = {
+    1: sqlite_task_1,
+    2: sqlite_task_2,
+    3: sqlite_task_3,
+    4: sqlite_task_4,
+    5: sqlite_task_5,
+}
+
+
+
+# Columns each task reads; only their union is parsed/loaded for a run
+TASK_COLUMNS = {
+    1: ['Record_ID', 'Hours_Studied', 'Exam_Score'],
+    2: ['Record_ID', 'Hours_Studied', 'Exam_Score'],
+    3: ['Record_ID', 'Attendance', 'Extracurricular_Activities', 'Exam_Score'],
+    4: ['Attendance', 'Exam_Score'],
+    5: ['Record_ID', 'Tutoring_Sessions', 'Exam_Score'],
+}
+
+
+
+def required_columns(task_numbers: List[int]) -> List[str]:
+    """
+    Union of the columns needed by a set of tasks (in first-seen order).
+    """
+    columns = []
+    for task_number in task_numbers:
+        for name in TASK_COLUMNS[task_number]:
+            if name not in columns:
+                columns.append(name)
+    return columns
+
+
+
+# Tasks that rank students and accept a --top-k override
+TOP_K_TASKS = (2, 5)
+
+
+
+def task_parameters(task_number: int, top_k_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Keyword arguments to pass to a task function (or its partial) for the command line options given.
+
+        Parameters
+        -------
+        task_number (int): Task being run.
+        top_k_size (int, optional): --top-k value; None keeps each task's default (10 for Task #2, 50 for Task #5).
+
+        Returns
+        -------
+        Dict[str, int]: e.g. {'k': 25} for Task #2 with --top-k=25, otherwise {}.
+    """
+    if top_k_size is not None and task_number in TOP_K_TASKS:
+        return {'k': top_k_size}
+    return {}
+
+
+
+def parse_arguments(registry: Dict = TASKS) -> List[int]:
+    """
+    Error-Handling function that parses command line arguments to extract the task numbers.
+
+        Parameters
+        -------
+        registry (Dict, optional): Tasks that --TASK="all" expands to. Defaults to TASKS.
+
+        Returns
+        -------
+        List[int]: Task numbers from command line, e.g. --TASK="4", --TASK="1,2,3" or --TASK="all"
+
+        - Not entirely necessary, but good for covering all bases in case of errors (for debugging, primarily)
+    """
+    
+    # Check if arguments were provided
+    if len(sys.argv) < 2:
+        print("Usage: python spf_analyzer.py [client] --TASK=\"<task_number>[,<task_number>...]|all\"")
+        print("       python spf_analyzer.py serve [--port=<n>]")
+        print("       python spf_analyzer.py cache [--clear]")
+        print("       python spf_analyzer.py ingest [--append=<csv>[,<csv>...]] [--refresh]")
+        print("       python spf_analyzer.py groupby --by=<column> [--column=<column>]")
+        print("       python spf_analyzer.py merge --TASK=\"3|5|6\" [--join=inner|left] [--records=<file>]")
+        print("       python spf_analyzer.py merge --export=<file>")
+        sys.exit(1)
+        
+    for arg in sys.argv[1:]:
+        if arg.startswith("--TASK="):
+            value = arg.split("=")[1].strip('"').strip()
+
+            if value.lower() == "all":
+                return sorted(registry)
+
+            try:
+                task_numbers = [int(task) for task in value.split(",") if task.strip()]
+            except ValueError:
+                print("Error: Task number must be an integer")
+                sys.exit(1)
+
+            if not task_numbers:
+                print("Error: Task number must be an integer")
+                sys.exit(1)
+
+            # Drop repeated tasks but keep the order they were requested in
+            return list(dict.fromkeys(task_numbers))
+    
+    print("Error: --TASK argument not found")
+    sys.exit(1)
+
+
+
+def get_thresholds() -> Optional[List[float]]:
+    """
+    Parses --thresholds=<t>[,<t>...] (e.g. --thresholds=30,35,40); whole numbers stay integers.
+    """
+    value = get_option("--thresholds")
+    if value is None:
+        return None
+    try:
+        thresholds = [float(threshold) for threshold in value.strip('"').split(",") if threshold.strip()]
+    except ValueError:
+        thresholds = []
+    if not thresholds:
+        print("Error: --thresholds must be a comma-separated list of numbers")
+        sys.exit(1)
+    return [int(threshold) if threshold.is_integer() else threshold for threshold in thresholds]
+
+
+
+def get_output_options(task_numbers: List[int]) -> Tuple[str, Optional[str]]:
+    """
+    Parses --format and --output, checked up front so a missing optional package fails before any work is done.
+
+        Returns
+        -------
+        Tuple[str, Optional[str]]: The output format (csv by default) and the --output path, if any.
+    """
+    output_format = get_option("--format", "csv")
+    output = get_option("--output")
+    if output_format not in OUTPUT_FORMATS:
+        print(f"Error: --format must be one of {', '.join(OUTPUT_FORMATS)}")
+        sys.exit(1)
+    dependency = OUTPUT_DEPENDENCIES.get(output_format)
+    if dependency is not None and importlib.util.find_spec(dependency) is None:
+        print(f"Error: --format={output_format} needs the {dependency} package (pip install {dependency})")
+        sys.exit(1)
+    if output == STDOUT and len(task_numbers) > 1 and output_format != "csv":
+        print("Error: only --format=csv can write several tasks to standard output")
+        sys.exit(1)
+    return output_format, output
+
+
+
+def output_path(task_number: int, task_numbers: List[int], output_format: str = "csv",
+                output: Optional[str] = None) -> str:
+    """
+    Picks the output file for a task.
+
+        Parameters
+        -------
+        task_number (int): Task being written.
+        task_numbers (List[int]): Every task requested in this run.
+        output_format (str, optional): --format of the run; sets the file suffix. Defaults to csv.
+        output (str, optional): --output path ("-" for stdout); with several tasks it gets a _task<n> suffix.
+
+        Returns
+        -------
+        str: output.csv for a single task (as per instructions), otherwise output_task<n>.csv per task.
+    """
+    suffix = OUTPUT_FORMATS[output_format]
+    if output is not None:
+        if len(task_numbers) == 1 or output == STDOUT:
+            return output
+        stem = output[:-len(suffix)] if output.endswith(suffix) else output
+        return f"{stem}_task{task_number}{suffix}"
+
+    if len(task_numbers) == 1:
+        return "output" + suffix
+    return f"output_task{task_number}{suffix}"
+
+
+
+def main():
+    """
+    Main entry point of the program.
+    
+        - Reads the dataset once (from data/a2-data.csv.cache when the CSV is unchanged) and executes every
+          task specified in the command line. --no-cache bypasses the cache, --refresh-cache rebuilds it.
+        - --stream processes the CSV in chunks of --chunk-size rows instead (for datasets larger than RAM).
+        - --shards=<dir|glob> runs over many CSV shards on a pool of --workers processes instead.
+        - --incremental keeps aggregates for Tasks #2, #4 and #5 in data/a2-data.csv.state and only reads new rows.
+        - --top-k=<n> changes how many students Tasks #2 and #5 keep.
+        - --engine=auto|lite|full: inputs under LITE_SIZE_THRESHOLD (or --engine=lite) run on a stdlib-only
+          engine that never imports pandas; --engine=full always uses pandas; --engine=sqlite runs the tasks as
+          indexed queries against data/a2-data.csv.sqlite (see run_sqlite()).
+        - "ingest [--append=<csv>[,<csv>...]] [--refresh]" builds that SQLite store and bulk-appends more rows to it.
+        - "groupby --by=<column> [--column=<column>]" gives the count, mean, min and max of a column (default
+          Exam_Score) per value of a small integer column, streamed in chunks (see run_groupby()).
+        - --format=csv|csv.gz|csv.zst|parquet|arrow picks the output format (csv.zst needs zstandard, parquet and
+          arrow need pyarrow); --output=<file> replaces output.csv ("-" writes to standard output).
+        - Results are memoized in data/a2-data.csv.results (keyed on task, parameters, data hash and code version,
+          capped at --result-cache-size=<MB> with LRU eviction); --no-result-cache skips it, "cache [--clear]"
+          lists or deletes it.
+        - --thresholds=<t>[,<t>...] runs Tasks #1-#3 as one-pass sweeps over those Hours_Studied/Exam_Score/Attendance
+          thresholds instead of their fixed 40/85/100: Task #2 stacks its top-k rows per threshold, Tasks #1 and
+          #3 give one summary row per threshold (student count and mean score; see sweep_task_1() ... sweep_task_3()).
+        - --approx answers Tasks #2, #4 and #5 from sketches of a random sample of blocks of the CSV (about
+          APPROX_SAMPLE_BYTES, or --sample=<fraction>; --seed=<n>), with error bounds in extra columns (see
+          run_approx()). --save-sketch=<file> keeps the sketches, --sketches=<glob> merges saved ones.
+        - "merge --TASK=3|5|6" runs the Assignment 1 tasks over the curricular CSV (--curricular=<file>) hash-joined
+          with the extracurricular YAML (--extracurricular=<file>); --join=left keeps unmatched curricular rows.
+          "merge --export=<file>" saves the joined rows as a fixed-width binary record file, and
+          "merge --TASK=... --records=<file> [--workers=<n>]" runs the tasks over its memory map instead.
+        - --profile[=<file>] writes a per-stage JSON trace (default profile.json) and a summary line to stderr;
+          --cprofile=<file> also dumps cProfile stats of the compute stages.
+        - "serve [--port=<n>]" keeps the dataset in memory and answers tasks over localhost HTTP;
+          "client --TASK=..." asks that server instead of loading the data itself.
+        - Writes results into output.csv (single task) or output_task<n>.csv (several tasks)
+        - Exits with error if an invalid task number is written
+    """
+   
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if command == "serve":
+        run_server(DATA_FILE, get_int_option("--port", DEFAULT_PORT))
+        return
+
+    if command == "cache":
+        run_cache_command(DATA_FILE)
+        return
+
+    if command == "ingest":
+        append = get_option("--append")
+        try:
+            sqlite_ingest(DATA_FILE, append.split(",") if append else [], has_flag("--refresh"))
+        except (OSError, ValueError) as error:
+            print(f"Error: {error}")
+            sys.exit(1)
+        return
+
+    if command == "groupby":
+        by = get_option("--by")
+        if by is None:
+            print("Error: groupby needs --by=<column>")
+            sys.exit(1)
+        try:
+            run_groupby(by, get_option("--column", 'Exam_Score'), DATA_FILE,
+                        get_int_option("--chunk-size", DEFAULT_CHUNK_SIZE), get_option("--output", "output.csv"))
+        except (OSError, ValueError) as error:
+            print(f"Error: {error}")
+            sys.exit(1)
+        return
+
+    if command == "merge":
+        export = get_option("--export")
+        if export is not None:
+            try:
+                run_export(export, get_option("--curricular", CURRICULAR_FILE),
+                           get_option("--extracurricular", EXTRACURRICULAR_FILE))
+            except (OSError, ValueError) as error:
+                print(f"Error: {error}")
+                sys.exit(1)
+            return
+
+        task_numbers = parse_arguments(MERGED_TASKS)
+        if any(task_number not in MERGED_TASKS for task_number in task_numbers):
+            print("Error: merge supports Tasks #3, #5 and #6 only")
+            sys.exit(1)
+        how = get_option("--join", "inner")
+        if how not in ("inner", "left"):
+            print("Error: --join must be inner or left")
+            sys.exit(1)
+        records = get_option("--records")
+        if records is not None:
+            if how != "inner":
+                print("Error: record files hold inner joins only")
+                sys.exit(1)
+            try:
+                run_records(task_numbers, records, get_int_option("--workers", None), *get_output_options(task_numbers))
+            except (OSError, ValueError) as error:
+                print(f"Error: {error}")
+                sys.exit(1)
+            return
+        try:
+            run_merge(task_numbers, get_option("--curricular", CURRICULAR_FILE),
+                      get_option("--extracurricular", EXTRACURRICULAR_FILE), how, *get_output_options(task_numbers))
+        except (OSError, ValueError) as error:
+            print(f"Error: {error}")
+            sys.exit(1)
+        return
+
+    # Parse command line arguments for task numbers
+    task_numbers = parse_arguments()
+
+    # Validate before paying for the CSV parse
+    for task_number in task_numbers:
+        if task_number not in TASKS:
+            print(f"Error: Compilation failed.")
+            sys.exit(1)
+
+    top_k_size = get_int_option("--top-k", None)
+
+    output_format, output = get_output_options(task_numbers)
+
+    if command == "client":
+        if output_format != "csv":
+            print("Error: the client only writes --format=csv")
+            sys.exit(1)
+        run_client(task_numbers, get_int_option("--port", DEFAULT_PORT), top_k_size, output)
+        return
+
+    profile = get_option("--profile") or ("profile.json" if has_flag("--profile") else None)
+    profiler = Profiler(cprofile_file=get_option("--cprofile"))
+
+    # Threshold sweeps always run in memory, on the pandas engine
+    thresholds = get_thresholds()
+    if thresholds is not None:
+        if any(task_number not in SWEEPS for task_number in task_numbers):
+            print("Error: --thresholds supports Tasks #1, #2 and #3 only")
+            sys.exit(1)
+        run_in_memory(task_numbers, DATA_FILE, top_k_size, use_cache=not has_flag("--no-cache"),
+                      refresh_cache=has_flag("--refresh-cache"), profiler=profiler, output_format=output_format,
+                      output=output, thresholds=thresholds)
+        if profile is not None:
+            profiler.write_trace(profile)
+            print(profiler.summary(), file=sys.stderr)
+        return
+
+    # Approximate answers come from sketches of a sample (or of saved sketches) and are never cached
+    if has_flag("--approx"):
+        if any(task_number not in APPROX_TASKS for task_number in task_numbers):
+            print("Error: --approx supports Tasks #2, #4 and #5 only")
+            sys.exit(1)
+        run_approx_command(task_numbers, top_k_size, profiler, output_format, output)
+        if profile is not None:
+            profiler.write_trace(profile)
+            print(profiler.summary(), file=sys.stderr)
+        return
+
+    # Finished results are reused for the plain, --stream and lite runs (--shards/--incremental have their own inputs/state,
+    # and the SQLite store may hold appended rows the CSV does not have)
+    cache = None
+    if not (has_flag("--no-result-cache") or has_flag("--incremental") or get_option("--shards") is not None
+            or get_option("--engine") == "sqlite"):
+        cache = ResultCache(DATA_FILE, get_int_option("--result-cache-size", RESULT_CACHE_LIMIT // (1024 * 1024)) * 1024 * 1024)
+
+    if cache is None:
+        run_command(task_numbers, top_k_size, profiler, output_format, output)
+    else:
+        run_cached(cache, task_numbers, top_k_size, profiler, output_format, output)
+
+    # Trace file plus a one-line summary for the job logs
+    if profile is not None:
+        profiler.write_trace(profile)
+        print(profiler.summary(), file=sys.stderr)
+
+
+
+def run_cached(cache: ResultCache, task_numbers: List[int], top_k_size: Optional[int], profiler: Profiler,
+               output_format: str = "csv", output: Optional[str] = None) -> None:
+    """
+    Serves the run from the result cache when every requested task is in it; otherwise runs the tasks
+    normally and caches their outputs (results written to stdout are not cached).
+    """
+    outputs = {task_number: output_path(task_number, task_numbers, output_format, output) for task_number in task_numbers}
+    keys = {task_number: cache.key(task_number, task_parameters(task_number, top_k_size), output_format)
+            for task_number in task_numbers}
+
+    if all(os.path.exists(cache.entry_path(key)) for key in keys.values()):
+        with profiler.stage("result_cache", "cache"):
+            if all(cache.fetch(keys[task_number], outputs[task_number]) for task_number in task_numbers):
+                return
+
+    # The content hash behind the keys also tells load_data() whether its binary cache is current
+    run_command(task_numbers, top_k_size, profiler, output_format, output, cache.data_digest())
+
+    for task_number in task_numbers:
+        if outputs[task_number] != STDOUT:
+            cache.store(keys[task_number], outputs[task_number], {
+                "task": task_number, "params": task_parameters(task_number, top_k_size), "format": output_format})
+
+
+
+def run_approx_command(task_numbers: List[int], top_k_size: Optional[int], profiler: Profiler,
+                       output_format: str = "csv", output: Optional[str] = None) -> None:
+    """
+    Parses the --approx options (--sample, --seed, --shards, --sketches, --save-sketch) and runs run_approx().
+    """
+    fraction = get_option("--sample")
+    if fraction is not None:
+        try:
+            fraction = float(fraction)
+        except ValueError:
+            fraction = 0.0
+        if not 0 < fraction <= 1:
+            print("Error: --sample must be a fraction in (0, 1]")
+            sys.exit(1)
+
+    # Saved sketches replace the data unless shards are named too
+    sketches = get_option("--sketches")
+    sketch_files = sorted(glob.glob(sketches)) if sketches is not None else []
+    if sketches is not None and not sketch_files:
+        print(f"Error: no sketch files match {sketches}")
+        sys.exit(1)
+    shards = get_option("--shards")
+    if shards is not None:
+        source_files = find_shards(shards)
+        if not source_files:
+            print(f"Error: no CSV shards match {shards}")
+            sys.exit(1)
     else:
-         print(f"Error: Compilation failed.")
-         sys.exit(1)
+        source_files = [] if sketch_files else [DATA_FILE]
+
+    try:
+        with profiler.stage("approx", "run"):
+            run_approx(task_numbers, source_files, fraction, get_int_option("--seed", 0), top_k_size, sketch_files,
+                       get_option("--save-sketch"), get_int_option("--workers", None), output_format, output)
+    except ValueError as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+
+
+
+def run_command(task_numbers: List[int], top_k_size: Optional[int], profiler: Profiler, output_format: str = "csv",
+                output: Optional[str] = None, digest: Optional[str] = None) -> None:
+    """
+    Picks the execution mode from the command line options and runs the tasks with it (digest: content hash of
+    the CSV if already known, passed on to load_data()).
+    """
+    # Sharded inputs are processed on a process pool and their partial results combined
+    shards = get_option("--shards")
+    if shards is not None:
+        shard_files = find_shards(shards)
+        if not shard_files:
+            print(f"Error: no CSV shards match {shards}")
+            sys.exit(1)
+        with profiler.stage("shards", "run"):
+            run_sharded(task_numbers, shard_files, get_int_option("--workers", None), top_k_size, output_format, output)
+        return
+
+    # Incremental mode only parses rows appended since the previous run
+    if has_flag("--incremental"):
+        if any(task_number not in INCREMENTAL_TASKS for task_number in task_numbers):
+            print("Error: --incremental supports Tasks #2, #4 and #5 only")
+            sys.exit(1)
+        with profiler.stage("incremental", "run"):
+            try:
+                run_incremental(task_numbers, DATA_FILE, get_int_option("--chunk-size", DEFAULT_CHUNK_SIZE),
+                                top_k_size, output_format, output)
+            except ValueError as error:
+                print(f"Error: {error}")
+                sys.exit(1)
+        return
+
+    # Streaming mode never holds the whole dataset in memory
+    if has_flag("--stream"):
+        with profiler.stage("stream", "run"):
+            run_streaming(task_numbers, DATA_FILE, get_int_option("--chunk-size", DEFAULT_CHUNK_SIZE), top_k_size,
+                          output_format, output)
+        return
+
+    # Small inputs skip pandas altogether (its import alone dominates a short run)
+    engine = get_option("--engine", "auto")
+    if engine not in ("auto", "lite", "full", "sqlite"):
+        print("Error: --engine must be auto, lite, full or sqlite")
+        sys.exit(1)
+
+    # Indexed queries against the SQLite store (ingested on first use)
+    if engine == "sqlite":
+        try:
+            run_sqlite(task_numbers, DATA_FILE, top_k_size, profiler, output_format, output)
+        except ValueError as error:
+            print(f"Error: {error}")
+            sys.exit(1)
+        return
+
+    if engine == "lite" or (engine == "auto" and os.path.getsize(DATA_FILE) < LITE_SIZE_THRESHOLD):
+        try:
+            run_lite(task_numbers, DATA_FILE, top_k_size, profiler, output_format, output)
+            return
+        except (ValueError, KeyError) as error:
+            if engine == "lite":
+                print(f"Error: the lite engine cannot process {DATA_FILE}: {error!r}")
+                sys.exit(1)
+            profiler.stages.clear()
+
+    run_in_memory(task_numbers, DATA_FILE, top_k_size, use_cache=not has_flag("--no-cache"),
+                  refresh_cache=has_flag("--refresh-cache"), profiler=profiler, output_format=output_format,
+                  output=output, digest=digest)
 
 
 
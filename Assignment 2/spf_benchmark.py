@@ -0,0 +1,355 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark harness for spf_analyzer.py: synthetic data generator, per-stage timings and run comparison.
+Sample input: generate --rows=1000000 --output=bench_data/a2-synth.csv
+              run --sizes=10000,1000000 --engines=full,lite --results=bench.json
+              compare old_bench.json bench.json
+"""
+
+from __future__ import annotations
+
+import sys
+import os
+import json
+import time
+import platform
+import resource
+import subprocess
+from typing import List, Dict
+
+import spf_analyzer
+from spf_analyzer import np, pd, get_option, get_int_option, has_flag
+
+
+# Generated datasets are written in blocks of this many rows, so 50M-row files never sit in memory at once
+GENERATE_BLOCK_ROWS = 1_000_000
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_DATA_DIR = "bench_data"
+DEFAULT_RESULTS = "bench.json"
+
+# The lite engine is only benchmarked up to this size by default (it is meant for small inputs)
+LITE_MAX_ROWS = 1_000_000
+
+# Category frequencies of the Kaggle student-performance-factors dataset (None marks a missing value)
+LOW_MEDIUM_HIGH = ['Low', 'Medium', 'High']
+CATEGORIES = {
+    'Parental_Involvement': (LOW_MEDIUM_HIGH, [0.20, 0.51, 0.29]),
+    'Access_to_Resources': (LOW_MEDIUM_HIGH, [0.20, 0.50, 0.30]),
+    'Extracurricular_Activities': (['Yes', 'No'], [0.60, 0.40]),
+    'Motivation_Level': (LOW_MEDIUM_HIGH, [0.29, 0.51, 0.20]),
+    'Internet_Access': (['Yes', 'No'], [0.92, 0.08]),
+    'Family_Income': (LOW_MEDIUM_HIGH, [0.40, 0.40, 0.20]),
+    'Teacher_Quality': (LOW_MEDIUM_HIGH + [None], [0.10, 0.59, 0.30, 0.01]),
+    'School_Type': (['Public', 'Private'], [0.70, 0.30]),
+    'Peer_Influence': (['Positive', 'Neutral', 'Negative'], [0.40, 0.39, 0.21]),
+    'Learning_Disabilities': (['Yes', 'No'], [0.11, 0.89]),
+    'Parental_Education_Level': (['High School', 'College', 'Postgraduate', None], [0.49, 0.30, 0.20, 0.01]),
+    'Distance_from_Home': (['Near', 'Moderate', 'Far', None], [0.59, 0.30, 0.10, 0.01]),
+    'Gender': (['Male', 'Female'], [0.58, 0.42]),
+}
+
+
+
+def generate_block(rng, start: int, rows: int) -> pd.DataFrame:
+    """
+    Generates one block of synthetic rows with the a2-data.csv columns.
+
+        Parameters
+        -------
+        rng (np.random.Generator): Random generator (seeded by the caller).
+        start (int): Record_ID of the first row.
+        rows (int): Number of rows.
+
+        Returns
+        -------
+        pd.DataFrame: Rows with the column order of a2-data.csv.
+
+        - Numeric columns follow the shape of the Kaggle data: Hours_Studied ~ N(20, 6) clipped to 1-44,
+          Attendance uniform 60-100, Tutoring_Sessions ~ Poisson(1.5), and Exam_Score mostly 55-75 driven by
+          hours, attendance, previous scores and tutoring, with a thin tail of high scores up to 101.
+    """
+    hours = np.clip(np.rint(rng.normal(20, 6, rows)), 1, 44).astype(np.int64)
+    attendance = rng.integers(60, 101, rows)
+    previous = rng.integers(50, 101, rows)
+    tutoring = np.minimum(rng.poisson(1.5, rows), 8)
+
+    score = 40.5 + 0.29 * hours + 0.2 * attendance + 0.05 * previous + 0.5 * tutoring + rng.normal(0, 2, rows)
+    outliers = rng.random(rows) < 0.005
+    score[outliers] = rng.integers(70, 102, int(outliers.sum()))
+    score = np.clip(np.rint(score), 55, 101).astype(np.int64)
+
+    data = {'Record_ID': np.arange(start, start + rows), 'Hours_Studied': hours, 'Attendance': attendance}
+    for name in ['Parental_Involvement', 'Access_to_Resources', 'Extracurricular_Activities']:
+        data[name] = random_category(rng, name, rows)
+    data['Sleep_Hours'] = rng.integers(4, 11, rows)
+    data['Previous_Scores'] = previous
+    for name in ['Motivation_Level', 'Internet_Access']:
+        data[name] = random_category(rng, name, rows)
+    data['Tutoring_Sessions'] = tutoring
+    for name in ['Family_Income', 'Teacher_Quality', 'School_Type', 'Peer_Influence']:
+        data[name] = random_category(rng, name, rows)
+    data['Physical_Activity'] = rng.binomial(6, 0.5, rows)
+    for name in ['Learning_Disabilities', 'Parental_Education_Level', 'Distance_from_Home', 'Gender']:
+        data[name] = random_category(rng, name, rows)
+    data['Exam_Score'] = score
+
+    return pd.DataFrame(data)
+
+
+
+def random_category(rng, name: str, rows: int):
+    """
+    Draws a categorical column with the frequencies listed in CATEGORIES.
+    """
+    values, weights = CATEGORIES[name]
+    codes = rng.choice(len(values), size=rows, p=weights)
+
+    # None is always listed last, so its code simply becomes -1 (a missing value)
+    if None in values:
+        codes[codes == values.index(None)] = -1
+    return pd.Categorical.from_codes(codes, categories=[value for value in values if value is not None])
+
+
+
+def generate_dataset(rows: int, output_file: str, seed: int = 265) -> None:
+    """
+    Writes a synthetic dataset with the a2-data.csv schema, block by block.
+
+        Parameters
+        -------
+        rows (int): Number of rows (10k to 50M+).
+        output_file (str): CSV file to write.
+        seed (int, optional): Random seed; the same seed and size always give the same file.
+    """
+    rng = np.random.default_rng(seed)
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # At least one (possibly empty) block, so even 0 rows gives a file with the header
+    for start in range(0, max(rows, 1), GENERATE_BLOCK_ROWS):
+        block = generate_block(rng, start, min(GENERATE_BLOCK_ROWS, rows - start))
+        block.to_csv(output_file, index=False, mode='w' if start == 0 else 'a', header=start == 0)
+
+
+
+def dataset_for(rows: int, data_dir: str, seed: int) -> str:
+    """
+    Path of the synthetic dataset for a size, generating it on first use.
+    """
+    path = os.path.join(data_dir, f"a2-synth-{rows}-{seed}.csv")
+    if not os.path.exists(path):
+        generate_dataset(rows, path, seed)
+    return path
+
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process so far, in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+
+def measure(source_file: str, task_number: int, engine: str, use_cache: bool = False) -> Dict:
+    """
+    Times the load, compute and write stages of one task on one engine (run in a fresh process per measurement).
+
+        Parameters
+        -------
+        source_file (str): Dataset to analyze.
+        task_number (int): Task to run.
+        engine (str): 'full' (pandas) or 'lite'.
+        use_cache (bool, optional): Load the full engine's data through the binary cache (warmed up first).
+
+        Returns
+        -------
+        Dict: Stage timings in seconds (import of pandas, load, compute, write), rows in/out and peak RSS in MB.
+    """
+    # pandas is imported lazily by the analyzer; time it on its own so it doesn't hide in the load stage
+    t_import0 = time.perf_counter()
+    if engine == "full":
+        pd.DataFrame
+    imported = time.perf_counter()
+
+    columns = spf_analyzer.required_columns([task_number])
+    output_file = os.path.join(os.path.dirname(source_file) or ".", f"bench_output_task{task_number}.csv")
+
+    if engine == "lite":
+        t_load0 = time.perf_counter()
+        data = spf_analyzer.lite_load(source_file, columns)
+        loaded = time.perf_counter()
+        header, rows = spf_analyzer.LITE_TASKS[task_number](data)
+        computed = time.perf_counter()
+        spf_analyzer.lite_write(header, rows, output_file)
+        written = time.perf_counter()
+        rows_in, rows_out = len(data[columns[0]]), len(rows)
+    else:
+        if use_cache:
+            spf_analyzer.load_data(source_file, columns)
+        t_load0 = time.perf_counter()
+        df = spf_analyzer.load_data(source_file, columns, use_cache=use_cache)
+        loaded = time.perf_counter()
+        result_df = spf_analyzer.TASKS[task_number](spf_analyzer.Analysis(df))
+        computed = time.perf_counter()
+        spf_analyzer.write_output(result_df, output_file)
+        written = time.perf_counter()
+        rows_in, rows_out = len(df), len(result_df)
+
+    os.remove(output_file)
+    # Everything from the first timestamp on, except the cache warm-up load (which is not part of the run)
+    total = written - t_import0
+    if engine == "full" and use_cache:
+        total -= t_load0 - imported
+    return {
+        "import_s": imported - t_import0 if engine == "full" else 0.0,
+        "load_s": loaded - t_load0,
+        "compute_s": computed - loaded,
+        "write_s": written - computed,
+        "total_s": total,
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+
+def run_benchmarks(sizes: List[int], task_numbers: List[int], engines: List[str], data_dir: str, seed: int,
+                   repeat: int = 1, use_cache: bool = False) -> Dict:
+    """
+    Runs every (size, engine, task) combination in its own subprocess and collects the measurements.
+
+        Returns
+        -------
+        Dict: {"meta": {...}, "results": [one record per measurement]}.
+
+        - A subprocess per measurement keeps peak RSS and import costs from leaking between measurements.
+        - With repeat > 1 the fastest run is kept (the usual way to filter out noise from other processes).
+    """
+    results = []
+    for rows in sizes:
+        source_file = dataset_for(rows, data_dir, seed)
+        for engine in engines:
+            if engine == "lite" and rows > LITE_MAX_ROWS:
+                continue
+            for task_number in task_numbers:
+                command = [sys.executable, os.path.abspath(__file__), "measure", f"--data={source_file}",
+                           f"--task={task_number}", f"--engine={engine}"] + (["--cache"] if use_cache else [])
+                runs = []
+                for _ in range(repeat):
+                    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+                    runs.append(json.loads(output.strip().splitlines()[-1]))
+                best = min(runs, key=lambda run: run["total_s"])
+                record = {"rows": rows, "engine": engine, "task": task_number}
+                record.update(best)
+                results.append(record)
+                print(f"{rows:>10} {engine:>5} task {task_number}: load {best['load_s']:.3f}s "
+                      f"compute {best['compute_s']:.3f}s write {best['write_s']:.3f}s "
+                      f"rss {best['peak_rss_mb']:.0f}MB", file=sys.stderr)
+
+    meta = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "cache": use_cache,
+    }
+    return {"meta": meta, "results": results}
+
+
+
+def compare_results(base_file: str, new_file: str) -> List[str]:
+    """
+    Compares two result files measurement by measurement.
+
+        Returns
+        -------
+        List[str]: One line per (rows, engine, task) present in both, with the new/base ratio of each stage
+        (below 1.0 means faster) and of peak RSS.
+    """
+    with open(base_file) as file:
+        base = {(r["rows"], r["engine"], r["task"]): r for r in json.load(file)["results"]}
+    with open(new_file) as file:
+        new = {(r["rows"], r["engine"], r["task"]): r for r in json.load(file)["results"]}
+
+    lines = []
+    for key in sorted(base.keys() & new.keys()):
+        ratios = []
+        for stage in ("import_s", "load_s", "compute_s", "write_s", "total_s", "peak_rss_mb"):
+            ratio = new[key].get(stage, 0.0) / base[key][stage] if base[key].get(stage) else float("nan")
+            ratios.append(f"{stage[:-2] if stage.endswith('_s') else 'rss'} x{ratio:.2f}")
+        lines.append(f"{key[0]:>10} {key[1]:>5} task {key[2]}: " + "  ".join(ratios))
+    return lines
+
+
+
+def int_list(value: str) -> List[int]:
+    """
+    Parses a comma-separated list of integers (e.g. --sizes=10000,1000000).
+    """
+    try:
+        return [int(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        print(f"Error: {value} is not a comma-separated list of integers")
+        sys.exit(1)
+
+
+
+def main():
+    """
+    Main entry point of the benchmark harness.
+
+        - generate --rows=<n> --output=<file> [--seed=<s>]: writes one synthetic dataset.
+        - run [--sizes=...] [--tasks=1,2,...|all] [--engines=full,lite] [--data-dir=...] [--results=...]
+              [--repeat=<n>] [--seed=<s>] [--cache]: benchmarks every combination and writes JSON results.
+        - compare <base.json> <new.json>: prints new/base ratios per measurement.
+    """
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    seed = get_int_option("--seed", 265)
+
+    if command == "generate":
+        output_file = get_option("--output")
+        if output_file is None:
+            print("Error: --output is required")
+            sys.exit(1)
+        generate_dataset(get_int_option("--rows", 10_000), output_file, seed)
+
+    elif command == "measure":
+        record = measure(get_option("--data"), get_int_option("--task", 1), get_option("--engine", "full"),
+                         has_flag("--cache"))
+        print(json.dumps(record))
+
+    elif command == "run":
+        sizes = int_list(get_option("--sizes")) if get_option("--sizes") else DEFAULT_SIZES
+        tasks = get_option("--tasks", "all")
+        task_numbers = sorted(spf_analyzer.TASKS) if tasks == "all" else int_list(tasks)
+        engines = get_option("--engines", "full,lite").split(",")
+        if any(task_number not in spf_analyzer.TASKS for task_number in task_numbers) or \
+                any(engine not in ("full", "lite") for engine in engines):
+            print("Error: unknown task or engine")
+            sys.exit(1)
+
+        report = run_benchmarks(sizes, task_numbers, engines, get_option("--data-dir", DEFAULT_DATA_DIR), seed,
+                                get_int_option("--repeat", 1), has_flag("--cache"))
+        with open(get_option("--results", DEFAULT_RESULTS), "w") as file:
+            json.dump(report, file, indent=1)
+
+    elif command == "compare" and len(sys.argv) >= 4:
+        for line in compare_results(sys.argv[2], sys.argv[3]):
+            print(line)
+
+    else:
+        print("Usage: python spf_benchmark.py generate|run|compare ... (see main() for the options)")
+        sys.exit(1)
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+"""
+Shared fixtures of the spf_analyzer.py tests.
+
+    - Run with: python -m pytest "Assignment 2/tests"
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+ANALYZER = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "spf_analyzer.py"))
+
+# spf_analyzer.py is a script, not a package: the in-process tests import it from its own directory
+sys.path.insert(0, os.path.dirname(ANALYZER))
+
+
+
+@pytest.fixture
+def run_analyzer():
+    """Runs spf_analyzer.py from a working directory (so its data/ paths resolve there); returns the process."""
+    def run(cwd, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run([sys.executable, ANALYZER, *args], cwd=cwd, capture_output=True, text=True)
+    return run
@@ -0,0 +1,71 @@
+"""
+Tests of the merge command (Assignment 1 Tasks #3, #5 and #6) against the C implementation of Assignment 1.
+
+    - The committed data/a1-data-curricular.csv is empty, so the curricular side is generated from a fixed seed.
+"""
+import os
+import random
+import shutil
+import subprocess
+
+import pytest
+
+ASSIGNMENT_1 = os.path.join(os.path.dirname(__file__), "..", "..", "Assignment 1")
+
+
+
+def write_curricular(path: str, rows: int = 6000, seed: int = 265) -> None:
+    """
+    Writes a curricular CSV in the Assignment 1 layout, with Record_IDs drawn from those of the YAML dataset.
+    """
+    rng = random.Random(seed)
+    with open(path, "w") as file:
+        file.write("Record_ID,Hours_Studied,Attendance,Tutoring_Sessions,Exam_Score\n")
+        for record_id in rng.sample(range(6607), rows):
+            file.write(f"{record_id},{rng.randint(1, 44)},{rng.randint(60, 100)},{rng.randint(0, 8)},"
+                       f"{rng.randint(55, 100)}\n")
+
+
+
+@pytest.fixture
+def merge_dir(tmp_path):
+    """Working directory with a generated curricular CSV and the committed extracurricular YAML."""
+    os.makedirs(tmp_path / "data")
+    write_curricular(str(tmp_path / "data" / "a1-data-curricular.csv"))
+    shutil.copy(os.path.join(ASSIGNMENT_1, "data", "a1-data-extracurricular.yaml"), tmp_path / "data")
+    return tmp_path
+
+
+
+@pytest.fixture
+def c_analyzer(tmp_path_factory):
+    """The Assignment 1 C program, compiled into a temporary directory (skips when no C compiler is installed)."""
+    compiler = shutil.which("gcc") or shutil.which("cc")
+    if compiler is None:
+        pytest.skip("no C compiler to build the Assignment 1 reference")
+    binary = str(tmp_path_factory.mktemp("c") / "spf_analyzer")
+    subprocess.run([compiler, "-O2", "-o", binary, os.path.join(ASSIGNMENT_1, "spf_analyzer.c")], check=True)
+    return binary
+
+
+
+@pytest.mark.parametrize("task_number", [3, 5, 6])
+def test_merge_matches_c(merge_dir, c_analyzer, run_analyzer, task_number):
+    """merge --TASK=n writes the same bytes as the C version on the same datasets."""
+    subprocess.run([c_analyzer, f"--TASK={task_number}"], cwd=merge_dir, check=True)
+    expected = (merge_dir / "output.csv").read_bytes()
+    os.remove(merge_dir / "output.csv")
+
+    process = run_analyzer(merge_dir, "merge", f"--TASK={task_number}")
+    assert process.returncode == 0, process.stdout + process.stderr
+    assert (merge_dir / "output.csv").read_bytes() == expected
+
+
+
+def test_merge_empty_curricular(merge_dir, run_analyzer):
+    """An empty curricular file (as committed) is reported as an error instead of a traceback."""
+    (merge_dir / "data" / "a1-data-curricular.csv").write_text("")
+    process = run_analyzer(merge_dir, "merge", "--TASK=3")
+    assert process.returncode == 1
+    assert process.stdout.startswith("Error: ")
+    assert "Traceback" not in process.stderr
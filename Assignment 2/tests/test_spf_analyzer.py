@@ -0,0 +1,210 @@
+"""
+Tests of spf_analyzer.py's execution modes on a small generated dataset: every mode must write the same bytes
+as the plain in-memory (pandas) run.
+
+    - Scores are drawn from a narrow range so that the top-k cut-offs fall inside runs of tied scores.
+"""
+import os
+import random
+
+import pandas as pd
+import pytest
+import yaml
+
+import spf_analyzer
+
+LEVELS = ['Low', 'Medium', 'High']
+COLUMNS = {
+    'Record_ID': None,
+    'Hours_Studied': (1, 44),
+    'Attendance': (60, 100),
+    'Parental_Involvement': LEVELS,
+    'Access_to_Resources': LEVELS,
+    'Extracurricular_Activities': ['No', 'Yes'],
+    'Sleep_Hours': (4, 10),
+    'Previous_Scores': (50, 100),
+    'Motivation_Level': LEVELS,
+    'Internet_Access': ['No', 'Yes'],
+    'Tutoring_Sessions': (0, 8),
+    'Family_Income': LEVELS,
+    'Teacher_Quality': LEVELS + [''],
+    'School_Type': ['Private', 'Public'],
+    'Peer_Influence': ['Negative', 'Neutral', 'Positive'],
+    'Physical_Activity': (0, 6),
+    'Learning_Disabilities': ['No', 'Yes'],
+    'Parental_Education_Level': ['High School', 'College', 'Postgraduate', ''],
+    'Distance_from_Home': ['Near', 'Moderate', 'Far'],
+    'Gender': ['Female', 'Male'],
+    'Exam_Score': (80, 101),
+}
+ROWS = 1500
+ALL_TASKS = [1, 2, 3, 4, 5]
+
+
+
+def write_dataset(path: str, rows: int = ROWS, seed: int = 265) -> None:
+    """
+    Writes a CSV in the layout of data/a2-data.csv, in shuffled Record_ID order and with some missing categories.
+    """
+    rng = random.Random(seed)
+    record_ids = list(range(rows))
+    rng.shuffle(record_ids)
+    with open(path, "w") as file:
+        file.write(",".join(COLUMNS) + "\n")
+        for record_id in record_ids:
+            values = [str(record_id)]
+            for values_range in list(COLUMNS.values())[1:]:
+                if isinstance(values_range, list):
+                    values.append(rng.choice(values_range))
+                else:
+                    values.append(str(rng.randint(*values_range)))
+            file.write(",".join(values) + "\n")
+
+
+
+def read_outputs(directory, prefix: str, task_numbers=ALL_TASKS):
+    """The bytes of <prefix>_task<n>.csv of every task, as written by a run with --output=<prefix>.csv."""
+    return {task_number: (directory / f"{prefix}_task{task_number}.csv").read_bytes() for task_number in task_numbers}
+
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Working directory holding data/a2-data.csv."""
+    os.makedirs(tmp_path / "data")
+    write_dataset(str(tmp_path / "data" / "a2-data.csv"))
+    return tmp_path
+
+
+
+@pytest.fixture
+def baseline(data_dir, run_analyzer):
+    """The outputs of the plain in-memory run (the pandas engine, no caches) of every task."""
+    process = run_analyzer(data_dir, "--TASK=all", "--engine=full", "--no-cache", "--no-result-cache",
+                           "--output=full.csv")
+    assert process.returncode == 0, process.stdout + process.stderr
+    return read_outputs(data_dir, "full")
+
+
+
+@pytest.mark.parametrize("mode", [
+    ["--engine=lite"],
+    ["--stream", "--chunk-size=97"],
+    ["--engine=sqlite"],
+])
+def test_mode_matches_in_memory(data_dir, baseline, run_analyzer, mode):
+    """The lite engine, --stream (with chunks cutting through ties) and the SQLite engine match the in-memory run."""
+    process = run_analyzer(data_dir, "--TASK=all", "--no-result-cache", "--output=mode.csv", *mode)
+    assert process.returncode == 0, process.stdout + process.stderr
+    assert read_outputs(data_dir, "mode") == baseline
+
+
+
+def test_sharded_matches_in_memory(data_dir, baseline, run_analyzer):
+    """--shards over the dataset split in three files matches the in-memory run over the whole file."""
+    with open(data_dir / "data" / "a2-data.csv") as file:
+        header, *lines = file.readlines()
+    os.makedirs(data_dir / "shards")
+    for shard, start in enumerate(range(0, len(lines), 600)):
+        with open(data_dir / "shards" / f"a2-data-{shard}.csv", "w") as file:
+            file.writelines([header] + lines[start:start + 600])
+
+    process = run_analyzer(data_dir, "--TASK=all", "--shards=shards/*.csv", "--workers=2", "--output=shards.csv")
+    assert process.returncode == 0, process.stdout + process.stderr
+    assert read_outputs(data_dir, "shards") == baseline
+
+
+
+def test_incremental_matches_in_memory(data_dir, baseline, run_analyzer):
+    """--incremental gives the in-memory answer after rows were appended to its saved state, and again unchanged."""
+    data_file = data_dir / "data" / "a2-data.csv"
+    content = data_file.read_bytes()
+    lines = content.splitlines(keepends=True)
+    data_file.write_bytes(b"".join(lines[:700]))
+
+    args = ["--TASK=2,4,5", "--incremental", "--chunk-size=128", "--output=incremental.csv"]
+    assert run_analyzer(data_dir, *args).returncode == 0
+    assert os.path.exists(str(data_file) + ".state")
+
+    data_file.write_bytes(content)
+    for _ in range(2):
+        process = run_analyzer(data_dir, *args)
+        assert process.returncode == 0, process.stdout + process.stderr
+        assert read_outputs(data_dir, "incremental", [2, 4, 5]) == {task_number: baseline[task_number]
+                                                                    for task_number in (2, 4, 5)}
+
+
+
+@pytest.mark.parametrize("k", [1, 7, 10, 50, 400])
+def test_top_k_matches_sort_on_ties(k):
+    """top_k() keeps the order of the original sort (then head(k)) when scores, and even Record_IDs, tie."""
+    rng = random.Random(k)
+    df = pd.DataFrame({
+        'Record_ID': [rng.randint(0, 150) for _ in range(300)],
+        'Exam_Score': [rng.randint(95, 101) for _ in range(300)],
+        'Row': range(300),
+    })
+
+    expected = df.sort_values(by=['Exam_Score', 'Record_ID'], ascending=[False, True]).head(k)
+    result = spf_analyzer.top_k(df, k)
+    pd.testing.assert_frame_equal(result, expected)
+    # Same scores as nlargest, whichever of the tied rows it happens to pick
+    assert result['Exam_Score'].tolist() == df['Exam_Score'].nlargest(k).tolist()
+
+
+
+def pyyaml_records(path: str) -> pd.DataFrame:
+    """The extracurricular records as read by PyYAML, with the columns and dtypes of load_extracurricular()."""
+    with open(path) as file:
+        df = pd.DataFrame(yaml.safe_load(file)['records'])[spf_analyzer.EXTRACURRICULAR_COLUMNS]
+    df['Extracurricular_Activities'] = pd.Categorical(df['Extracurricular_Activities'], categories=['No', 'Yes'])
+    return df.astype({name: 'int64' for name in ['Physical_Activity', 'Record_ID', 'Sleep_Hours']})
+
+
+
+def write_records(path: str, records: int = 1000, seed: int = 265) -> None:
+    """Writes an extracurricular YAML in the layout of Assignment 1's data/a1-data-extracurricular.yaml."""
+    rng = random.Random(seed)
+    with open(path, "w") as file:
+        file.write("records:\n")
+        for record_id in range(records):
+            file.write(f"- Extracurricular_Activities: '{rng.choice(['No', 'Yes'])}'\n"
+                       f"  Physical_Activity: {rng.randint(0, 6)}\n"
+                       f"  Record_ID: {record_id}\n"
+                       f"  Sleep_Hours: {rng.randint(4, 10)}\n")
+
+
+
+@pytest.mark.parametrize("chunk_records", [1, 7, 1000])
+def test_streaming_yaml_matches_pyyaml(tmp_path, chunk_records):
+    """iter_extracurricular() reads the dataset's layout like PyYAML, whatever the chunk boundaries."""
+    path = str(tmp_path / "records.yaml")
+    write_records(path)
+
+    chunks = list(spf_analyzer.iter_extracurricular(path, chunk_records))
+    assert all(len(chunk) <= chunk_records for chunk in chunks)
+    streamed = pd.concat(chunks, ignore_index=True)
+    expected = pyyaml_records(path)
+    assert streamed['Extracurricular_Activities'].tolist() == (expected['Extracurricular_Activities'] == 'Yes').tolist()
+    for name in ['Physical_Activity', 'Record_ID', 'Sleep_Hours']:
+        assert streamed[name].tolist() == expected[name].tolist()
+
+    pd.testing.assert_frame_equal(spf_analyzer.load_extracurricular(path), expected)
+
+
+
+def test_other_yaml_falls_back_to_pyyaml(tmp_path):
+    """Valid YAML in another layout (comments, flow style, other key order) is still read like PyYAML does."""
+    path = str(tmp_path / "records.yaml")
+    with open(path, "w") as file:
+        file.write("# exported by hand\n"
+                   "records:\n"
+                   "- {Record_ID: 3, Sleep_Hours: 7, Physical_Activity: 2, Extracurricular_Activities: 'Yes'}\n"
+                   "- Record_ID: 1\n"
+                   "  Extracurricular_Activities: 'No'\n"
+                   "  Physical_Activity: 5\n"
+                   "  Sleep_Hours: 9\n")
+
+    with pytest.raises(ValueError):
+        list(spf_analyzer.iter_extracurricular(path))
+    pd.testing.assert_frame_equal(spf_analyzer.load_extracurricular(path), pyyaml_records(path))
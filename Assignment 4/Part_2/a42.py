@@ -3,7 +3,10 @@
 print(__doc__)
 
 import random
-from typing import IO, List, Tuple
+from functools import reduce
+from typing import IO, List, Tuple, Optional
+
+import numpy as np
 
 class PyArtConfig:
     """PyArtConfig class"""
@@ -123,6 +126,83 @@ def generate_shapes(config: PyArtConfig, count: int) -> List[RandomShape]:
         shapes.append(shape)
     return shapes
 
+def int_dtype(bounds: Tuple[int, int]) -> np.dtype:
+    """int_dtype method - smallest integer dtype that holds every value of an inclusive range"""
+    return np.result_type(np.min_scalar_type(bounds[0]), np.min_scalar_type(bounds[1]))
+
+def as_text(values: np.ndarray, width: int = 0) -> np.ndarray:
+    """as_text method - str() of every integer of an array, right-aligned to width"""
+    text = values.astype(np.dtypes.StringDType())
+    return np.strings.rjust(text, width) if width else text
+
+def format_distinct(values: np.ndarray, spec: str = "") -> np.ndarray:
+    """format_distinct method - format(value, spec) of every value, formatting each distinct value only once"""
+    distinct, positions = np.unique(values, return_inverse=True)
+    return np.array([format(value.item(), spec) for value in distinct], dtype=np.dtypes.StringDType())[positions]
+
+def join_text(*parts) -> np.ndarray:
+    """join_text method - element-wise concatenation of string arrays (and plain strings)"""
+    return reduce(np.strings.add, parts)
+
+class ShapeBatch:
+    """ShapeBatch class - N random shapes stored column by column (one NumPy array per attribute) instead of
+    one RandomShape object each; shape i has count_id start_id + i"""
+
+    def __init__(self, shape_type: np.ndarray, x: np.ndarray, y: np.ndarray, radius: np.ndarray, rx: np.ndarray,
+                 ry: np.ndarray, width: np.ndarray, height: np.ndarray, r: np.ndarray, g: np.ndarray, b: np.ndarray,
+                 opacity: np.ndarray, start_id: int = 0) -> None:
+        """__init__ method"""
+        self.shape_type = shape_type
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.rx = rx
+        self.ry = ry
+        self.width = width
+        self.height = height
+        self.r = r
+        self.g = g
+        self.b = b
+        self.opacity = opacity
+        self.start_id = start_id
+
+    def __len__(self) -> int:
+        """__len__ method"""
+        return len(self.shape_type)
+
+    def as_Part2_lines(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """as_Part2_lines method - RandomShape.as_Part2_line() of shapes start to stop, as an array of strings"""
+        part = slice(start, stop)
+        count_id = np.arange(len(self))[part] + self.start_id
+        columns = [as_text(count_id, 3)] + [as_text(column[part], 3) for column in (
+            self.shape_type, self.x, self.y, self.radius, self.rx, self.ry, self.width, self.height,
+            self.r, self.g, self.b)] + [format_distinct(self.opacity[part], ">3.1f")]
+        return join_text(*[piece for column in columns for piece in (" ", column)][1:])
+
+def generate_shape_batch(config: PyArtConfig, count: int, seed: Optional[int] = None,
+                         start_id: int = 0) -> ShapeBatch:
+    """generate_shape_batch method - draws every attribute of count shapes at once from config with NumPy's
+    vectorized RNG (same ranges as RandomShape, each column in the smallest integer dtype that fits)"""
+    rng = np.random.default_rng(seed)
+
+    def integers(bounds: Tuple[int, int]) -> np.ndarray:
+        return rng.integers(bounds[0], bounds[1], size=count, endpoint=True, dtype=int_dtype(bounds))
+
+    return ShapeBatch(
+        shape_type=integers((RandomShape.CIRCLE, RandomShape.ELLIPSE)),
+        x=integers(config.x_range),
+        y=integers(config.y_range),
+        radius=integers(config.radius_range),
+        rx=integers(config.rx_range),
+        ry=integers(config.ry_range),
+        width=integers(config.width_range),
+        height=integers(config.height_range),
+        r=integers(config.red_range),
+        g=integers(config.green_range),
+        b=integers(config.blue_range),
+        opacity=np.round(rng.uniform(config.opacity_range[0], config.opacity_range[1], size=count), 1),
+        start_id=start_id)
+
 def print_table_header() -> None:
     """print_table_header method"""
     print(f"{'CNT':>3} {'SHA':>3} {'X':>3} {'Y':>3} {'RAD':>3} {'RX':>3} {'RY':>3} {'W':>3} {'H':>3} {'R':>3} {'G':>3} {'B':>3} {'OP':>3}")
@@ -131,12 +211,12 @@ def main() -> None:
     """main method"""
     config = PyArtConfig()
     
-    shapes = generate_shapes(config, 10)
+    batch = generate_shape_batch(config, 10)
 
     print_table_header()
     
-    for shape in shapes:
-        print(shape.as_Part2_line())
+    for line in batch.as_Part2_lines().tolist():
+        print(line)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
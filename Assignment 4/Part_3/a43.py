@@ -7,9 +7,13 @@
 print(__doc__)
 
 import random
+from array import array
+from functools import reduce
 from typing import IO, List, Tuple, Optional
 from collections import namedtuple
 
+import numpy as np
+
 # Define named tuples for coordinates, dimensions, and colors
 CircleData = namedtuple('CircleData', ['cx', 'cy', 'rad'])
 ColorData = namedtuple('ColorData', ['red', 'green', 'blue', 'opacity'])
@@ -210,6 +214,166 @@ class RandomShape(HtmlComponent):
                    f'fill="rgb({self.red}, {self.green}, {self.blue})" fill-opacity="{self.opacity}"></ellipse>'
         return ""  
 
+def int_dtype(bounds: Tuple[int, int]) -> np.dtype:
+    """int_dtype method - smallest integer dtype that holds every value of an inclusive range"""
+    return np.result_type(np.min_scalar_type(bounds[0]), np.min_scalar_type(bounds[1]))
+
+def as_text(values: np.ndarray, width: int = 0) -> np.ndarray:
+    """as_text method - str() of every integer of an array, right-aligned to width"""
+    text = values.astype(np.dtypes.StringDType())
+    return np.strings.rjust(text, width) if width else text
+
+def format_distinct(values: np.ndarray, spec: str = "") -> np.ndarray:
+    """format_distinct method - format(value, spec) of every value, formatting each distinct value only once"""
+    distinct, positions = np.unique(values, return_inverse=True)
+    return np.array([format(value.item(), spec) for value in distinct], dtype=np.dtypes.StringDType())[positions]
+
+def join_text(*parts) -> np.ndarray:
+    """join_text method - element-wise concatenation of string arrays (and plain strings)"""
+    return reduce(np.strings.add, parts)
+
+class ShapeBatch(HtmlComponent):
+    """ShapeBatch class - N random shapes stored column by column (one NumPy array per attribute) instead of
+    one RandomShape object each; shape i has count_id start_id + i"""
+
+    # Shapes turned into text at a time while rendering, so the text of a huge batch never exists all at once
+    CHUNK = 65536
+
+    def __init__(self, shape_type: np.ndarray, x: np.ndarray, y: np.ndarray, radius: np.ndarray, rx: np.ndarray,
+                 ry: np.ndarray, width: np.ndarray, height: np.ndarray, r: np.ndarray, g: np.ndarray, b: np.ndarray,
+                 opacity: np.ndarray, indent_level: int = 0, start_id: int = 0) -> None:
+        """__init__ method"""
+        super().__init__(indent_level)
+        self.shape_type = shape_type
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.rx = rx
+        self.ry = ry
+        self.width = width
+        self.height = height
+        self.r = r
+        self.g = g
+        self.b = b
+        self.opacity = opacity
+        self.start_id = start_id
+
+    def __len__(self) -> int:
+        """__len__ method"""
+        return len(self.shape_type)
+
+    def as_Part2_lines(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """as_Part2_lines method - RandomShape.as_Part2_line() of shapes start to stop, as an array of strings"""
+        part = slice(start, stop)
+        count_id = np.arange(len(self))[part] + self.start_id
+        columns = [as_text(count_id, 3)] + [as_text(column[part], 3) for column in (
+            self.shape_type, self.x, self.y, self.radius, self.rx, self.ry, self.width, self.height,
+            self.r, self.g, self.b)] + [format_distinct(self.opacity[part], ">3.1f")]
+        return join_text(*[piece for column in columns for piece in (" ", column)][1:])
+
+    def as_svg_lines(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """as_svg_lines method - RandomShape.as_svg() of shapes start to stop, as an array of strings"""
+        part = slice(start, stop)
+        shape_type = self.shape_type[part]
+        lines = np.full(len(shape_type), "", dtype=np.dtypes.StringDType())
+
+        # Each shape type fills in its own rows; unknown types stay empty, like as_svg()
+        circles = shape_type == RandomShape.CIRCLE
+        lines[circles] = join_text('<circle cx="', as_text(self.x[part][circles]), '" cy="',
+                                   as_text(self.y[part][circles]), '" r="', as_text(self.radius[part][circles]), '" ')
+        rectangles = shape_type == RandomShape.RECTANGLE
+        lines[rectangles] = join_text('<rect x="', as_text(self.x[part][rectangles]), '" y="',
+                                      as_text(self.y[part][rectangles]), '" width="',
+                                      as_text(self.width[part][rectangles]), '" height="',
+                                      as_text(self.height[part][rectangles]), '" ')
+        ellipses = shape_type == RandomShape.ELLIPSE
+        lines[ellipses] = join_text('<ellipse cx="', as_text(self.x[part][ellipses]), '" cy="',
+                                    as_text(self.y[part][ellipses]), '" rx="', as_text(self.rx[part][ellipses]),
+                                    '" ry="', as_text(self.ry[part][ellipses]), '" ')
+
+        known = circles | rectangles | ellipses
+        tags = np.array(["circle", "rect", "ellipse"], dtype=np.dtypes.StringDType())
+        lines[known] = join_text(lines[known], 'fill="rgb(', as_text(self.r[part][known]), ', ',
+                                 as_text(self.g[part][known]), ', ', as_text(self.b[part][known]), ')" fill-opacity="',
+                                 format_distinct(self.opacity[part][known]), '"></', tags[shape_type[known]], '>')
+        return lines
+
+    def render(self, file: IO[str]) -> None:
+        """render method"""
+        indent = self.get_indent()
+        for start in range(0, len(self), self.CHUNK):
+            lines = self.as_svg_lines(start, start + self.CHUNK).tolist()
+            file.write(indent + f"\n{indent}".join(lines) + "\n")
+
+def generate_shape_batch(config: PyArtConfig, count: int, seed: Optional[int] = None,
+                         start_id: int = 0) -> ShapeBatch:
+    """generate_shape_batch method - draws every attribute of count shapes at once from config with NumPy's
+    vectorized RNG (same ranges as RandomShape, each column in the smallest integer dtype that fits)"""
+    rng = np.random.default_rng(seed)
+
+    def integers(bounds: Tuple[int, int]) -> np.ndarray:
+        return rng.integers(bounds[0], bounds[1], size=count, endpoint=True, dtype=int_dtype(bounds))
+
+    colors = config.color_range
+    return ShapeBatch(
+        shape_type=rng.choice(np.asarray(config.shape_types, dtype=np.int8), size=count),
+        x=integers(config.x_range),
+        y=integers(config.y_range),
+        radius=integers(config.radius_range),
+        rx=integers(config.rx_range),
+        ry=integers(config.ry_range),
+        width=integers(config.width_range),
+        height=integers(config.height_range),
+        r=integers((colors.min_r, colors.max_r)),
+        g=integers((colors.min_g, colors.max_g)),
+        b=integers((colors.min_b, colors.max_b)),
+        opacity=np.round(rng.uniform(colors.min_op, colors.max_op, size=count), 1),
+        start_id=start_id)
+
+class ShapeTable(HtmlComponent):
+    """ShapeTable class - opt-in compact store for the RandomShapes of a canvas (SvgCanvas.random_art(compact=True)):
+    one typed array per attribute, about 30 bytes a shape instead of a whole object (no __dict__, config or indent
+    per shape); rows are copies, numbered from 0 like random_art(), and rendered as a ShapeBatch"""
+
+    # Starting array typecode of every column, in ShapeBatch argument order
+    COLUMNS = {'shape_type': 'b', 'x': 'h', 'y': 'h', 'radius': 'h', 'rx': 'h', 'ry': 'h', 'width': 'h',
+               'height': 'h', 'r': 'h', 'g': 'h', 'b': 'h', 'opacity': 'd'}
+    # Typecode an integer column is widened to when a value does not fit
+    WIDER = {'b': 'h', 'h': 'i', 'i': 'q'}
+
+    def __init__(self, indent_level: int = 0) -> None:
+        """__init__ method"""
+        super().__init__(indent_level)
+        self.columns = {name: array(typecode) for name, typecode in self.COLUMNS.items()}
+
+    def __len__(self) -> int:
+        """__len__ method"""
+        return len(self.columns['shape_type'])
+
+    def append(self, shape: RandomShape) -> None:
+        """append method - copies the attributes of shape into a new row"""
+        values = (shape.shape_type, shape.x, shape.y, shape.radius, shape.rx, shape.ry, shape.width, shape.height,
+                  shape.red, shape.green, shape.blue, shape.opacity)
+        for name, value in zip(self.COLUMNS, values):
+            column = self.columns[name]
+            while True:
+                try:
+                    column.append(value)
+                    break
+                except OverflowError:
+                    if column.typecode not in self.WIDER:
+                        raise
+                    column = self.columns[name] = array(self.WIDER[column.typecode], column)
+
+    def as_batch(self) -> ShapeBatch:
+        """as_batch method - the rows as a ShapeBatch of NumPy views over the arrays (no copy)"""
+        columns = {name: np.frombuffer(column, dtype=column.typecode) for name, column in self.columns.items()}
+        return ShapeBatch(**columns, indent_level=self.indent_level)
+
+    def render(self, file: IO[str]) -> None:
+        """render method"""
+        self.as_batch().render(file)
+
 class SvgCanvas(HtmlComponent):
     """SvgCanvas class"""
     def __init__(self, canvas_size: CanvasSize, indent_level: int = 0) -> None:
@@ -243,12 +407,23 @@ class SvgCanvas(HtmlComponent):
         
         file.write(f"{indent}</svg>\n")
     
-    def random_art(self, config: PyArtConfig) -> None:
-        """random_art method"""
+    def random_art(self, config: PyArtConfig, compact: bool = False) -> None:
+        """random_art method - compact=True keeps the shapes as rows of one ShapeTable instead of RandomShape
+        objects (same drawing, a fraction of the memory, but the shapes can no longer be changed afterwards)"""
+        table = ShapeTable() if compact else None
         for i in range(config.shape_count):
             shape = RandomShape(config)
             shape.count_id = i
-            self.add_shape(shape)
+            if table is None:
+                self.add_shape(shape)
+            else:
+                table.append(shape)
+        if table is not None:
+            self.add_shape(table)
+
+    def random_art_batch(self, config: PyArtConfig, seed: Optional[int] = None) -> None:
+        """random_art_batch method - random_art() with every shape drawn at once into a single ShapeBatch"""
+        self.add_shape(generate_shape_batch(config, config.shape_count, seed))
     
     def gen_art(self) -> None:
         """gen_art method"""
@@ -358,12 +533,16 @@ def sunset_theme() -> PyArtConfig:
         theme_name="Sunset"
     )
 
-def generate_art_file(config: PyArtConfig, filename: str) -> None:
-    """generate_art_file method"""
+def generate_art_file(config: PyArtConfig, filename: str, batched: bool = False, compact: bool = False) -> None:
+    """generate_art_file method - batched=True draws the shapes as one ShapeBatch and compact=True stores them in a
+    ShapeTable (both for very large shape counts)"""
 
     doc = HtmlDocument(f"Random Art - {config.theme_name}")
     canvas = SvgCanvas(config.canvas_size, indent_level=1)
-    canvas.random_art(config)
+    if batched:
+        canvas.random_art_batch(config)
+    else:
+        canvas.random_art(config, compact)
     doc.add_component(canvas)
     doc.render(filename)
 